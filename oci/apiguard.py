@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Shared rate limiter and retry layer for every OCI client call.
+
+Clients handed out by ClientPool are wrapped so each method call:
+
+  * takes a token from the bucket of its (service, region) - the rate
+    starts at RATE_LIMIT calls/s, is halved on every 429 and creeps back
+    up on success, so a run settles just under the throttling point;
+  * holds one slot of the global MAX_INFLIGHT budget while on the wire;
+  * is retried on 429 / 5xx / connection errors with exponential backoff
+    and full jitter, waiting at least the Retry-After the service sent;
+  * is timed and counted per (service, operation, region) in apimetrics.
+
+Pooled clients are built without the SDK's own retry strategy so a 429
+reaches the bucket. The pagination helpers still wrap every page in the
+SDK default retry, so once the guard gives up it raises RetriesExhausted,
+which that wrapper does not retry again.
+
+Errors that are still raised after MAX_ATTEMPTS are counted as failed.
+Callers that choose to carry on without the data report it through
+skip(), so a report that lost a compartment says so at exit instead of
+being silently incomplete.
+"""
+import atexit
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+import oci
+
+from apimetrics import METRICS
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+RATE_LIMIT = float(os.environ.get("DBASCRIPTS_RATE_LIMIT", "10"))  # calls/s per (service, region) to start with
+RATE_BURST = int(os.environ.get("DBASCRIPTS_RATE_BURST", "10"))
+MAX_INFLIGHT = int(os.environ.get("DBASCRIPTS_MAX_INFLIGHT", "32"))  # calls on the wire across all services
+MAX_ATTEMPTS = int(os.environ.get("DBASCRIPTS_MAX_ATTEMPTS", "6"))
+
+MIN_RATE = 0.5
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = (oci.exceptions.BaseRequestException,)  # connection errors / timeouts of the SDK's HTTP layer
+
+
+# ---------------------------------------------------------
+# Token bucket with additive increase / multiplicative decrease
+# ---------------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def throttled(self, pause):
+        with self._lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+    def succeeded(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + 0.1)
+
+
+# ---------------------------------------------------------
+# Retry decisions
+# ---------------------------------------------------------
+class RetriesExhausted(Exception):
+    """A retryable error that is still failing after MAX_ATTEMPTS."""
+
+    def __init__(self, error, attempts):
+        self.status = getattr(error, "status", None)
+        self.code = getattr(error, "code", None) or type(error).__name__
+        self.message = f"gave up after {attempts} attempts: {getattr(error, 'message', None) or error}"
+        super().__init__(self.message)
+
+
+def retry_after(error):
+    headers = getattr(error, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def is_retryable(error):
+    if isinstance(error, oci.exceptions.ServiceError):
+        return error.status in RETRYABLE_STATUS
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def describe_error(error):
+    if isinstance(error, (oci.exceptions.ServiceError, RetriesExhausted)):
+        return f"{error.status} {error.code}"
+    return type(error).__name__
+
+
+# ---------------------------------------------------------
+# Guard: buckets, concurrency budget, counters
+# ---------------------------------------------------------
+class ApiGuard:
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, max_inflight=MAX_INFLIGHT, max_attempts=MAX_ATTEMPTS,
+                 metrics=METRICS):
+        self.metrics = metrics
+        self.rate = rate
+        self.burst = burst
+        self.max_attempts = max(1, max_attempts)
+        self.inflight = threading.BoundedSemaphore(max(1, max_inflight))
+        self.calls = Counter()
+        self.retried = Counter()
+        self.throttled = Counter()
+        self.failed = Counter()
+        self.skipped = Counter()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter, key):
+        with self._lock:
+            counter[key] += 1
+
+    def bucket(self, service, region):
+        key = (service, region)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return self._buckets[key]
+
+    def call(self, service, region, fn, *args, **kwargs):
+        return self.invoke(service, getattr(fn, "__name__", "call"), region, fn, args, kwargs)
+
+    def invoke(self, service, operation, region, fn, args, kwargs):
+        key = (service, region)
+        bucket = self.bucket(service, region)
+        first_page = kwargs.get("page") is None
+
+        for attempt in range(self.max_attempts):
+            bucket.acquire()
+            self._count(self.calls, key)
+            try:
+                with self.inflight:
+                    self.metrics.start(service, operation, region)
+                    started = time.perf_counter()
+                    try:
+                        result = fn(*args, **kwargs)
+                    finally:
+                        elapsed = time.perf_counter() - started
+                        self.metrics.stop()
+            except Exception as e:
+                self.metrics.record(service, operation, region, elapsed, first_page, describe_error(e))
+                if not is_retryable(e):
+                    self._count(self.failed, key)
+                    raise
+                if attempt == self.max_attempts - 1:
+                    self._count(self.failed, key)
+                    raise RetriesExhausted(e, self.max_attempts) from e
+                delay = max(backoff(attempt), retry_after(e) or 0)
+                if getattr(e, "status", None) == 429:
+                    self._count(self.throttled, key)
+                    bucket.throttled(delay)
+                self._count(self.retried, key)
+                time.sleep(delay)
+                continue
+            self.metrics.record(service, operation, region, elapsed, first_page)
+            bucket.succeeded()
+            return result
+
+    def wrap(self, client, service, region):
+        self.metrics.instrument(client)
+        return GuardedClient(client, self, service, region)
+
+    # -----------------------------------------------------
+    # Data the caller decided to go on without
+    # -----------------------------------------------------
+    def skip(self, what, error):
+        reason = describe_error(error)
+        self._count(self.skipped, reason)
+        print(f"SKIPPED {what}: {reason}: {getattr(error, 'message', None) or error}", file=sys.stderr)
+
+    # -----------------------------------------------------
+    # Counters
+    # -----------------------------------------------------
+    def stats(self):
+        return {
+            f"{service} {region}": {
+                "calls": self.calls[(service, region)],
+                "retried": self.retried[(service, region)],
+                "throttled": self.throttled[(service, region)],
+                "failed": self.failed[(service, region)],
+                "rate": round(self._buckets[(service, region)].rate, 2),
+            }
+            for service, region in sorted(self._buckets)
+        }
+
+    def print_summary(self, stream=None):
+        stream = stream or sys.stderr
+        retried = sum(self.retried.values())
+        failed = sum(self.failed.values())
+        skipped = sum(self.skipped.values())
+        if not (retried or failed or skipped):
+            return
+        print(f"\nAPI calls: {sum(self.calls.values())}, retried: {retried}, "
+              f"throttled: {sum(self.throttled.values())}, failed: {failed}, skipped: {skipped}", file=stream)
+        for reason, count in self.skipped.most_common():
+            print(f"  skipped ({reason}): {count}", file=stream)
+        if skipped:
+            print("  WARNING: the output above is incomplete", file=stream)
+
+
+class GuardedClient:
+    """Proxy that sends every public method call of an OCI client through the guard."""
+
+    def __init__(self, client, guard, service, region):
+        self._client = client
+        self._guard = guard
+        self._service = service
+        self._region = region
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def guarded(*args, **kwargs):
+            return self._guard.invoke(self._service, name, self._region, attr, args, kwargs)
+        guarded.__name__ = name
+        return guarded
+
+
+# ---------------------------------------------------------
+# Process-wide guard used by the client pool
+# ---------------------------------------------------------
+GUARD = ApiGuard()
+skip = GUARD.skip
+atexit.register(GUARD.print_summary)
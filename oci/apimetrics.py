@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Per-operation instrumentation of OCI API calls.
+
+Every call the guard (apiguard.py) sends is recorded under
+(service, operation, region): calls (first pages), pages, errors, bytes
+received and a latency histogram. The histogram uses fixed log-spaced
+buckets, so recording costs one log() and one list increment and the
+percentiles are exact to within one bucket (~10%).
+
+Other components add their own counters (clientpool.py: clients created,
+reused and waited for), reported with the calls.
+
+At exit the totals are printed as a table (stderr) or written as JSON for
+a benchmark harness, selected by DBASCRIPTS_API_STATS:
+    table   summary table on stderr (default)
+    json    JSON document to DBASCRIPTS_API_STATS_FILE (api_stats.json)
+    off     nothing
+"""
+import atexit
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+STATS_OUTPUT = os.environ.get("DBASCRIPTS_API_STATS", "table")  # Options: table, json, off
+STATS_FILE = os.environ.get("DBASCRIPTS_API_STATS_FILE", "api_stats.json")
+
+BUCKET_BASE_MS = 0.1
+BUCKET_GROWTH = 1.1
+BUCKET_COUNT = 160  # 0.1 ms .. ~400 s
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def bucket_index(ms):
+    if ms <= BUCKET_BASE_MS:
+        return 0
+    return min(BUCKET_COUNT - 1, int(math.log(ms / BUCKET_BASE_MS) / _LOG_GROWTH) + 1)
+
+
+def bucket_upper_ms(index):
+    return BUCKET_BASE_MS * BUCKET_GROWTH ** index
+
+
+# ---------------------------------------------------------
+# One (service, operation, region)
+# ---------------------------------------------------------
+class OperationStats:
+    __slots__ = ("calls", "pages", "errors", "bytes", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.pages = 0
+        self.errors = Counter()
+        self.bytes = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * BUCKET_COUNT
+
+    def percentile(self, p):
+        target = math.ceil(self.pages * p / 100)
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(bucket_upper_ms(i), self.max_ms)
+        return 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "pages": self.pages,
+            "errors": dict(self.errors),
+            "bytes": self.bytes,
+            "total_ms": round(self.total_ms, 3),
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+# ---------------------------------------------------------
+# Registry
+# ---------------------------------------------------------
+class ApiMetrics:
+    def __init__(self):
+        self.started = time.time()
+        self._ops = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._current = threading.local()
+
+    def _stats(self, key):
+        stats = self._ops.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._ops.setdefault(key, OperationStats())
+        return stats
+
+    def record(self, service, operation, region, seconds, first_page=True, error=None):
+        ms = seconds * 1000.0
+        stats = self._stats((service, operation, region))
+        with self._lock:
+            stats.pages += 1
+            if first_page:
+                stats.calls += 1
+            if error:
+                stats.errors[error] += 1
+            stats.total_ms += ms
+            if ms > stats.max_ms:
+                stats.max_ms = ms
+            stats.buckets[bucket_index(ms)] += 1
+
+    # -----------------------------------------------------
+    # Bytes: counted by a response hook on the client's HTTP session,
+    # attributed to the operation running on the same thread
+    # -----------------------------------------------------
+    def start(self, service, operation, region):
+        self._current.key = (service, operation, region)
+
+    def stop(self):
+        self._current.key = None
+
+    def add_bytes(self, count):
+        key = getattr(self._current, "key", None)
+        if key is not None:
+            stats = self._stats(key)
+            with self._lock:
+                stats.bytes += count
+
+    def response_hook(self, response, *args, **kwargs):
+        length = response.headers.get("content-length")
+        if length is not None:
+            self.add_bytes(int(length))
+        elif not kwargs.get("stream"):
+            self.add_bytes(len(response.content or b""))
+        return response
+
+    def instrument(self, client):
+        session = getattr(getattr(client, "base_client", None), "session", None)
+        hooks = getattr(session, "hooks", None)
+        if hooks is not None and self.response_hook not in hooks.setdefault("response", []):
+            hooks["response"].append(self.response_hook)
+
+    # -----------------------------------------------------
+    # Counters of other components: source() -> {label: {counter: n}}
+    # -----------------------------------------------------
+    def add_counters(self, name, source):
+        with self._lock:
+            self._counters.setdefault(name, []).append(source)
+
+    def counters(self):
+        with self._lock:
+            sources = {name: list(fns) for name, fns in self._counters.items()}
+        merged = {}
+        for name, fns in sources.items():
+            rows = {}
+            for fn in fns:
+                for label, values in fn().items():
+                    rows.setdefault(label, Counter()).update(values)
+            merged[name] = {label: dict(values) for label, values in sorted(rows.items())}
+        return merged
+
+    # -----------------------------------------------------
+    # Output
+    # -----------------------------------------------------
+    def snapshot(self):
+        with self._lock:
+            operations = [
+                dict(service=s, operation=o, region=r, **stats.as_dict())
+                for (s, o, r), stats in sorted(self._ops.items(), key=lambda kv: -kv[1].total_ms)
+            ]
+        return {
+            "started": self.started,
+            "elapsed_s": round(time.time() - self.started, 3),
+            "operations": operations,
+            "counters": self.counters(),
+        }
+
+    def print_table(self, stream=None):
+        stream = stream or sys.stderr
+        snap = self.snapshot()
+        if not snap["operations"]:
+            return
+        print(f"\nAPI CALLS ({snap['elapsed_s']}s wall clock)", file=stream)
+        print(f"{'SERVICE':28} {'OPERATION':32} {'REGION':16} {'CALLS':>6} {'PAGES':>6} {'ERR':>4} "
+              f"{'KB':>9} {'TOTAL S':>8} {'P50 MS':>8} {'P95 MS':>8} {'P99 MS':>8}", file=stream)
+        for op in snap["operations"]:
+            print(f"{op['service'][:28]:28} {op['operation'][:32]:32} {str(op['region'])[:16]:16} "
+                  f"{op['calls']:6} {op['pages']:6} {sum(op['errors'].values()):4} "
+                  f"{op['bytes'] / 1024:9.1f} {op['total_ms'] / 1000:8.2f} "
+                  f"{op['p50_ms']:8.1f} {op['p95_ms']:8.1f} {op['p99_ms']:8.1f}", file=stream)
+
+        for name, rows in snap["counters"].items():
+            if not rows:
+                continue
+            columns = list(next(iter(rows.values())))
+            print(f"\n{name.upper()}", file=stream)
+            print(f"{'':45} " + " ".join(f"{c.upper():>8}" for c in columns), file=stream)
+            for label, values in rows.items():
+                print(f"{label[:45]:45} " + " ".join(f"{values.get(c, 0):8}" for c in columns), file=stream)
+
+    def write_json(self, path=STATS_FILE):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=1)
+        os.replace(tmp, path)
+
+    def report(self, output=STATS_OUTPUT):
+        if output == "table":
+            self.print_table()
+        elif output == "json":
+            self.write_json()
+
+
+# ---------------------------------------------------------
+# Process-wide registry used by the guard
+# ---------------------------------------------------------
+METRICS = ApiMetrics()
+atexit.register(METRICS.report)
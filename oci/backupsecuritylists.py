@@ -1,59 +1,29 @@
 #!/usr/bin/env python3
 import oci
 from oci.pagination import list_call_get_all_results
+from compartmentcache import load_compartment_paths
+from clientpool import ClientPool, load_config
+from apiguard import skip
+from seclistbackupstore import save_to_store, list_manifests, load_manifest, load_backup
+from seclistrulefile import write_rule_file, load_security_lists
+from inventorystore import INVENTORY_MODE, open_store, replace_rows, finish_rows, load_rows, changed_compartments
+from records import intern_values
 from datetime import datetime
+import argparse
 import json
 import csv
 import os
+import time
 
 
 # ---------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------
-BACKUP_DIR = "/var/backups/oci_security_lists"
-BACKUP_FORMAT = "csv"  # Options: csv, json, both
+BACKUP_DIR = os.environ.get("DBASCRIPTS_SECLIST_BACKUP_DIR", "/var/backups/oci_security_lists")
+BACKUP_FORMAT = "store"  # Options: store (incremental, content-addressed), ndjson (compressed, per rule), csv, json, both
 
-
-# ---------------------------------------------------------
-# Build compartment path root/parent/child
-# ---------------------------------------------------------
-def build_compartment_paths(identity, tenancy_id):
-    resp = list_call_get_all_results(
-        identity.list_compartments,
-        tenancy_id,
-        compartment_id_in_subtree=True
-    )
-
-    comps = [c for c in resp.data if c.lifecycle_state == "ACTIVE"]
-
-    tenancy = identity.get_tenancy(tenancy_id).data
-    tenancy.name = "root"
-    tenancy.compartment_id = None
-    comps.append(tenancy)
-
-    name_map = {c.id: c.name for c in comps}
-    parent_map = {c.id: c.compartment_id for c in comps}
-    full_paths = {}
-
-    def get_path(cid):
-        if cid in full_paths:
-            return full_paths[cid]
-        names = []
-        cur = cid
-        while cur:
-            names.append(name_map[cur])
-            cur = parent_map.get(cur)
-        names = list(reversed(names))
-        if names == ["root"]:
-            full_paths[cid] = None
-        else:
-            full_paths[cid] = " / ".join(names)
-        return full_paths[cid]
-
-    for c in comps:
-        get_path(c.id)
-
-    return full_paths
+# Resource types whose changes make inventory refresh mode re-collect a compartment
+SECLIST_RESOURCE_TYPES = {"Vcn", "Subnet", "SecurityList"}
 
 
 # ---------------------------------------------------------
@@ -204,7 +174,8 @@ def parse_ingress_rule(rule, rule_direction):
     if description:
         allows = f"{allows} ({description})"
     
-    return {
+    # thousands of rules repeat the same few protocols, ports and CIDRs: keep one copy of each string
+    return intern_values({
         'stateless': 'Yes' if is_stateless else 'No',
         'source': source,
         'ip_protocol': protocol_name,
@@ -213,7 +184,7 @@ def parse_ingress_rule(rule, rule_direction):
         'type_and_code': f"{icmp_type}, {icmp_code}" if (icmp_type or icmp_code) else "",
         'allows': allows,
         'description': description
-    }
+    })
 
 
 # ---------------------------------------------------------
@@ -265,7 +236,8 @@ def parse_egress_rule(rule, rule_direction):
     if description:
         allows = f"{allows} ({description})"
     
-    return {
+    # thousands of rules repeat the same few protocols, ports and CIDRs: keep one copy of each string
+    return intern_values({
         'stateless': 'Yes' if is_stateless else 'No',
         'destination': destination,
         'ip_protocol': protocol_name,
@@ -274,25 +246,72 @@ def parse_egress_rule(rule, rule_direction):
         'type_and_code': f"{icmp_type}, {icmp_code}" if (icmp_type or icmp_code) else "",
         'allows': allows,
         'description': description
-    }
+    })
 
 
 # ---------------------------------------------------------
-# Get security lists for region
+# Subnet index: security_list_id -> [subnet names]
 # ---------------------------------------------------------
-def get_security_lists(region, config):
-    print(f"\n=== REGION: {region} ===")
-    
-    reg_cfg = dict(config)
-    reg_cfg["region"] = region
+def build_subnet_index(network, comp_id):
+    subnet_index = {}
+    try:
+        subnets = list_call_get_all_results(network.list_subnets, comp_id).data
+    except Exception as e:
+        skip(f"subnets of {comp_id}", e)
+        return subnet_index
 
-    identity = oci.identity.IdentityClient(reg_cfg)
-    network = oci.core.VirtualNetworkClient(reg_cfg)
+    # A subnet can only use security lists of its own VCN, so one
+    # compartment-wide listing covers every VCN in the compartment
+    for subnet in subnets:
+        for sec_list_id in getattr(subnet, 'security_list_ids', None) or []:
+            subnet_index.setdefault(sec_list_id, []).append(subnet.display_name)
 
-    tenancy_id = reg_cfg["tenancy"]
-    comp_paths = build_compartment_paths(identity, tenancy_id)
+    return subnet_index
 
+
+# ---------------------------------------------------------
+# Get security lists for region
+# ---------------------------------------------------------
+def get_security_lists(region, pool, comp_paths, store=None):
+    print(f"\n=== REGION: {region} ===")
+
+    if store is None:
+        with pool.client(oci.core.VirtualNetworkClient, region) as network:
+            return collect_security_lists(region, network, comp_paths)[0]
+
+    # read = security lists from the local inventory without any API call
+    if INVENTORY_MODE == "read":
+        return load_rows(store, "security_lists", region)
+
+    # refresh = only compartments whose VCNs / subnets / security lists changed (None: all)
+    comp_ids = None
+    if INVENTORY_MODE == "refresh":
+        comp_ids = changed_compartments(store, pool, "security_lists", region, SECLIST_RESOURCE_TYPES)
+    started = time.time()  # the stored rows reflect every change synced before this
+    if comp_ids is not None:
+        comp_paths = {cid: comp_paths[cid] for cid in comp_ids if cid in comp_paths}
+
+    # one compartment at a time so every stored security list knows its compartment
+    collected = []
+    failed = set()
+    with pool.client(oci.core.VirtualNetworkClient, region) as network:
+        for comp_id, comp_path in comp_paths.items():
+            sec_lists, comp_failed = collect_security_lists(region, network, {comp_id: comp_path})
+            failed |= comp_failed
+            for sec_list in sec_lists:
+                collected.append((comp_id, sec_list['security_list_id'], sec_list))
+
+    # compartments that failed keep their stored rows, and are revisited on the next refresh
+    visited = set(comp_paths) if comp_ids is None else comp_ids
+    replace_rows(store, "security_lists", region, collected, visited - failed)
+    finish_rows(store, "security_lists", region, visited if comp_ids is None else None, None if failed else started)
+    return load_rows(store, "security_lists", region)
+
+
+def collect_security_lists(region, network, comp_paths):
+    """Returns (security_lists_data, compartments whose VCNs or security lists could not be listed)."""
     security_lists_data = []
+    failed = set()
 
     for comp_id, comp_path in comp_paths.items():
         if not comp_path:
@@ -300,9 +319,15 @@ def get_security_lists(region, config):
 
         try:
             vcns = network.list_vcns(comp_id).data
-        except:
+        except Exception as e:
+            skip(f"VCNs of {comp_path} in {region}", e)
+            failed.add(comp_id)
             continue
 
+        # Subnets are listed once per compartment, not once per security list
+        if any(vcn.lifecycle_state == "AVAILABLE" for vcn in vcns):
+            subnet_index = build_subnet_index(network, comp_id)
+
         for vcn in vcns:
             if vcn.lifecycle_state != "AVAILABLE":
                 continue
@@ -312,7 +337,9 @@ def get_security_lists(region, config):
 
             try:
                 security_lists = network.list_security_lists(comp_id, vcn_id=vcn_id).data
-            except:
+            except Exception as e:
+                skip(f"security lists of VCN {vcn_name} in {region}", e)
+                failed.add(comp_id)
                 continue
 
             for sec_list in security_lists:
@@ -324,14 +351,7 @@ def get_security_lists(region, config):
                 time_created = format_datetime(sec_list.time_created)
 
                 # Get subnets using this security list
-                subnets_using = []
-                try:
-                    subnets = network.list_subnets(comp_id, vcn_id=vcn_id).data
-                    for subnet in subnets:
-                        if sec_list_id in getattr(subnet, 'security_list_ids', []):
-                            subnets_using.append(subnet.display_name)
-                except:
-                    pass
+                subnets_using = subnet_index.get(sec_list_id, [])
 
                 subnets_str = ", ".join(subnets_using) if subnets_using else "Not attached"
 
@@ -369,7 +389,67 @@ def get_security_lists(region, config):
 
                 security_lists_data.append(sec_list_info)
 
-    return security_lists_data
+    return security_lists_data, failed
+
+
+# ---------------------------------------------------------
+# Regions from config ("regions" list or single "region")
+# ---------------------------------------------------------
+def get_regions(config):
+    return (
+        [r.strip() for r in config.get("regions", "").split(",")]
+        if "regions" in config and config["regions"].strip()
+        else [config["region"]]
+    )
+
+
+# ---------------------------------------------------------
+# Collect security lists of all regions (live)
+# ---------------------------------------------------------
+def collect_all_security_lists(config, regions):
+    # Clients and the compartment tree are shared by all regions
+    pool = ClientPool(config)
+    comp_paths = load_compartment_paths(pool)
+
+    # Local inventory (DBASCRIPTS_INVENTORY); off = live APIs only
+    store = open_store(config["tenancy"]) if INVENTORY_MODE != "off" else None
+
+    all_security_lists = []
+    for region in regions:
+        sec_lists = get_security_lists(region, pool, comp_paths, store)
+        all_security_lists.extend(sec_lists)
+
+    return all_security_lists
+
+
+# ---------------------------------------------------------
+# Load a saved backup: store manifest, rules .ndjson.gz or full JSON
+# ---------------------------------------------------------
+def resolve_backup_path(path):
+    if path == "latest":
+        manifests = list_manifests(BACKUP_DIR)
+        if not manifests:
+            raise FileNotFoundError(f"No stored backups in {BACKUP_DIR}")
+        return manifests[-1]
+    return path
+
+
+def load_saved_backup(path, region=None, vcn_id=None):
+    path = resolve_backup_path(path)
+
+    if path.endswith(".ndjson.gz"):
+        return load_security_lists(path, region, vcn_id)
+
+    if os.path.basename(path).startswith("manifest_"):
+        security_lists_data = load_backup(path)
+    else:
+        with open(path) as f:
+            security_lists_data = json.load(f)
+
+    return [
+        sl for sl in security_lists_data
+        if (region is None or sl['region'] == region) and (vcn_id is None or sl['vcn_id'] == vcn_id)
+    ]
 
 
 # ---------------------------------------------------------
@@ -463,6 +543,54 @@ def save_to_json(security_lists_data, timestamp):
     return json_file
 
 
+# ---------------------------------------------------------
+# Save to compressed NDJSON (one record per rule, indexed by region / VCN)
+# ---------------------------------------------------------
+def save_to_ndjson(security_lists_data, timestamp):
+    rule_file = os.path.join(BACKUP_DIR, f"security_lists_rules_{timestamp}.ndjson.gz")
+    write_rule_file(security_lists_data, rule_file, timestamp)
+
+    print(f"\n✅ NDJSON backup saved: {rule_file}")
+
+    return rule_file
+
+
+# ---------------------------------------------------------
+# Save to content-addressed store (only new/changed lists)
+# ---------------------------------------------------------
+def save_to_backup_store(security_lists_data, timestamp):
+    manifest_file, written = save_to_store(security_lists_data, timestamp, BACKUP_DIR)
+
+    print(f"\n✅ Incremental backup saved: {manifest_file}")
+    print(f"   {written} new/changed of {len(security_lists_data)} security list(s) stored")
+
+    return manifest_file
+
+
+# ---------------------------------------------------------
+# Export a stored point in time to CSV / JSON
+# ---------------------------------------------------------
+def export_backup(manifest_file, export_format):
+    if manifest_file == "latest":
+        manifests = list_manifests(BACKUP_DIR)
+        if not manifests:
+            print(f"\n⚠️  No stored backups in {BACKUP_DIR}")
+            return
+        manifest_file = manifests[-1]
+
+    timestamp = load_manifest(manifest_file)['timestamp']
+    security_lists_data = load_backup(manifest_file, BACKUP_DIR)
+
+    if export_format in ['csv', 'both']:
+        save_to_csv(security_lists_data, timestamp)
+
+    if export_format in ['json', 'both']:
+        save_to_json(security_lists_data, timestamp)
+
+    if export_format == 'ndjson':
+        save_to_ndjson(security_lists_data, timestamp)
+
+
 # ---------------------------------------------------------
 # Print summary
 # ---------------------------------------------------------
@@ -545,13 +673,18 @@ def print_sample_rules(security_lists_data):
 # MAIN
 # ---------------------------------------------------------
 def main():
-    config = oci.config.from_file()
+    parser = argparse.ArgumentParser(description="Back up OCI security lists")
+    parser.add_argument("--export", metavar="MANIFEST",
+                        help="export a stored backup ('latest' for the newest run) instead of taking a new one")
+    parser.add_argument("--export-format", choices=["csv", "json", "both", "ndjson"], default="csv")
+    args = parser.parse_args()
+
+    if args.export:
+        export_backup(args.export, args.export_format)
+        return
 
-    regions = (
-        [r.strip() for r in config.get("regions", "").split(",")]
-        if "regions" in config and config["regions"].strip()
-        else [config["region"]]
-    )
+    config = load_config()
+    regions = get_regions(config)
 
     print("="*80)
     print("OCI SECURITY LIST BACKUP SCRIPT")
@@ -561,23 +694,32 @@ def main():
     print(f"Regions: {', '.join(regions)}")
     print("="*80)
 
+    # Collect all security lists
+    all_security_lists = collect_all_security_lists(config, regions)
+    save_backup(all_security_lists)
+
+
+# ---------------------------------------------------------
+# Write the backup in BACKUP_FORMAT and print the summary
+# ---------------------------------------------------------
+def save_backup(all_security_lists):
     # Ensure backup directory exists
     os.makedirs(BACKUP_DIR, exist_ok=True)
 
     # Timestamp for backup files
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-    # Collect all security lists
-    all_security_lists = []
-    for region in regions:
-        sec_lists = get_security_lists(region, config)
-        all_security_lists.extend(sec_lists)
-
     if not all_security_lists:
         print("\n⚠️  No security lists found!")
         return
 
     # Save backups
+    if BACKUP_FORMAT == 'store':
+        save_to_backup_store(all_security_lists, timestamp)
+
+    if BACKUP_FORMAT == 'ndjson':
+        save_to_ndjson(all_security_lists, timestamp)
+
     if BACKUP_FORMAT in ['csv', 'both']:
         save_to_csv(all_security_lists, timestamp)
     
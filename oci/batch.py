@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Run the reports of collectors.py for several tenancies at once.
+
+Every profile of ~/.oci/config (one per tenancy) is collected in its own
+worker process, with its own client pool, rate limiter and compartment
+cache. OCI throttles per tenancy, so the workers do not slow each other
+down, and an estate-wide run takes about as long as the largest tenancy.
+
+Security list backups of a tenancy go to BACKUP_DIR/<profile>: manifests
+are named by timestamp, and "--export latest" must find the tenancy's own.
+Export one with DBASCRIPTS_SECLIST_BACKUP_DIR=BACKUP_DIR/<profile>.
+
+Output is merged in profile order and tagged with the tenancy:
+    table         one "===== TENANCY: <profile> (<tenancy OCID>) =====" section per profile
+    csv           one header per report, every row starts with "tenancy" and "tenancy_id" columns
+    ndjson        every record gets "tenancy" and "tenancy_id" fields
+In csv and ndjson mode stdout only carries records: report text that has
+no csv / ndjson form goes to stderr, prefixed with the profile.
+
+Usage:
+    batch.py --profiles PROD,DEV,SHARED instances backups
+    batch.py --all-profiles                # every report, every profile
+"""
+import argparse
+import atexit
+import configparser
+import csv
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from clientpool import config_path, load_config
+from apiguard import GUARD
+from apimetrics import METRICS, STATS_OUTPUT, STATS_FILE
+import rowwriter
+from rowwriter import OUTPUT_FORMAT
+from collectors import REPORTS, run_reports
+import backupsecuritylists as seclist_report
+
+
+# ---------------------------------------------------------
+# Profiles of the config file
+# ---------------------------------------------------------
+def config_profiles():
+    # the same file load_config reads the profiles from
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(config_path())
+    return (["DEFAULT"] if parser.defaults() else []) + parser.sections()
+
+
+# ---------------------------------------------------------
+# Worker: every report of one tenancy, output captured
+# ---------------------------------------------------------
+def run_tenancy(profile, config, reports):
+    # a fresh process per tenancy, so the module setting only affects this tenancy
+    seclist_report.BACKUP_DIR = os.path.join(seclist_report.BACKUP_DIR, profile)
+    rowwriter.TAG_COLUMNS.update(tenancy=profile, tenancy_id=config["tenancy"])
+
+    out = io.StringIO()
+    with redirect_stdout(out):
+        run_reports(config, reports)
+
+    # pool workers exit without running atexit hooks: report this tenancy's API use here
+    GUARD.print_summary()
+    if STATS_OUTPUT == "json":
+        root, ext = os.path.splitext(STATS_FILE)
+        METRICS.write_json(f"{root}.{profile}{ext}")
+    elif STATS_OUTPUT == "table":
+        print(f"\n[{profile}]", file=sys.stderr)
+        METRICS.print_table()
+
+    return out.getvalue()
+
+
+# ---------------------------------------------------------
+# Merge
+# ---------------------------------------------------------
+CSV_HEADER_PREFIX = "tenancy,tenancy_id,"
+
+
+def csv_prefix(*values):
+    out = io.StringIO()
+    csv.writer(out).writerow(values)
+    return out.getvalue().rstrip("\r\n") + ","
+
+
+def print_tagged(profile, tenancy_id, text, csv_blocks):
+    """Print one tenancy's output; csv rows are added to csv_blocks (header -> rows) instead."""
+    if OUTPUT_FORMAT == "table":
+        print(f"\n===== TENANCY: {profile} ({tenancy_id}) =====")
+        sys.stdout.write(text)
+        return
+
+    # the workers' writers already tagged every record (rowwriter.TAG_COLUMNS)
+    record_prefix = csv_prefix(profile, tenancy_id)
+    header = None
+    for line in text.splitlines():
+        if OUTPUT_FORMAT == "ndjson" and line.startswith("{"):
+            print(line)
+        elif OUTPUT_FORMAT == "csv" and line.startswith(CSV_HEADER_PREFIX):
+            header = line
+            csv_blocks.setdefault(header, [])
+        elif OUTPUT_FORMAT == "csv" and header and line.startswith(record_prefix):
+            csv_blocks[header].append(line)
+        elif line.strip():
+            print(f"[{profile}] {line}", file=sys.stderr)
+
+
+def print_csv_blocks(csv_blocks):
+    # one header per report, followed by the rows of every tenancy
+    for header, lines in csv_blocks.items():
+        sys.stdout.write(header + "\r\n")
+        for line in lines:
+            sys.stdout.write(line + "\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the OCI reports for several tenancies in parallel")
+    parser.add_argument("reports", nargs="*", metavar="REPORT",
+                        help=f"reports to run (default: all): {', '.join(REPORTS)}")
+    parser.add_argument("--profiles", metavar="P1,P2,...", help="config file profiles, one per tenancy")
+    parser.add_argument("--all-profiles", action="store_true", help="every profile of the config file")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per profile)")
+    args = parser.parse_args()
+
+    # the parent makes no API call: its exit report would only overwrite STATS_FILE with an empty snapshot
+    atexit.unregister(METRICS.report)
+
+    unknown = [name for name in args.reports if name not in REPORTS]
+    if unknown:
+        parser.error(f"unknown report(s): {', '.join(unknown)}")
+    profiles = config_profiles() if args.all_profiles else [p.strip() for p in (args.profiles or "").split(",") if p.strip()]
+    if not profiles:
+        parser.error("give --profiles or --all-profiles")
+
+    # read every profile up front so a typo fails before any collection starts
+    configs = {profile: load_config(profile) for profile in profiles}
+    reports = args.reports or list(REPORTS)
+
+    # a fresh process per tenancy: the guard, metrics and pools never carry over between tenancies
+    with ProcessPoolExecutor(max_workers=args.workers or len(profiles), max_tasks_per_child=1) as executor:
+        futures = {profile: executor.submit(run_tenancy, profile, configs[profile], reports) for profile in profiles}
+
+        # merged in profile order; a later tenancy that finished first waits for its turn
+        csv_blocks = {}
+        for profile, future in futures.items():
+            tenancy_id = configs[profile]["tenancy"]
+            try:
+                text = future.result()
+            except Exception as e:
+                print(f"ERROR in tenancy {profile} ({tenancy_id}): {e}", file=sys.stderr)
+                continue
+            print_tagged(profile, tenancy_id, text, csv_blocks)
+
+    print_csv_blocks(csv_blocks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Benchmark the scripts against a synthetic tenancy (fakeoci.py).
+
+Each script runs in its own child process with the OCI SDK clients
+replaced by fakes, so nothing leaves the machine. For every script the
+child reports wall time, the API calls it made per operation and its peak
+RSS (total, and on top of the generated tenancy). Results can be saved
+with --json and compared with a saved baseline: any script that got slower
+or called the API more than --tolerance allows makes the run exit non-zero,
+which is what a CI job needs.
+
+Usage:
+    benchmark.py                                   # small tenancy, every script
+    benchmark.py --preset large --latency-ms 20    # 10k compartments, 100k instances, 20k security lists
+    benchmark.py --json bench.json
+    benchmark.py --baseline bench.json --tolerance 0.2
+    benchmark.py --only list_multi_region_instances backupsecuritylists
+    benchmark.py --startup [--eager-sdk]           # start-up time: script vs dbascripts.py subcommand
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PRESETS = {
+    "small": dict(compartments=200, instances=2000, security_lists=400, users=50),
+    "medium": dict(compartments=2000, instances=20000, security_lists=4000, users=500),
+    "large": dict(compartments=10000, instances=100000, security_lists=20000, users=2000),
+}
+
+# script, arguments
+SCRIPTS = [
+    ("list_multi_region_instances.py", []),
+    ("list_multi_region_compute_status.py", []),
+    ("getcomputebootandblockbkp.py", []),
+    ("listociresourceswithtags.py", []),
+    ("listmultiregiontopicsnalarms.py", []),
+    ("backupsecuritylists.py", []),
+    ("seclistanalyzer.py", []),
+    ("seclistquery.py", ["--ip", "10.1.2.3", "--port", "22"]),
+    ("list90dapikeys.py", []),
+    ("listvcn.py", []),
+    ("listcomp.py", []),
+    # every report of collectors.py from one shared collection: compare with the sum of the scripts above
+    ("collectors.py", []),
+]
+
+
+STARTUP_RUNS = 5
+
+
+# ---------------------------------------------------------
+# Child: build the tenancy, then time one script
+# ---------------------------------------------------------
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0  # KB on Linux
+
+
+def run_child(spec):
+    sys.path.insert(0, HERE)
+    from fakeoci import SyntheticTenancy, install
+
+    tenancy = SyntheticTenancy(**spec["tenancy"])
+    # generate everything up front so the timer only sees the script
+    for region in tenancy.regions:
+        tenancy.all_data(region)
+        tenancy.search_index(region)
+    baseline_mb = peak_rss_mb()
+
+    script = os.path.join(HERE, spec["script"])
+    sys.argv = [script] + spec["args"]
+    error = None
+    with install(tenancy, spec["latency_ms"], spec["page_size"]) as backend:
+        started = time.perf_counter()
+        try:
+            with redirect_stdout(io.StringIO() if spec["keep_output"] else open(os.devnull, "w")):
+                runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                error = f"exit {e.code}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        wall = time.perf_counter() - started
+        calls = {}
+        for (service, operation, region), count in backend.calls.items():
+            key = f"{service}.{operation}"
+            calls[key] = calls.get(key, 0) + count
+
+    peak_mb = peak_rss_mb()
+    return {
+        "script": spec["script"],
+        "wall_s": round(wall, 3),
+        "api_calls": sum(calls.values()),
+        "calls": dict(sorted(calls.items())),
+        "peak_rss_mb": round(peak_mb, 1),
+        "script_rss_mb": round(peak_mb - baseline_mb, 1),
+        "error": error,
+    }
+
+
+# ---------------------------------------------------------
+# Parent: one child per script, sandboxed caches
+# ---------------------------------------------------------
+def run_script(script, args, opts, tenancy, workdir):
+    spec = {
+        "script": script,
+        "args": args,
+        "tenancy": tenancy,
+        "latency_ms": opts.latency_ms,
+        "page_size": opts.page_size,
+        "keep_output": False,
+    }
+    result_file = os.path.join(workdir, f"{script}.result.json")
+    env = dict(
+        os.environ,
+        DBASCRIPTS_CACHE_DIR=os.path.join(workdir, "cache"),
+        DBASCRIPTS_SECLIST_BACKUP_DIR=os.path.join(workdir, "seclist_backups"),
+        DBASCRIPTS_INVENTORY=opts.inventory,
+        DBASCRIPTS_API_STATS="off",
+        DBASCRIPTS_RATE_LIMIT=str(opts.rate_limit),
+        DBASCRIPTS_RATE_BURST=str(max(10, int(opts.rate_limit))),
+        BENCHMARK_SPEC=json.dumps(spec),
+        BENCHMARK_RESULT=result_file,
+    )
+    os.makedirs(env["DBASCRIPTS_SECLIST_BACKUP_DIR"], exist_ok=True)
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=workdir, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0 or not os.path.exists(result_file):
+        return {"script": script, "error": (proc.stderr.strip().splitlines() or ["no result"])[-1]}
+    with open(result_file) as f:
+        return json.load(f)
+
+
+# ---------------------------------------------------------
+# Start-up: fresh interpreter up to the point where work starts
+# ---------------------------------------------------------
+def time_startup(code, env):
+    """Median wall time of a fresh interpreter running code: imports only, no API call."""
+    times = []
+    for _ in range(STARTUP_RUNS):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {HERE!r}); {code}"],
+                       env=env, check=True)
+        times.append(time.perf_counter() - started)
+    return round(sorted(times)[len(times) // 2], 3)
+
+
+def run_startup(opts):
+    from dbascripts import COMMANDS
+
+    env = dict(os.environ)
+    if opts.eager_sdk:
+        # what SDK versions without lazy service imports do on "import oci"
+        env["OCI_PYTHON_SDK_LAZY_IMPORTS_DISABLED"] = "true"
+
+    results = []
+    for command, (module, services, _) in COMMANDS.items():
+        if opts.only and command not in opts.only and module not in opts.only:
+            continue
+        print(f"timing {command} ...", file=sys.stderr)
+        # a lazy SDK loads the script's service packages on its first call: count them on both sides
+        script_code = "; ".join([f"import {module}"] + [f"import oci.{service}" for service in services])
+        results.append({
+            "command": command,
+            "script_s": time_startup(script_code, env),
+            "cli_s": time_startup(f"import dbascripts; dbascripts.load({command!r})", env),
+        })
+    return results
+
+
+def compare_startup(results, baseline, tolerance):
+    previous = {r["command"]: r for r in baseline.get("startup", [])}
+    regressions = []
+    for r in results:
+        old = previous.get(r["command"])
+        if old and r["cli_s"] > old["cli_s"] * (1 + tolerance) and r["cli_s"] - old["cli_s"] > 0.1:
+            regressions.append(f"{r['command']}: cli_s {old['cli_s']} -> {r['cli_s']}")
+    return regressions
+
+
+def print_startup(results):
+    print(f"{'COMMAND':18} {'SCRIPT S':>9} {'CLI S':>7}")
+    for r in results:
+        print(f"{r['command']:18} {r['script_s']:9.2f} {r['cli_s']:7.2f}")
+
+
+def compare(results, baseline, tolerance):
+    """Scripts that got slower or chattier than the baseline allows."""
+    previous = {r["script"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get(r["script"])
+        if not old or r.get("error") or old.get("error"):
+            continue
+        for metric in ("wall_s", "api_calls", "script_rss_mb"):
+            limit = old[metric] * (1 + tolerance)
+            # ignore noise on tiny absolute values
+            if r[metric] > limit and r[metric] - old[metric] > {"wall_s": 0.2, "api_calls": 0, "script_rss_mb": 5}[metric]:
+                regressions.append(f"{r['script']}: {metric} {old[metric]} -> {r[metric]}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'SCRIPT':38} {'WALL S':>8} {'API CALLS':>10} {'PEAK MB':>8} {'SCRIPT MB':>10}  ERROR")
+    for r in results:
+        if "wall_s" not in r:
+            print(f"{r['script']:38} {'-':>8} {'-':>10} {'-':>8} {'-':>10}  {r['error']}")
+            continue
+        print(f"{r['script']:38} {r['wall_s']:8.2f} {r['api_calls']:10} {r['peak_rss_mb']:8.1f} "
+              f"{r['script_rss_mb']:10.1f}  {r['error'] or ''}")
+
+
+def main():
+    if "--child" in sys.argv:
+        result = run_child(json.loads(os.environ["BENCHMARK_SPEC"]))
+        with open(os.environ["BENCHMARK_RESULT"], "w") as f:
+            json.dump(result, f)
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the OCI scripts against a synthetic tenancy")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--compartments", type=int)
+    parser.add_argument("--instances", type=int)
+    parser.add_argument("--security-lists", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--regions", default="us-ashburn-1,us-phoenix-1")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="injected latency of every API call")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--rate-limit", type=float, default=1000.0, help="DBASCRIPTS_RATE_LIMIT for the scripts")
+    parser.add_argument("--inventory", default="off", help="DBASCRIPTS_INVENTORY for the scripts")
+    parser.add_argument("--only", nargs="+", metavar="SCRIPT", help="run only these scripts (name without .py; with --startup also a command)")
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="fail when a script regressed against this result file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression (0.25 = 25%%)")
+    parser.add_argument("--startup", action="store_true",
+                        help="measure start-up time of every script and dbascripts.py subcommand instead")
+    parser.add_argument("--eager-sdk", action="store_true",
+                        help="with --startup: disable the SDK's lazy service imports, as on older SDK versions")
+    opts = parser.parse_args()
+
+    if opts.startup:
+        results = run_startup(opts)
+        print_startup(results)
+        if opts.json:
+            with open(opts.json, "w") as f:
+                json.dump({"eager_sdk": opts.eager_sdk, "startup": results}, f, indent=1)
+        if opts.baseline:
+            with open(opts.baseline) as f:
+                regressions = compare_startup(results, json.load(f), opts.tolerance)
+            for line in regressions:
+                print(f"REGRESSION {line}")
+            if regressions:
+                sys.exit(1)
+        return
+
+    tenancy = dict(PRESETS[opts.preset], regions=opts.regions.split(","), seed=opts.seed)
+    for name in ("compartments", "instances", "security_lists", "users"):
+        if getattr(opts, name) is not None:
+            tenancy[name] = getattr(opts, name)
+
+    scripts = [(s, a) for s, a in SCRIPTS if not opts.only or s[:-3] in opts.only]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="dbascripts-bench-") as workdir:
+        for script, args in scripts:
+            print(f"running {script} ...", file=sys.stderr)
+            results.append(run_script(script, args, opts, tenancy, workdir))
+
+    print_results(results)
+    document = {"tenancy": tenancy, "latency_ms": opts.latency_ms, "page_size": opts.page_size, "results": results}
+    if opts.json:
+        with open(opts.json, "w") as f:
+            json.dump(document, f, indent=1)
+
+    failed = [r["script"] for r in results if r.get("error")]
+    regressions = []
+    if opts.baseline:
+        with open(opts.baseline) as f:
+            regressions = compare(results, json.load(f), opts.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
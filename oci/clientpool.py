@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Region-keyed pool of OCI service clients shared by the scripts.
+
+Creating a client repeats signer setup and starts a new HTTP session, so
+building one per instance throws away TLS connection reuse. The pool hands
+out at most POOL_SIZE clients per (client class, region); a client is only
+used by one thread at a time and goes back to the pool afterwards, keeping
+its keep-alive session warm for the next caller. The created, reused and
+waited counters are reported at exit with the API call table (apimetrics).
+"""
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import oci
+
+from apiguard import GUARD
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+POOL_SIZE = int(os.environ.get("DBASCRIPTS_CLIENT_POOL_SIZE", "16"))  # clients per (service, region)
+PROFILE = os.environ.get("DBASCRIPTS_PROFILE", "DEFAULT")  # profile of ~/.oci/config (or OCI_CONFIG_FILE)
+
+
+# ---------------------------------------------------------
+# Config of one profile (batch.py runs one per tenancy)
+# ---------------------------------------------------------
+def config_path():
+    """The config file the SDK reads: ~/.oci/config, else OCI_CONFIG_FILE, else ~/.oraclebmc/config."""
+    return oci.config._get_config_path_with_fallback(oci.config.DEFAULT_LOCATION)
+
+
+def load_config(profile=None):
+    return oci.config.from_file(file_location=config_path(), profile_name=profile or PROFILE)
+
+
+class ClientPool:
+    def __init__(self, config, pool_size=POOL_SIZE, guard=GUARD):
+        self.config = config
+        self.guard = guard
+        self.pool_size = max(1, pool_size)
+        self.signer = self._shared_signer(config)
+        self.created = Counter()
+        self.reused = Counter()
+        self.waited = Counter()
+        self._idle = {}
+        self._total = Counter()
+        self._cond = threading.Condition()
+        if guard is not None:
+            guard.metrics.add_counters("clients", self.stats)
+
+    # -----------------------------------------------------
+    # API key signer is built once and shared by all clients
+    # -----------------------------------------------------
+    @staticmethod
+    def _shared_signer(config):
+        if "security_token_file" in config:
+            return None  # session auth: let each client build its own signer
+        if not (config.get("key_file") or config.get("key_content")):
+            return None
+        try:
+            return oci.signer.Signer.from_config(config)
+        except Exception:
+            return None
+
+    def _key(self, client_cls, region):
+        return client_cls.__name__, region or self.config.get("region")
+
+    def _create(self, client_cls, region):
+        cfg = dict(self.config)
+        if region:
+            cfg["region"] = region
+        # retries, backoff and rate limiting are done by the guard (apiguard.py)
+        kwargs = {"retry_strategy": oci.retry.NoneRetryStrategy()}
+        if self.signer is not None:
+            kwargs["signer"] = self.signer
+        client = client_cls(cfg, **kwargs)
+        return self.guard.wrap(client, client_cls.__name__, cfg.get("region")) if self.guard else client
+
+    # -----------------------------------------------------
+    # Checkout / checkin
+    # -----------------------------------------------------
+    def acquire(self, client_cls, region=None):
+        key = self._key(client_cls, region)
+        with self._cond:
+            while True:
+                idle = self._idle.setdefault(key, [])
+                if idle:
+                    self.reused[key] += 1
+                    return idle.pop()
+                if self._total[key] < self.pool_size:
+                    self._total[key] += 1
+                    break
+                self.waited[key] += 1
+                self._cond.wait()
+
+        try:
+            client = self._create(client_cls, region)
+        except Exception:
+            with self._cond:
+                self._total[key] -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.created[key] += 1
+        return client
+
+    def release(self, client_cls, region, client):
+        key = self._key(client_cls, region)
+        with self._cond:
+            self._idle.setdefault(key, []).append(client)
+            self._cond.notify()
+
+    @contextmanager
+    def client(self, client_cls, region=None):
+        client = self.acquire(client_cls, region)
+        try:
+            yield client
+        finally:
+            self.release(client_cls, region, client)
+
+    # -----------------------------------------------------
+    # Counters
+    # -----------------------------------------------------
+    def stats(self):
+        with self._cond:
+            return {
+                f"{name} {region}": {
+                    "created": self.created[(name, region)],
+                    "reused": self.reused[(name, region)],
+                    "waited": self.waited[(name, region)],
+                }
+                for name, region in sorted(set(self.created) | set(self.reused))
+            }
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Run several reports from one shared collection of datasets.
+
+Each report declares the datasets it reads, and each dataset declares the
+datasets it is built from. The executor turns the union into one DAG per
+region, with nodes (dataset, region, compartment). It fetches every node
+once on a bounded thread pool and starts a node as soon as its inputs
+are in. The same results are then handed to every report, so a dataset
+that several reports read (instances, boot volume attachments, instance
+discovery) is fetched once instead of once per script. Datasets that only
+one report reads (alarms, topics, security lists) cost what they cost in
+their script.
+
+Datasets have one of three scopes:
+    region        once per region (instance discovery, shapes)
+    instances     per compartment that holds instances (Resource Search
+                  discovery, see instancesearch.py)
+    compartment   per compartment of the tree, root included
+
+A combined run always reads the live APIs. The inventory store modes of
+the single scripts (DBASCRIPTS_INVENTORY) do not apply here.
+
+Usage:
+    collectors.py                                  # every report
+    collectors.py instances backups seclist-backup
+"""
+import argparse
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import oci
+
+from compartmentcache import load_compartments, build_paths
+from clientpool import ClientPool, load_config
+from apiguard import skip
+from scanscheduler import MAX_WORKERS
+from instancesearch import DISCOVERY_MODE, find_region_compartments
+from instanceindex import build_volume_attachment_index, build_boot_backup_index, build_volume_backup_index
+from records import list_records, instance_record
+from shapecache import ShapeCatalog
+from rowwriter import get_writer, note
+import list_multi_region_instances as instances_report
+import list_multi_region_compute_status as status_report
+import getcomputebootandblockbkp as backups_report
+import backupsecuritylists as seclist_report
+import listmultiregiontopicsnalarms as topics_report
+
+
+Dataset = namedtuple("Dataset", ["name", "scope", "needs", "fetch"])
+Report = namedtuple("Report", ["name", "needs", "render"])
+
+DATASETS = {}
+
+
+def dataset(name, scope, needs=()):
+    def register(fetch):
+        DATASETS[name] = Dataset(name, scope, tuple(needs), fetch)
+        return fetch
+    return register
+
+
+# ---------------------------------------------------------
+# Datasets: fetch(ctx, region, compartment_id, inputs) -> value
+# ---------------------------------------------------------
+@dataset("instance_compartments", "region")
+def fetch_instance_compartments(ctx, region, comp_id, inputs):
+    # None = every compartment (scan mode, or the search failed)
+    if DISCOVERY_MODE != "search":
+        return None
+    return find_region_compartments(ctx.pool, region)
+
+
+@dataset("shapes", "region")
+def fetch_shapes(ctx, region, comp_id, inputs):
+    catalog = ShapeCatalog(ctx.pool, region, ctx.tenancy_id)
+    catalog.load()  # disk or list_shapes here in the DAG, not while rendering
+    return catalog
+
+
+@dataset("instances", "instances")
+def fetch_instances(ctx, region, comp_id, inputs):
+    with ctx.pool.client(oci.core.ComputeClient, region) as compute:
+        return list_records(compute.list_instances, instance_record, comp_id)
+
+
+@dataset("vnic_index", "instances", needs=["instances"])
+def fetch_vnic_index(ctx, region, comp_id, inputs):
+    if not inputs["instances"]:
+        return {}
+    return instances_report.load_vnic_index(ctx.pool, region, comp_id)
+
+
+@dataset("boot_index", "instances", needs=["instances"])
+def fetch_boot_index(ctx, region, comp_id, inputs):
+    if not inputs["instances"]:
+        return {}
+    ads = {i.availability_domain for i in inputs["instances"]}
+    return instances_report.load_boot_index(ctx.pool, region, comp_id, ads)
+
+
+@dataset("volume_attachments", "instances", needs=["instances"])
+def fetch_volume_attachments(ctx, region, comp_id, inputs):
+    if not inputs["instances"]:
+        return {}
+    with ctx.pool.client(oci.core.ComputeClient, region) as compute:
+        return build_volume_attachment_index(compute, comp_id)
+
+
+@dataset("boot_backups", "instances", needs=["instances"])
+def fetch_boot_backups(ctx, region, comp_id, inputs):
+    if not inputs["instances"]:
+        return {}
+    with ctx.pool.client(oci.core.BlockstorageClient, region) as block:
+        return backups_report.load_backup_index(build_boot_backup_index, block, comp_id)
+
+
+@dataset("volume_backups", "instances", needs=["instances"])
+def fetch_volume_backups(ctx, region, comp_id, inputs):
+    if not inputs["instances"]:
+        return {}
+    with ctx.pool.client(oci.core.BlockstorageClient, region) as block:
+        return backups_report.load_backup_index(build_volume_backup_index, block, comp_id)
+
+
+@dataset("security_lists", "compartment")
+def fetch_security_lists(ctx, region, comp_id, inputs):
+    comp_path = ctx.root_less_path(comp_id)
+    if not comp_path:
+        return []  # root is not backed up
+    with ctx.pool.client(oci.core.VirtualNetworkClient, region) as network:
+        return seclist_report.collect_security_lists(region, network, {comp_id: comp_path})[0]
+
+
+@dataset("alarms", "compartment")
+def fetch_alarms(ctx, region, comp_id, inputs):
+    return topics_report.list_active_alarms(ctx.pool, (region, comp_id))
+
+
+@dataset("topics", "compartment")
+def fetch_topics(ctx, region, comp_id, inputs):
+    with ctx.pool.client(oci.ons.NotificationControlPlaneClient, region) as ons_control, \
+            ctx.pool.client(oci.ons.NotificationDataPlaneClient, region) as ons_data:
+        return topics_report.load_topics(ons_control, ons_data, comp_id, ctx.root_less_path(comp_id))
+
+
+# ---------------------------------------------------------
+# Collected results shared by the reports
+# ---------------------------------------------------------
+class Collection:
+    def __init__(self, pool, regions):
+        self.pool = pool
+        self.regions = regions
+        self.tenancy_id = pool.config["tenancy"]
+        with pool.client(oci.identity.IdentityClient) as identity:
+            self.compartments = load_compartments(identity, self.tenancy_id)
+        self.results = {}
+        self.failed = set()
+        self._paths = {}
+
+    def paths(self, sep=" → ", root_name="root"):
+        """Compartment paths in the layout a report prints (built once per layout)."""
+        key = (sep, root_name)
+        if key not in self._paths:
+            self._paths[key] = build_paths(self.compartments, self.tenancy_id, sep=sep, root_name=root_name)
+        return self._paths[key]
+
+    def root_less_path(self, comp_id):
+        """root / parent / child, None for the root itself (security list and topic reports)."""
+        return None if comp_id == self.tenancy_id else self.paths(" / ")[comp_id]
+
+    def get(self, name, region, comp_id=None, default=None):
+        return self.results.get((name, region, comp_id), default)
+
+    def collected(self, region, *names):
+        """Compartments, in tree order, for which every one of names was collected."""
+        return [cid for cid in self.paths() if all((n, region, cid) in self.results for n in names)]
+
+
+def required(names):
+    """names plus everything they are built from, inputs first."""
+    order = []
+
+    def visit(name):
+        if name in order:
+            return
+        for dep in DATASETS[name].needs:
+            visit(dep)
+        if DATASETS[name].scope == "instances":
+            visit("instance_compartments")
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+# ---------------------------------------------------------
+# Executor
+# ---------------------------------------------------------
+def collect(pool, regions, names, max_workers=MAX_WORKERS):
+    ctx = Collection(pool, regions)
+    needed = required(names)
+    comp_ids = list(ctx.paths())
+
+    dependents = defaultdict(list)  # node -> nodes waiting for it
+    blocked = {}                    # node -> number of inputs still missing
+
+    def nodes(scope, region_ids, compartment_ids):
+        # compartments outer, regions inner, so every region makes progress from the start
+        return [
+            (name, region, cid)
+            for name in needed if DATASETS[name].scope == scope
+            for cid in compartment_ids
+            for region in region_ids
+        ]
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {}
+
+        def submit(node):
+            name, region, cid = node
+            inputs = {dep: ctx.results[(dep, region, cid)] for dep in DATASETS[name].needs}
+            futures[executor.submit(DATASETS[name].fetch, ctx, region, cid, inputs)] = node
+
+        def add(new_nodes):
+            for node in new_nodes:
+                name, region, cid = node
+                inputs = [(dep, region, cid) for dep in DATASETS[name].needs]
+                if any(i in ctx.failed for i in inputs):
+                    ctx.failed.add(node)
+                    continue
+                missing = [i for i in inputs if i not in ctx.results]
+                if not missing:
+                    submit(node)
+                    continue
+                blocked[node] = len(missing)
+                for i in missing:
+                    dependents[i].append(node)
+
+        def finish(node, failed):
+            if failed:
+                ctx.failed.add(node)
+            for waiter in dependents.pop(node, []):
+                if waiter in ctx.failed:
+                    continue
+                if failed:
+                    finish(waiter, True)  # no input, no fetch; the failed input was already reported
+                    continue
+                blocked[waiter] -= 1
+                if blocked[waiter] == 0:
+                    del blocked[waiter]
+                    submit(waiter)
+
+        add(nodes("region", regions, [None]))
+        add(nodes("compartment", regions, comp_ids))
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in done:
+                node = futures.pop(fut)
+                name, region, cid = node
+                try:
+                    ctx.results[node] = fut.result()
+                except Exception as e:
+                    where = f"{ctx.paths().get(cid, cid)} in {region}" if cid else region
+                    skip(f"{name} of {where}", e)
+                    finish(node, True)
+                    continue
+                finish(node, False)
+
+                # the instance compartments of a region are known: its per-instance DAG can start
+                if name == "instance_compartments":
+                    found = ctx.results[node]
+                    add(nodes("instances", [region], [c for c in comp_ids if found is None or c in found]))
+
+    return ctx
+
+
+# ---------------------------------------------------------
+# Reports: render(ctx) prints what the single script prints
+# ---------------------------------------------------------
+def render_instances(ctx):
+    writer = get_writer(instances_report.HEADERS)
+    paths = ctx.paths()
+    for region in ctx.regions:
+        writer.flush()
+        note(f"Collecting from region: {region} ...")
+        shapes = ctx.get("shapes", region) or {}
+        for cid in ctx.collected(region, "instances"):
+            rows = instances_report.instance_rows(
+                region,
+                paths[cid],
+                ctx.get("instances", region, cid),
+                ctx.get("vnic_index", region, cid) or {},
+                ctx.get("boot_index", region, cid) or {},
+                shapes
+            )
+            for row in rows:
+                writer.write(row)
+    writer.close()
+    note(f"\nTotal instances: {writer.count}")
+
+
+def render_compute_status(ctx):
+    note("\nListing Compute Instances...\n")
+    writer = status_report.open_writer()
+    paths = ctx.paths()
+    for region in ctx.regions:
+        writer.flush()
+        note(f"\n--- Collecting region: {region} ---")
+        for cid in ctx.collected(region, "instances"):
+            for inst in ctx.get("instances", region, cid):
+                writer.write(status_report.status_row(region, paths[cid], inst))
+    writer.close()
+    note("\nCompleted.\n")
+
+
+def render_backups(ctx):
+    paths = ctx.paths(" / ", "")
+    for region in ctx.regions:
+        print(f"\n===== REGION: {region} =====")
+        rows = []
+        # a compartment whose attachments could not be listed is left out, as in the single script
+        for cid in ctx.collected(region, "instances", "volume_attachments"):
+            boot_volumes = {iid: bv_id for iid, (bv_id, _) in (ctx.get("boot_index", region, cid) or {}).items()}
+            for inst in ctx.get("instances", region, cid):
+                rows.append(backups_report.backup_row(
+                    inst,
+                    paths[cid],
+                    boot_volumes,
+                    ctx.get("volume_attachments", region, cid),
+                    ctx.get("boot_backups", region, cid),
+                    ctx.get("volume_backups", region, cid)
+                ))
+        print(backups_report.build_region_table(rows))
+
+
+def render_seclist_backup(ctx):
+    all_security_lists = []
+    for region in ctx.regions:
+        for cid in ctx.collected(region, "security_lists"):
+            all_security_lists.extend(ctx.get("security_lists", region, cid))
+    print(f"\n=== SECURITY LIST BACKUP ({seclist_report.BACKUP_DIR}) ===")
+    seclist_report.save_backup(all_security_lists)
+
+
+def render_topics(ctx):
+    final = []
+    for region in ctx.regions:
+        print(f"\n=== REGION: {region} ===")
+        alarm_index = {}
+        for cid in ctx.collected(region, "alarms"):
+            topics_report.index_alarms(alarm_index, ctx.get("alarms", region, cid))
+
+        known_topic_ids = set()
+        for cid in ctx.collected(region, "topics"):
+            topics = ctx.get("topics", region, cid)
+            known_topic_ids.update(topic.topic_id for topic, _ in topics)
+            final.extend(topics_report.topic_rows(region, ctx.root_less_path(cid), topics, alarm_index))
+        failed = sum(1 for name, r, _ in ctx.failed if name == "topics" and r == region)
+        topics_report.print_orphaned_alarms(alarm_index, known_topic_ids, failed)
+
+    topics_report.print_table(final)
+    print(f"\n=== TOTAL RECORDS: {len(final)} ===")
+
+
+REPORTS = {
+    "instances": Report("instances", ("instances", "vnic_index", "boot_index", "shapes"), render_instances),
+    "compute-status": Report("compute-status", ("instances",), render_compute_status),
+    "backups": Report("backups", ("instances", "boot_index", "volume_attachments", "boot_backups",
+                                  "volume_backups"), render_backups),
+    "seclist-backup": Report("seclist-backup", ("security_lists",), render_seclist_backup),
+    "topics": Report("topics", ("alarms", "topics"), render_topics),
+}
+
+
+def run_reports(config, names, regions=None):
+    regions = regions or seclist_report.get_regions(config)
+    reports = [REPORTS[name] for name in names]
+    pool = ClientPool(config)
+    ctx = collect(pool, regions, [d for report in reports for d in report.needs])
+    for report in reports:
+        note(f"\n##### {report.name} #####")
+        report.render(ctx)
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Run several OCI reports from one shared collection")
+    parser.add_argument("reports", nargs="*", metavar="REPORT",
+                        help=f"reports to run (default: all): {', '.join(REPORTS)}")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.reports if name not in REPORTS]
+    if unknown:
+        parser.error(f"unknown report(s): {', '.join(unknown)}")
+
+    run_reports(load_config(), args.reports or list(REPORTS))
+
+
+if __name__ == "__main__":
+    main()
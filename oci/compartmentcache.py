@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Shared compartment hierarchy for the OCI scripts.
+
+The full compartment tree is fetched once per tenancy and kept on disk for
+CACHE_TTL seconds, so a cron batch running several scripts (and several
+regions) pays for the paginated list_compartments call only once.
+"""
+import json
+import os
+import time
+from collections import namedtuple
+
+import oci
+
+from records import list_records, intern
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+CACHE_DIR = os.path.expanduser(os.environ.get("DBASCRIPTS_CACHE_DIR", "~/.cache/dbascripts"))
+CACHE_TTL = int(os.environ.get("DBASCRIPTS_COMPARTMENT_TTL", "3600"))  # seconds, 0 disables the cache
+
+# Same attribute names as oci.identity.models.Compartment
+Compartment = namedtuple("Compartment", ["id", "name", "compartment_id", "lifecycle_state"])
+
+
+# ---------------------------------------------------------
+# Cache file helpers
+# ---------------------------------------------------------
+def cache_file(tenancy_id):
+    return os.path.join(CACHE_DIR, f"compartments_{tenancy_id}.json")
+
+
+def read_cache(tenancy_id, ttl=CACHE_TTL):
+    path = cache_file(tenancy_id)
+    try:
+        if ttl <= 0 or time.time() - os.path.getmtime(path) > ttl:
+            return None
+        with open(path) as f:
+            return [Compartment(*c) for c in json.load(f)["compartments"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_cache(tenancy_id, compartments):
+    path = cache_file(tenancy_id)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump({"tenancy": tenancy_id,
+                       "fetched": time.time(),
+                       "compartments": [list(c) for c in compartments]}, f)
+        # atomic swap so concurrent cron jobs never read a half written file
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def invalidate(tenancy_id):
+    try:
+        os.remove(cache_file(tenancy_id))
+    except OSError:
+        pass
+
+
+# ---------------------------------------------------------
+# Load all compartments (cache first, API on miss)
+# ---------------------------------------------------------
+def load_compartments(identity, tenancy_id, ttl=CACHE_TTL, refresh=False):
+    if not refresh:
+        cached = read_cache(tenancy_id, ttl)
+        if cached is not None:
+            return cached
+
+    compartments = list_records(
+        identity.list_compartments,
+        lambda c: Compartment(c.id, c.name, intern(c.compartment_id), intern(c.lifecycle_state)),
+        tenancy_id,
+        compartment_id_in_subtree=True,
+        access_level="ANY"
+    )
+
+    if ttl > 0:
+        write_cache(tenancy_id, compartments)
+    return compartments
+
+
+# ---------------------------------------------------------
+# Build full path for every compartment in one pass
+# ---------------------------------------------------------
+def build_paths(compartments, tenancy_id, sep=" → ", root_name="root", active_only=True):
+    """
+    Return {compartment_id: path} including the root compartment.
+
+    Each compartment is resolved at most once: the walk up the parent chain
+    stops at the first ancestor whose path is already known. A compartment
+    whose parent is unknown (e.g. filtered out as inactive) hangs off root.
+    With an empty root_name the root is left out of the paths.
+    """
+    names = {}
+    parents = {}
+    for c in compartments:
+        if active_only and c.lifecycle_state != "ACTIVE":
+            continue
+        names[c.id] = c.name
+        parents[c.id] = c.compartment_id
+
+    paths = {tenancy_id: root_name}
+
+    for cid in names:
+        chain = []
+        cur = cid
+        while cur not in paths and cur in names:
+            chain.append(cur)
+            cur = parents[cur]
+
+        base = paths.get(cur, root_name)
+        for node in reversed(chain):
+            base = f"{base}{sep}{names[node]}" if base else names[node]
+            paths[node] = base
+
+    return paths
+
+
+# ---------------------------------------------------------
+# Convenience: cached compartments -> paths
+# ---------------------------------------------------------
+def get_compartment_paths(identity, tenancy_id, sep=" → ", root_name="root",
+                          active_only=True, ttl=CACHE_TTL, refresh=False):
+    compartments = load_compartments(identity, tenancy_id, ttl=ttl, refresh=refresh)
+    return build_paths(compartments, tenancy_id, sep=sep, root_name=root_name,
+                       active_only=active_only)
+
+
+def load_compartment_paths(pool, sep=" / "):
+    """
+    Paths root / parent / child through a ClientPool, for scripts that do not
+    scan the root compartment itself: the tenancy maps to None.
+    """
+    tenancy_id = pool.config["tenancy"]
+    with pool.client(oci.identity.IdentityClient) as identity:
+        comp_paths = get_compartment_paths(identity, tenancy_id, sep=sep)
+    comp_paths[tenancy_id] = None
+    return comp_paths
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+One entry point for the OCI scripts, for cron jobs that run many short checks.
+
+A plain "import oci" may load every service package of the SDK: all of them
+on SDK versions without lazy imports, or with
+OCI_PYTHON_SDK_LAZY_IMPORTS_DISABLED=true, which takes several seconds
+before any work starts. This CLI imports the SDK with service imports
+turned off, then only the service packages the subcommand uses, then the
+script itself. Arguments after the subcommand go to the script unchanged.
+test_dbascripts.py checks the service lists in COMMANDS and the load time.
+
+Usage:
+    dbascripts.py instances
+    dbascripts.py apikeys --days 30 --format csv
+    dbascripts.py seclist-backup --export latest
+    dbascripts.py collect instances backups
+    dbascripts.py --help
+"""
+import argparse
+import importlib
+import os
+import sys
+
+
+NO_SERVICE_IMPORTS = "OCI_PYTHON_SDK_NO_SERVICE_IMPORTS"
+
+# subcommand: script module, SDK service packages used by it and its helpers, description
+COMMANDS = {
+    "instances": ("list_multi_region_instances", ("core", "identity", "resource_search"),
+                  "instances with shape, IPs and boot volume size"),
+    "compute-status": ("list_multi_region_compute_status", ("core", "identity", "resource_search"),
+                       "instance lifecycle state"),
+    "backups": ("getcomputebootandblockbkp", ("core", "identity", "resource_search"),
+                "boot and block volume backups of every instance"),
+    "seclist-backup": ("backupsecuritylists", ("core", "identity", "resource_search"),
+                       "back up security lists or export a stored backup"),
+    "topics": ("listmultiregiontopicsnalarms", ("identity", "monitoring", "ons"),
+               "notification topics and the alarms that use them"),
+    "tags": ("listociresourceswithtags", ("identity", "resource_search"),
+             "resources with their defined and freeform tags"),
+    "apikeys": ("list90dapikeys", ("identity",),
+                "user credentials older than a threshold"),
+    "vcn": ("listvcn", ("core", "identity"),
+            "VCNs and subnets of every compartment"),
+    "compartments": ("listcomp", ("identity",),
+                     "compartment tree"),
+    "collect": ("collectors", ("core", "identity", "monitoring", "ons", "resource_search"),
+                "several reports from one shared collection"),
+    "batch": ("batch", ("core", "identity", "monitoring", "ons", "resource_search"),
+              "reports for several tenancies in parallel"),
+    "seclist-analyze": ("seclistanalyzer", ("core", "identity", "resource_search"),
+                        "duplicate, shadowed and overlapping security list rules"),
+    "seclist-query": ("seclistquery", ("core", "identity", "resource_search"),
+                      "security list rules that let an IP reach a port"),
+    "shapes": ("shapecache", (),
+               "inspect or invalidate the cached shape catalogs"),
+}
+
+
+# ---------------------------------------------------------
+# Import only what one subcommand needs
+# ---------------------------------------------------------
+def load(command):
+    """Script module of command, with only its SDK service packages imported."""
+    module, services, _ = COMMANDS[command]
+
+    # read once by oci/__init__; restored so worker processes (batch) import the SDK as usual
+    saved = os.environ.get(NO_SERVICE_IMPORTS)
+    os.environ[NO_SERVICE_IMPORTS] = "true"
+    try:
+        import oci  # noqa: F401
+        for service in services:
+            importlib.import_module(f"oci.{service}")
+    finally:
+        if saved is None:
+            del os.environ[NO_SERVICE_IMPORTS]
+        else:
+            os.environ[NO_SERVICE_IMPORTS] = saved
+
+    return importlib.import_module(module)
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def main():
+    width = max(len(name) for name in COMMANDS)
+    parser = argparse.ArgumentParser(
+        prog="dbascripts",
+        description="OCI reports and checks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n" + "\n".join(f"  {name:{width}}  {desc}" for name, (_, _, desc) in COMMANDS.items())
+               + "\n\n'dbascripts COMMAND --help' shows the options of commands that take any.",
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="COMMAND")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="arguments of the command")
+    args = parser.parse_args()
+
+    script = load(args.command)
+    sys.argv = [f"dbascripts {args.command}"] + args.args
+    script.main()
+
+
+if __name__ == "__main__":
+    main()
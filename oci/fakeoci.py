@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+Local fake of the OCI SDK client surface used by the scripts in oci/.
+
+A SyntheticTenancy is generated from a seed: a compartment tree, instances
+with VNICs, boot and block volumes and backups, VCNs with subnets and
+security lists, ONS topics, alarms, users and their credentials. install()
+swaps the SDK client classes (and oci.config.from_file) for fakes that
+serve this tenancy with opc-next-page pagination, an optional per-call
+latency and optional injected 429s, so every script runs unchanged.
+
+Only what the scripts read is modelled; any other model attribute reads
+as None, like an unset SDK field.
+
+    tenancy = SyntheticTenancy(compartments=10000, instances=100000, security_lists=20000)
+    with install(tenancy, latency_ms=20):
+        runpy.run_path("list_multi_region_instances.py", run_name="__main__")
+"""
+import ipaddress
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import oci
+from oci.response import Response
+
+
+DEFAULT_REGIONS = ("us-ashburn-1", "us-phoenix-1")
+ADS = ("AD-1", "AD-2", "AD-3")
+PAGE_SIZE = 100
+SHAPES = [
+    ("VM.Standard2.1", 1, 15), ("VM.Standard2.2", 2, 30), ("VM.Standard2.4", 4, 60),
+    ("VM.Standard.E4.Flex", None, None), ("VM.Standard.E5.Flex", None, None),
+    ("BM.Standard3.64", 64, 1024),
+]
+NOW = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+class Model:
+    """Stand-in for an SDK model: unknown public attributes read as None."""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return None
+
+    def __repr__(self):
+        return f"Model({self.__dict__})"
+
+
+def ocid(kind, *parts):
+    return f"ocid1.{kind}.oc1..fake" + "".join(f"{p}".replace("-", "") for p in parts)
+
+
+# ---------------------------------------------------------
+# Synthetic tenancy
+# ---------------------------------------------------------
+class SyntheticTenancy:
+    def __init__(self, compartments=200, instances=2000, security_lists=400, users=50,
+                 regions=DEFAULT_REGIONS, seed=42):
+        self.seed = seed
+        self.regions = list(regions)
+        self.tenancy_id = ocid("tenancy", seed)
+        rng = random.Random(seed)
+
+        # Compartment tree: a few top-level compartments, the rest nested below random parents
+        self.compartments = []
+        for i in range(compartments):
+            if i < 10 or rng.random() < 0.05:
+                parent = self.tenancy_id
+            else:
+                parent = self.compartments[rng.randrange(len(self.compartments))].id
+            self.compartments.append(Model(
+                id=ocid("compartment", i), name=f"comp{i:05d}", compartment_id=parent,
+                description=f"synthetic compartment {i}",
+                lifecycle_state="DELETED" if rng.random() < 0.02 else "ACTIVE",
+                time_created=NOW - timedelta(days=rng.randrange(2000)),
+            ))
+        self.compartment_by_id = {c.id: c for c in self.compartments}
+
+        # Workloads sit in about a quarter of the active compartments, unevenly
+        active = [c.id for c in self.compartments if c.lifecycle_state == "ACTIVE"] or [self.tenancy_id]
+        workload = rng.sample(active, max(1, len(active) // 4))
+        weights = [1.0 / (i + 1) ** 0.5 for i in range(len(workload))]
+        self.counts = defaultdict(Counter)
+        for region, comp_id in zip(rng.choices(self.regions, k=instances),
+                                   rng.choices(workload, weights, k=instances)):
+            self.counts[(region, comp_id)]["instances"] += 1
+        for region, comp_id in zip(rng.choices(self.regions, k=security_lists),
+                                   rng.choices(workload, weights, k=security_lists)):
+            self.counts[(region, comp_id)]["security_lists"] += 1
+
+        self.users = [
+            Model(id=ocid("user", i), name=f"user{i:04d}@example.com", lifecycle_state="ACTIVE",
+                  time_created=NOW - timedelta(days=rng.randrange(1500)))
+            for i in range(users)
+        ]
+        self.credentials = {u.id: self._user_credentials(u, random.Random(f"{seed}:{u.id}")) for u in self.users}
+
+        self._data = {}
+        self._lock = threading.Lock()
+
+    # -----------------------------------------------------
+    # Lazily generated content of one (region, compartment)
+    # -----------------------------------------------------
+    def data(self, region, comp_id):
+        key = (region, comp_id)
+        with self._lock:
+            if key not in self._data:
+                self._data[key] = self._generate(region, comp_id, self.counts.get(key, Counter()))
+            return self._data[key]
+
+    def all_data(self, region):
+        return [(comp_id, self.data(region, comp_id)) for (r, comp_id) in sorted(self.counts) if r == region]
+
+    def _generate(self, region, comp_id, counts):
+        rng = random.Random(f"{self.seed}:{region}:{comp_id}")
+        tag = f"{region}{comp_id[-6:]}"
+        d = defaultdict(list)
+        d["private_ips"] = defaultdict(list)
+        d["subscriptions"] = defaultdict(list)
+
+        n_instances, n_lists = counts["instances"], counts["security_lists"]
+        if not (n_instances or n_lists):
+            return d
+
+        # VCNs, subnets and security lists
+        n_vcns = max(1, n_lists // 4)
+        net_base = int(ipaddress.ip_address(f"10.{rng.randrange(256)}.0.0"))
+        for v in range(n_vcns):
+            vcn_id = ocid("vcn", tag, v)
+            d["vcns"].append(Model(id=vcn_id, display_name=f"vcn-{v}", compartment_id=comp_id,
+                                   lifecycle_state="AVAILABLE", cidr_block=f"10.{v % 256}.0.0/16"))
+        lists_by_vcn = defaultdict(list)
+        for s in range(n_lists):
+            vcn = d["vcns"][s % n_vcns]
+            sec_list = Model(
+                id=ocid("securitylist", tag, s), display_name=f"seclist-{s}", compartment_id=comp_id,
+                vcn_id=vcn.id, lifecycle_state="AVAILABLE", time_created=NOW - timedelta(days=rng.randrange(900)),
+                ingress_security_rules=[self._rule(rng, "ingress", region) for _ in range(rng.randint(3, 15))],
+                egress_security_rules=[self._rule(rng, "egress", region) for _ in range(rng.randint(1, 3))],
+            )
+            d["security_lists"].append(sec_list)
+            lists_by_vcn[vcn.id].append(sec_list.id)
+        for v, vcn in enumerate(d["vcns"]):
+            for n in range(2):
+                candidates = lists_by_vcn[vcn.id]
+                d["subnets"].append(Model(
+                    id=ocid("subnet", tag, v, n), display_name=f"subnet-{v}-{n}", compartment_id=comp_id,
+                    vcn_id=vcn.id, lifecycle_state="AVAILABLE", cidr_block=f"10.{v % 256}.{n}.0/24",
+                    availability_domain=None,
+                    security_list_ids=rng.sample(candidates, min(len(candidates), rng.randint(1, 2))),
+                ))
+
+        # Instances with VNICs, boot / block volumes and backups
+        for i in range(n_instances):
+            ad = rng.choice(ADS)
+            shape, ocpus, memory = rng.choice(SHAPES)
+            shape_config = None
+            if ocpus is None:
+                ocpus = rng.choice([1, 2, 4, 8])
+                memory = ocpus * rng.choice([8, 16])
+                shape_config = Model(ocpus=float(ocpus), memory_in_gbs=float(memory))
+            state = rng.choices(["RUNNING", "STOPPED", "TERMINATED"], [85, 12, 3])[0]
+            inst_id = ocid("instance", tag, i)
+            d["instances"].append(Model(
+                id=inst_id, display_name=f"vm-{tag[-6:]}-{i}", compartment_id=comp_id, availability_domain=ad,
+                shape=shape, shape_config=shape_config, lifecycle_state=state, region=region,
+                time_created=NOW - timedelta(days=rng.randrange(1200)),
+            ))
+            if state == "TERMINATED":
+                continue
+
+            subnet = rng.choice(d["subnets"])
+            vnic_id = ocid("vnic", tag, i)
+            d["vnic_attachments"].append(Model(
+                id=ocid("vnicattachment", tag, i), instance_id=inst_id, vnic_id=vnic_id, subnet_id=subnet.id,
+                availability_domain=ad, lifecycle_state="ATTACHED", compartment_id=comp_id))
+            private_ip_id = ocid("privateip", tag, i)
+            d["private_ips"][subnet.id].append(Model(
+                id=private_ip_id, vnic_id=vnic_id, is_primary=True,
+                ip_address=str(ipaddress.ip_address(net_base + 10 + i))))
+            if rng.random() < 0.3:
+                d["public_ips"].append(Model(
+                    id=ocid("publicip", tag, i), scope="AVAILABILITY_DOMAIN", availability_domain=ad,
+                    lifetime="EPHEMERAL", private_ip_id=private_ip_id, assigned_entity_id=private_ip_id,
+                    ip_address=f"203.0.{(i // 256) % 256}.{i % 256}"))
+
+            bv_id = ocid("bootvolume", tag, i)
+            d["boot_volumes"].append(Model(id=bv_id, size_in_gbs=rng.choice([47, 50, 100, 200]),
+                                           availability_domain=ad, lifecycle_state="AVAILABLE"))
+            d["boot_volume_attachments"].append(Model(
+                id=ocid("bootvolumeattachment", tag, i), instance_id=inst_id, boot_volume_id=bv_id,
+                availability_domain=ad, lifecycle_state="ATTACHED"))
+            if rng.random() < 0.7:
+                for b in range(rng.randint(1, 3)):
+                    d["boot_volume_backups"].append(Model(
+                        id=ocid("bootvolumebackup", tag, i, b), boot_volume_id=bv_id, lifecycle_state="AVAILABLE",
+                        time_created=NOW - timedelta(hours=rng.randrange(24 * 30))))
+
+            for v in range(rng.choices([0, 1, 2, 3], [50, 30, 15, 5])[0]):
+                vol_id = ocid("volume", tag, i, v)
+                d["volumes"].append(Model(id=vol_id, size_in_gbs=rng.choice([50, 256, 1024]),
+                                          availability_domain=ad, lifecycle_state="AVAILABLE"))
+                d["volume_attachments"].append(Model(
+                    id=ocid("volumeattachment", tag, i, v), instance_id=inst_id, volume_id=vol_id,
+                    availability_domain=ad, lifecycle_state="ATTACHED"))
+                if rng.random() < 0.5:
+                    d["volume_backups"].append(Model(
+                        id=ocid("volumebackup", tag, i, v), volume_id=vol_id, lifecycle_state="AVAILABLE",
+                        time_created=NOW - timedelta(hours=rng.randrange(24 * 30))))
+
+        # Notification topics, subscriptions and alarms
+        for t in range(rng.randint(0, 3)):
+            topic_id = ocid("onstopic", tag, t)
+            d["topics"].append(Model(
+                topic_id=topic_id, name=f"topic-{t}", lifecycle_state="ACTIVE", description="",
+                time_created=NOW - timedelta(days=rng.randrange(700)), compartment_id=comp_id))
+            for s in range(rng.randint(0, 2)):
+                d["subscriptions"][topic_id].append(Model(
+                    id=ocid("onssubscription", tag, t, s), topic_id=topic_id, protocol="EMAIL",
+                    endpoint=f"ops{s}@example.com", lifecycle_state="ACTIVE",
+                    created_time=int((NOW - timedelta(days=rng.randrange(700))).timestamp() * 1000)))
+        topic_ids = [t.topic_id for t in d["topics"]]
+        for a in range(rng.randint(0, 4)):
+            destination = rng.choice(topic_ids) if topic_ids and rng.random() > 0.05 else ocid("onstopic", tag, "gone", a)
+            d["alarms"].append(Model(id=ocid("alarm", tag, a), display_name=f"alarm-{a}", compartment_id=comp_id,
+                                     destinations=[destination], lifecycle_state="ACTIVE"))
+        return d
+
+    @staticmethod
+    def _rule(rng, direction, region):
+        kind = rng.choices(["tcp", "udp", "icmp", "all"], [70, 10, 10, 10])[0]
+        target = rng.choices(
+            [f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/24", f"10.{rng.randrange(256)}.0.0/16",
+             "0.0.0.0/0", f"all-{region[:3]}-services-in-oracle-services-network"],
+            [60, 20, 15, 5])[0]
+        rule = Model(is_stateless=rng.random() < 0.1, description="" if rng.random() < 0.7 else "synthetic rule")
+        if direction == "ingress":
+            rule.source, rule.source_type = target, "CIDR_BLOCK" if target[0].isdigit() else "SERVICE_CIDR_BLOCK"
+        else:
+            rule.destination = target
+            rule.destination_type = "CIDR_BLOCK" if target[0].isdigit() else "SERVICE_CIDR_BLOCK"
+        if kind in ("tcp", "udp"):
+            lo = rng.choice([22, 53, 80, 443, 1521, 3306, 8000])
+            hi = lo if rng.random() < 0.8 else lo + rng.choice([10, 100, 1000])
+            options = Model(destination_port_range=Model(min=lo, max=hi), source_port_range=None)
+            rule.protocol = "6" if kind == "tcp" else "17"
+            setattr(rule, f"{kind}_options", options)
+        elif kind == "icmp":
+            rule.protocol = "1"
+            rule.icmp_options = Model(type=3, code=rng.choice([4, None]))
+        else:
+            rule.protocol = "all"
+        return rule
+
+    @staticmethod
+    def _user_credentials(user, rng):
+        def age():
+            return NOW - timedelta(days=rng.randrange(400))
+        return {
+            "api_keys": [Model(key_id=f"{user.id}/fp{k}", fingerprint=f"aa:bb:{k:02d}", user_id=user.id,
+                               lifecycle_state="ACTIVE", time_created=age()) for k in range(rng.randint(0, 3))],
+            "auth_tokens": [Model(id=ocid("credential", user.id[-4:], k), description=f"token {k}", user_id=user.id,
+                                  lifecycle_state="ACTIVE", time_created=age()) for k in range(rng.randint(0, 2))],
+            "customer_secret_keys": [Model(id=ocid("credential", user.id[-4:], "s", k), display_name=f"s3 key {k}",
+                                           user_id=user.id, lifecycle_state="ACTIVE", time_created=age())
+                                     for k in range(rng.randint(0, 2))],
+            "smtp_credentials": [Model(id=ocid("credential", user.id[-4:], "m", k), username=f"smtp{k}",
+                                       description="", user_id=user.id, lifecycle_state="ACTIVE",
+                                       time_created=age()) for k in range(rng.randint(0, 1))],
+        }
+
+    # -----------------------------------------------------
+    # Resource Search view of a region
+    # -----------------------------------------------------
+    def search_index(self, region):
+        key = ("search", region)
+        with self._lock:
+            cached = self._data.get(key)
+        if cached is not None:
+            return cached
+
+        kinds = [("instances", "Instance", "id", "display_name"), ("vcns", "Vcn", "id", "display_name"),
+                 ("subnets", "Subnet", "id", "display_name"),
+                 ("security_lists", "SecurityList", "id", "display_name"),
+                 ("boot_volumes", "BootVolume", "id", "id"), ("volumes", "Volume", "id", "id"),
+                 ("boot_volume_backups", "BootVolumeBackup", "id", "id"),
+                 ("volume_backups", "VolumeBackup", "id", "id"),
+                 ("topics", "OnsTopic", "topic_id", "name"), ("alarms", "Alarm", "id", "display_name")]
+        items = []
+        for comp_id, d in self.all_data(region):
+            for attr, resource_type, id_attr, name_attr in kinds:
+                for r in d.get(attr, []):
+                    items.append(Model(
+                        identifier=getattr(r, id_attr), resource_type=resource_type, compartment_id=comp_id,
+                        display_name=getattr(r, name_attr), lifecycle_state=r.lifecycle_state,
+                        time_created=r.time_created or NOW - timedelta(days=30),
+                        defined_tags={"Ops": {"CostCenter": comp_id[-4:]}}, freeform_tags={"env": "synthetic"}))
+        with self._lock:
+            self._data[key] = items
+        return items
+
+
+# ---------------------------------------------------------
+# Structured search query: resource type + where clause
+# ---------------------------------------------------------
+SEARCH_FIELDS = {"identifier": "identifier", "lifecycleState": "lifecycle_state", "timeCreated": "time_created",
+                 "displayName": "display_name", "compartmentId": "compartment_id"}
+TOKEN_RE = re.compile(r"\s*(\(|\)|&&|\|\||!=|>=|<=|=|>|<|'[^']*'|[A-Za-z_.]+)")
+
+
+def parse_search(query):
+    m = re.match(r"\s*query\s+(.+?)\s+resources(?:\s+where\s+(.*))?\s*$", query, re.I | re.S)
+    if not m:
+        raise ValueError(f"unsupported query: {query}")
+    types = {t.strip().lower() for t in m.group(1).split(",")}
+    tokens = TOKEN_RE.findall(m.group(2) or "")
+    predicate = _parse_or(tokens) if tokens else (lambda item: True)
+    return types, predicate
+
+
+def _parse_or(tokens):
+    terms = [_parse_and(tokens)]
+    while tokens and tokens[0] == "||":
+        tokens.pop(0)
+        terms.append(_parse_and(tokens))
+    return lambda item: any(t(item) for t in terms)
+
+
+def _parse_and(tokens):
+    factors = [_parse_factor(tokens)]
+    while tokens and tokens[0] == "&&":
+        tokens.pop(0)
+        factors.append(_parse_factor(tokens))
+    return lambda item: all(f(item) for f in factors)
+
+
+def _parse_factor(tokens):
+    if tokens[0] == "(":
+        tokens.pop(0)
+        inner = _parse_or(tokens)
+        tokens.pop(0)  # ")"
+        return inner
+    field, op, value = tokens.pop(0), tokens.pop(0), tokens.pop(0).strip("'")
+    attr = SEARCH_FIELDS[field]
+    if attr == "time_created":
+        value = datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    compare = {"=": lambda a, b: a == b, "!=": lambda a, b: a != b, ">=": lambda a, b: a >= b,
+               "<=": lambda a, b: a <= b, ">": lambda a, b: a > b, "<": lambda a, b: a < b}[op]
+    return lambda item: compare(getattr(item, attr), value)
+
+
+# ---------------------------------------------------------
+# Fake clients
+# ---------------------------------------------------------
+class FakeBackend:
+    """Call counters, latency and throttling shared by all fake clients."""
+
+    def __init__(self, tenancy, latency_ms=0.0, page_size=PAGE_SIZE, throttle_rate=0.0):
+        self.tenancy = tenancy
+        self.latency = latency_ms / 1000.0
+        self.page_size = page_size
+        self.throttle_rate = throttle_rate
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(tenancy.seed)
+
+    def hit(self, service, operation, region):
+        with self._lock:
+            self.calls[(service, operation, region)] += 1
+            throttled = self.throttle_rate and self._rng.random() < self.throttle_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            raise oci.exceptions.ServiceError(429, "TooManyRequests", {"retry-after": "0"}, "fake throttle")
+
+    def page(self, items, page=None, limit=None):
+        start = int(page or 0)
+        size = min(limit or self.page_size, self.page_size)
+        end = start + size
+        headers = {"opc-request-id": "fake"}
+        if end < len(items):
+            headers["opc-next-page"] = str(end)
+        return Response(200, headers, items[start:end], None)
+
+
+BACKEND = None
+
+
+class FakeClient:
+    def __init__(self, config, **kwargs):
+        self.region = config.get("region")
+        self.retry_strategy = kwargs.get("retry_strategy")
+
+    def _hit(self, operation):
+        BACKEND.hit(type(self).__name__, operation, self.region)
+        return BACKEND.tenancy
+
+    def _page(self, operation, items, kwargs):
+        self._hit(operation)
+        return BACKEND.page(items, kwargs.get("page"), kwargs.get("limit"))
+
+    def _one(self, operation, data):
+        self._hit(operation)
+        return Response(200, {"opc-request-id": "fake"}, data, None)
+
+
+class FakeIdentityClient(FakeClient):
+    def list_compartments(self, compartment_id, compartment_id_in_subtree=False, lifecycle_state=None, **kwargs):
+        t = BACKEND.tenancy
+        items = [c for c in t.compartments
+                 if (compartment_id_in_subtree or c.compartment_id == compartment_id)
+                 and (lifecycle_state is None or c.lifecycle_state == lifecycle_state)]
+        return self._page("list_compartments", items, kwargs)
+
+    def get_compartment(self, compartment_id, **kwargs):
+        t = BACKEND.tenancy
+        comp = t.compartment_by_id.get(compartment_id) or Model(
+            id=t.tenancy_id, name="root", compartment_id=None, description="root", lifecycle_state="ACTIVE")
+        return self._one("get_compartment", comp)
+
+    def list_users(self, compartment_id, **kwargs):
+        return self._page("list_users", BACKEND.tenancy.users, kwargs)
+
+    def list_region_subscriptions(self, tenancy_id, **kwargs):
+        return self._one("list_region_subscriptions",
+                         [Model(region_name=r, status="READY") for r in BACKEND.tenancy.regions])
+
+    # credential listings are not paginated in the SDK
+    def list_api_keys(self, user_id, **kwargs):
+        return self._one("list_api_keys", BACKEND.tenancy.credentials[user_id]["api_keys"])
+
+    def list_auth_tokens(self, user_id, **kwargs):
+        return self._one("list_auth_tokens", BACKEND.tenancy.credentials[user_id]["auth_tokens"])
+
+    def list_customer_secret_keys(self, user_id, **kwargs):
+        return self._one("list_customer_secret_keys", BACKEND.tenancy.credentials[user_id]["customer_secret_keys"])
+
+    def list_smtp_credentials(self, user_id, **kwargs):
+        return self._one("list_smtp_credentials", BACKEND.tenancy.credentials[user_id]["smtp_credentials"])
+
+
+class FakeComputeClient(FakeClient):
+    def _data(self, compartment_id):
+        return BACKEND.tenancy.data(self.region, compartment_id)
+
+    def list_instances(self, compartment_id, **kwargs):
+        return self._page("list_instances", self._data(compartment_id)["instances"], kwargs)
+
+    def list_shapes(self, compartment_id, **kwargs):
+        shapes = [Model(shape=s, ocpus=o, memory_in_gbs=m) for s, o, m in SHAPES]
+        return self._page("list_shapes", shapes, kwargs)
+
+    def list_vnic_attachments(self, compartment_id, **kwargs):
+        return self._page("list_vnic_attachments", self._data(compartment_id)["vnic_attachments"], kwargs)
+
+    def list_boot_volume_attachments(self, availability_domain, compartment_id, **kwargs):
+        items = [a for a in self._data(compartment_id)["boot_volume_attachments"]
+                 if a.availability_domain == availability_domain]
+        return self._page("list_boot_volume_attachments", items, kwargs)
+
+    def list_volume_attachments(self, compartment_id, **kwargs):
+        return self._page("list_volume_attachments", self._data(compartment_id)["volume_attachments"], kwargs)
+
+
+class FakeBlockstorageClient(FakeClient):
+    def _data(self, compartment_id):
+        return BACKEND.tenancy.data(self.region, compartment_id)
+
+    def list_boot_volumes(self, availability_domain=None, compartment_id=None, **kwargs):
+        return self._page("list_boot_volumes", self._data(compartment_id)["boot_volumes"], kwargs)
+
+    def get_boot_volume(self, boot_volume_id, **kwargs):
+        self._hit("get_boot_volume")
+        raise oci.exceptions.ServiceError(404, "NotAuthorizedOrNotFound", {}, "boot volume not found")
+
+    def list_boot_volume_backups(self, compartment_id, **kwargs):
+        return self._page("list_boot_volume_backups", self._data(compartment_id)["boot_volume_backups"], kwargs)
+
+    def list_volume_backups(self, compartment_id, **kwargs):
+        return self._page("list_volume_backups", self._data(compartment_id)["volume_backups"], kwargs)
+
+
+class FakeVirtualNetworkClient(FakeClient):
+    def _data(self, compartment_id):
+        return BACKEND.tenancy.data(self.region, compartment_id)
+
+    def list_vcns(self, compartment_id, **kwargs):
+        return self._page("list_vcns", self._data(compartment_id)["vcns"], kwargs)
+
+    def list_subnets(self, compartment_id, vcn_id=None, **kwargs):
+        items = [s for s in self._data(compartment_id)["subnets"] if vcn_id is None or s.vcn_id == vcn_id]
+        return self._page("list_subnets", items, kwargs)
+
+    def list_security_lists(self, compartment_id, vcn_id=None, **kwargs):
+        items = [s for s in self._data(compartment_id)["security_lists"] if vcn_id is None or s.vcn_id == vcn_id]
+        return self._page("list_security_lists", items, kwargs)
+
+    def list_private_ips(self, subnet_id=None, **kwargs):
+        self._hit("list_private_ips")
+        for _, d in BACKEND.tenancy.all_data(self.region):
+            if subnet_id in d["private_ips"]:
+                return BACKEND.page(d["private_ips"][subnet_id], kwargs.get("page"), kwargs.get("limit"))
+        return BACKEND.page([], kwargs.get("page"), kwargs.get("limit"))
+
+    def list_public_ips(self, scope, compartment_id, availability_domain=None, **kwargs):
+        items = [p for p in self._data(compartment_id)["public_ips"]
+                 if p.scope == scope and (availability_domain is None or p.availability_domain == availability_domain)]
+        return self._page("list_public_ips", items, kwargs)
+
+
+class FakeNotificationControlPlaneClient(FakeClient):
+    def list_topics(self, compartment_id, **kwargs):
+        return self._page("list_topics", BACKEND.tenancy.data(self.region, compartment_id)["topics"], kwargs)
+
+
+class FakeNotificationDataPlaneClient(FakeClient):
+    def list_subscriptions(self, compartment_id, topic_id=None, **kwargs):
+        subs = BACKEND.tenancy.data(self.region, compartment_id)["subscriptions"]
+        items = subs.get(topic_id, []) if topic_id else [s for v in subs.values() for s in v]
+        return self._page("list_subscriptions", items, kwargs)
+
+
+class FakeMonitoringClient(FakeClient):
+    def list_alarms(self, compartment_id, **kwargs):
+        return self._page("list_alarms", BACKEND.tenancy.data(self.region, compartment_id)["alarms"], kwargs)
+
+
+class FakeResourceSearchClient(FakeClient):
+    def search_resources(self, search_details, **kwargs):
+        types, predicate = parse_search(search_details.query)
+        items = [
+            r for r in BACKEND.tenancy.search_index(self.region)
+            if ("all" in types or r.resource_type.lower() in types) and predicate(r)
+        ]
+        response = self._page("search_resources", items, kwargs)
+        response.data = Model(items=response.data)
+        return response
+
+
+FAKES = [
+    (oci.identity, "IdentityClient", FakeIdentityClient),
+    (oci.core, "ComputeClient", FakeComputeClient),
+    (oci.core, "BlockstorageClient", FakeBlockstorageClient),
+    (oci.core, "VirtualNetworkClient", FakeVirtualNetworkClient),
+    (oci.ons, "NotificationControlPlaneClient", FakeNotificationControlPlaneClient),
+    (oci.ons, "NotificationDataPlaneClient", FakeNotificationDataPlaneClient),
+    (oci.monitoring, "MonitoringClient", FakeMonitoringClient),
+    (oci.resource_search, "ResourceSearchClient", FakeResourceSearchClient),
+]
+
+
+def fake_config(tenancy):
+    return {
+        "tenancy": tenancy.tenancy_id,
+        "user": tenancy.users[0].id if tenancy.users else ocid("user", 0),
+        "region": tenancy.regions[0],
+        "regions": ",".join(tenancy.regions),
+        "fingerprint": "aa:bb",
+    }
+
+
+# ---------------------------------------------------------
+# Install / uninstall
+# ---------------------------------------------------------
+@contextmanager
+def install(tenancy, latency_ms=0.0, page_size=PAGE_SIZE, throttle_rate=0.0):
+    """Serve tenancy through the SDK client classes and oci.config.from_file until exit."""
+    global BACKEND
+    saved = [(module, name, getattr(module, name)) for module, name, _ in FAKES]
+    saved_from_file = oci.config.from_file
+    BACKEND = FakeBackend(tenancy, latency_ms, page_size, throttle_rate)
+    try:
+        for module, name, fake in FAKES:
+            # keep the real class name so pool / metrics keys read the same as against OCI
+            setattr(module, name, type(name, (fake,), {}))
+        oci.config.from_file = lambda *args, **kwargs: fake_config(tenancy)
+        yield BACKEND
+    finally:
+        for module, name, original in saved:
+            setattr(module, name, original)
+        oci.config.from_file = saved_from_file
+        BACKEND = None
@@ -1,96 +1,167 @@
+import time
 import oci
 from prettytable import PrettyTable
+from compartmentcache import get_compartment_paths
+from clientpool import ClientPool, load_config
+from apiguard import skip
+from inventorystore import INVENTORY_MODE, open_store, replace_rows, finish_rows, load_rows, changed_compartments
+from instanceindex import (
+    build_boot_attachment_index,
+    build_volume_attachment_index,
+    build_boot_backup_index,
+    build_volume_backup_index,
+)
+from records import list_records, instance_record, intern
 
 
-# -------------------------------------------
-# Build Full Compartment Path (Hierarchy)
-# -------------------------------------------
-def build_compartment_path(comp_id, comp_map):
-    path = []
-    while comp_id:
-        comp = comp_map.get(comp_id)
-        if not comp:
-            break
-        path.append(comp.name)
-        comp_id = comp.compartment_id
-    return " / ".join(reversed(path))
+# Resource types whose changes make refresh mode re-collect a compartment
+BACKUP_RESOURCE_TYPES = {"Instance", "BootVolume", "Volume", "BootVolumeBackup", "VolumeBackup"}
 
 
 # -------------------------------------------
 # Get Latest Backup
 # -------------------------------------------
-def get_latest_backup(backups):
-    if not backups:
+def get_latest_backup(latest_backups, volume_id):
+    if latest_backups is None:
+        return "No Permission"
+    latest = latest_backups.get(volume_id)
+    if not latest:
         return "No Backup"
-    latest = max(backups, key=lambda b: b.time_created)
-    return latest.time_created.strftime("%Y-%m-%d %H:%M")
+    return intern(latest.strftime("%Y-%m-%d %H:%M"))
 
 
 # -------------------------------------------
-# Boot Volume Backup Info
+# Backup Index for a Compartment
 # -------------------------------------------
-def get_boot_volume_backup(block, boot_volume_id, compartment_id):
+def load_backup_index(build_index, block, compartment_id):
     try:
-        backups = block.list_boot_volume_backups(
-            compartment_id=compartment_id,
-            boot_volume_id=boot_volume_id
-        ).data
-        return "Yes", get_latest_backup(backups)
-    except:
-        return "Yes", "No Permission"
+        return build_index(block, compartment_id)
+    except Exception as e:
+        # Shown as "No Permission"; anything else is a real gap in the report
+        if getattr(e, "status", None) not in (401, 403, 404):
+            skip(f"backups of {compartment_id}", e)
+        return None
 
 
 # -------------------------------------------
-# Block Volume Backup Info
+# Process Region
 # -------------------------------------------
-def get_block_volume_backup(block, volume_id, compartment_id):
-    try:
-        backups = block.list_volume_backups(
-            compartment_id=compartment_id,
-            volume_id=volume_id
-        ).data
-        return "Yes", get_latest_backup(backups)
-    except:
-        return "Yes", "No Permission"
+def process_region(region, pool, comp_paths, store=None):
+    print(f"\n===== REGION: {region} =====")
 
+    # read = report from the local inventory without any API call
+    if store is not None and INVENTORY_MODE == "read":
+        print(build_region_table(load_rows(store, "backups", region)))
+        return
 
-# -------------------------------------------
-# Get All Compartments Recursively
-# -------------------------------------------
-def get_all_compartments(identity, tenancy_id):
-    all_compartments = []
-    result = oci.pagination.list_call_get_all_results(
-        identity.list_compartments,
-        tenancy_id,
-        compartment_id_in_subtree=True
-    )
-    all_compartments.extend(result.data)
-    return all_compartments
+    # refresh = only compartments whose instances / volumes / backups changed (None: all)
+    comp_ids = None
+    if store is not None and INVENTORY_MODE == "refresh":
+        comp_ids = changed_compartments(store, pool, "backups", region, BACKUP_RESOURCE_TYPES)
+    started = time.time()  # the stored rows reflect every change synced before this
+    if comp_ids is not None:
+        comp_paths = {cid: comp_paths[cid] for cid in comp_ids if cid in comp_paths}
+
+    with pool.client(oci.core.ComputeClient, region) as compute, \
+            pool.client(oci.core.BlockstorageClient, region) as block:
+        collected, failed = collect_region_rows(compute, block, comp_paths)
+
+    if store is None:
+        rows = [row for _, _, row in collected]
+    else:
+        # compartments that failed keep their stored rows, and are revisited on the next refresh
+        visited = set(comp_paths) if comp_ids is None else comp_ids
+        replace_rows(store, "backups", region, collected, visited - failed)
+        finish_rows(store, "backups", region, visited if comp_ids is None else None, None if failed else started)
+        rows = load_rows(store, "backups", region)
+
+    print(build_region_table(rows))
 
 
 # -------------------------------------------
-# Process Region
+# Collect Region Rows
 # -------------------------------------------
-def process_region(region, config):
-    print(f"\n===== REGION: {region} =====")
+def collect_region_rows(compute, block, comp_paths):
+    """Returns ([(compartment_id, instance_id, row)], compartments that could not be listed)."""
+    collected = []
+    failed = set()
+
+    # Walk ALL compartments; attachments and backups are listed once per compartment
+    for comp_id in comp_paths:
+        try:
+            insts = list_records(
+                compute.list_instances,
+                instance_record,
+                compartment_id=comp_id
+            )
+        except Exception as e:
+            skip(f"instances of {comp_paths.get(comp_id) or comp_id}", e)
+            failed.add(comp_id)
+            continue
+
+        if not insts:
+            continue
+
+        boot_volumes = build_boot_attachment_index(
+            compute, comp_id, {i.availability_domain for i in insts}
+        )
+        block_volumes = build_volume_attachment_index(compute, comp_id)
+
+        # Newest backup per source volume, None when the listing is not permitted
+        boot_backups = load_backup_index(build_boot_backup_index, block, comp_id)
+        block_backups = load_backup_index(build_volume_backup_index, block, comp_id)
 
-    config["region"] = region
-    compute = oci.core.ComputeClient(config)
-    network = oci.core.VirtualNetworkClient(config)
-    block = oci.core.BlockstorageClient(config)
-    identity = oci.identity.IdentityClient(config)
+        comp_path = comp_paths.get(comp_id, "")
 
-    tenancy_id = config["tenancy"]
+        # Process each instance
+        for inst in insts:
+            collected.append((comp_id, inst.id, backup_row(
+                inst, comp_path, boot_volumes, block_volumes, boot_backups, block_backups
+            )))
 
-    # Get all compartments
-    compartments = get_all_compartments(identity, tenancy_id)
-    comp_map = {c.id: c for c in compartments}
+    return collected, failed
 
-    # Add tenancy (root)
-    #comp_map[tenancy_id] = identity.get_tenancy(tenancy_id).data
-    comp_map[tenancy_id] = None
 
-    # Build table
+# -------------------------------------------
+# Row of one instance
+# -------------------------------------------
+def backup_row(inst, comp_path, boot_volumes, block_volumes, boot_backups, block_backups):
+    # --- Boot Volume ---
+    boot_volume_id = boot_volumes.get(inst.id)
+
+    if boot_volume_id:
+        boot_attached = "Yes"
+        boot_backup_time = get_latest_backup(boot_backups, boot_volume_id)
+    else:
+        boot_attached = "No"
+        boot_backup_time = "N/A"
+
+    # --- Block Volumes (every attached volume, one line each) ---
+    volume_ids = block_volumes.get(inst.id, [])
+
+    if volume_ids:
+        block_attached = "Yes" if len(volume_ids) == 1 else f"Yes ({len(volume_ids)})"
+        block_backup_time = "\n".join(
+            get_latest_backup(block_backups, volume_id) for volume_id in volume_ids
+        )
+    else:
+        block_attached = "No"
+        block_backup_time = "N/A"
+
+    return [
+        inst.display_name,
+        comp_path,
+        boot_attached,
+        boot_backup_time,
+        block_attached,
+        block_backup_time
+    ]
+
+
+# -------------------------------------------
+# Build Region Table
+# -------------------------------------------
+def build_region_table(rows):
     table = PrettyTable()
     table.field_names = [
         "Instance",
@@ -101,80 +172,32 @@ def process_region(region, config):
         "Block Backup"
     ]
 
-    # Collect instances from ALL compartments
-    all_instances = []
-
-    for comp in compartments + [comp_map[tenancy_id]]:
-        try:
-            insts = compute.list_instances(
-                compartment_id=comp.id
-            ).data
-            all_instances.extend(insts)
-        except:
-            continue
-
-    # Process each instance
-    for inst in all_instances:
-
-        comp_path = build_compartment_path(inst.compartment_id, comp_map)
-
-        # --- Boot Volume ---
-        bvas = compute.list_boot_volume_attachments(
-            availability_domain=inst.availability_domain,
-            compartment_id=inst.compartment_id,
-            instance_id=inst.id
-        ).data
-
-        if bvas:
-            boot_attached = "Yes"
-            bv = bvas[0]
-            boot_backup_yesno, boot_backup_time = get_boot_volume_backup(
-                block, bv.boot_volume_id, inst.compartment_id
-            )
-        else:
-            boot_attached = "No"
-            boot_backup_time = "N/A"
-
-        # --- Block Volumes ---
-        vas = compute.list_volume_attachments(
-            availability_domain=inst.availability_domain,
-            compartment_id=inst.compartment_id,
-            instance_id=inst.id
-        ).data
-
-        if vas:
-            block_attached = "Yes"
-            va = vas[0]
-            block_backup_yesno, block_backup_time = get_block_volume_backup(
-                block, va.volume_id, inst.compartment_id
-            )
-        else:
-            block_attached = "No"
-            block_backup_time = "N/A"
-
-        # Add row
-        table.add_row([
-            inst.display_name,
-            comp_path,
-            boot_attached,
-            boot_backup_time,
-            block_attached,
-            block_backup_time
-        ])
+    for row in rows:
+        table.add_row(row)
 
-    print(table)
+    return table
 
 
 # -------------------------------------------
 # Main
 # -------------------------------------------
 def main():
-    config = oci.config.from_file("~/.oci/config", "DEFAULT")
+    config = load_config()
 
     regions = ["us-ashburn-1", "us-phoenix-1"]
 
+    # Clients are pooled per region (one signer, reused HTTP sessions)
+    pool = ClientPool(config)
+
+    # Compartment tree is fetched once (shared on-disk cache), not per region
+    with pool.client(oci.identity.IdentityClient) as identity:
+        comp_paths = get_compartment_paths(identity, config["tenancy"], sep=" / ", root_name="")
+
+    # Local inventory (DBASCRIPTS_INVENTORY); off = live APIs only
+    store = open_store(config["tenancy"]) if INVENTORY_MODE != "off" else None
+
     for region in regions:
-        process_region(region, config)
+        process_region(region, pool, comp_paths, store)
 
 
 if __name__ == "__main__":
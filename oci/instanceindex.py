@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Compartment-level lookup indexes for instance inventories.
+
+Instead of asking the API about every instance, each index is built from a
+few listings per compartment and then joined to the instances in memory.
+Listings are streamed page by page and only the IDs the index needs are
+kept, never the SDK models.
+"""
+from collections import defaultdict
+
+from oci.pagination import list_call_get_all_results_generator
+
+from apiguard import skip
+
+
+# ---------------------------------------------------------
+# VNIC index: instance_id -> (private IPs, public IPs)
+# ---------------------------------------------------------
+def build_vnic_index(compute, network, compartment_id):
+    """
+    One list_vnic_attachments call for the compartment, one list_private_ips
+    per subnet in use and one list_public_ips per scope / availability
+    domain, instead of list_vnic_attachments + get_vnic for every instance.
+
+    Only the primary private IP of each VNIC is reported (what get_vnic
+    returns as private_ip). Public IPs are matched through the private IP
+    they are assigned to; a reserved public IP kept in another compartment
+    is not seen here.
+    """
+    attachments = list_call_get_all_results_generator(
+        compute.list_vnic_attachments,
+        "record",
+        compartment_id=compartment_id
+    )
+
+    instance_vnics = defaultdict(list)
+    vnic_ids = set()
+    subnet_ids = set()
+    ads = set()
+    for att in attachments:
+        if att.lifecycle_state != "ATTACHED" or not att.vnic_id:
+            continue
+        instance_vnics[att.instance_id].append(att.vnic_id)
+        vnic_ids.add(att.vnic_id)
+        subnet_ids.add(att.subnet_id)
+        ads.add(att.availability_domain)
+
+    # Primary private IP per VNIC, listed once per subnet
+    primary_ip = {}
+    private_ip_vnic = {}
+    for subnet_id in subnet_ids:
+        try:
+            for pip in list_call_get_all_results_generator(
+                network.list_private_ips,
+                "record",
+                subnet_id=subnet_id
+            ):
+                if pip.is_primary and pip.vnic_id in vnic_ids:
+                    primary_ip[pip.vnic_id] = pip.ip_address
+                    private_ip_vnic[pip.id] = pip.vnic_id
+        except Exception as e:
+            skip(f"private IPs of subnet {subnet_id}", e)
+            continue
+
+    # Public IPs: reserved ones are regional, ephemeral ones live in an AD
+    public_ip = {}
+    scopes = [("REGION", None)] + [("AVAILABILITY_DOMAIN", ad) for ad in sorted(ads)]
+    for scope, ad in scopes:
+        kwargs = {"availability_domain": ad} if ad else {}
+        try:
+            for ip in list_call_get_all_results_generator(
+                network.list_public_ips,
+                "record",
+                scope,
+                compartment_id,
+                **kwargs
+            ):
+                private_ip_id = getattr(ip, "assigned_entity_id", None) or getattr(ip, "private_ip_id", None)
+                vnic_id = private_ip_vnic.get(private_ip_id)
+                if vnic_id:
+                    public_ip[vnic_id] = ip.ip_address
+        except Exception as e:
+            skip(f"{scope.lower()} public IPs of {compartment_id}", e)
+            continue
+
+    index = {}
+    for instance_id, vnics in instance_vnics.items():
+        index[instance_id] = (
+            [primary_ip[v] for v in vnics if v in primary_ip],
+            [public_ip[v] for v in vnics if v in public_ip],
+        )
+    return index
+
+
+# ---------------------------------------------------------
+# Boot volume attachments: instance_id -> boot_volume_id
+# ---------------------------------------------------------
+def build_boot_attachment_index(compute, compartment_id, availability_domains):
+    """
+    One list_boot_volume_attachments listing per (compartment, AD) instead
+    of one per instance. Detached boot volumes are ignored.
+    """
+    index = {}
+    for ad in sorted(set(availability_domains)):
+        for att in list_call_get_all_results_generator(
+            compute.list_boot_volume_attachments,
+            "record",
+            ad,
+            compartment_id
+        ):
+            if att.lifecycle_state in ("DETACHING", "DETACHED"):
+                continue
+            index.setdefault(att.instance_id, att.boot_volume_id)
+    return index
+
+
+# ---------------------------------------------------------
+# Boot volume index: instance_id -> (boot_volume_id, size_in_gbs)
+# ---------------------------------------------------------
+def build_boot_volume_index(compute, block, compartment_id, availability_domains):
+    """
+    Boot volumes are listed once for the compartment; only a volume kept in
+    another compartment than its instance falls back to get_boot_volume.
+    """
+    attachments = build_boot_attachment_index(compute, compartment_id, availability_domains)
+    if not attachments:
+        return {}
+
+    sizes = {
+        bv.id: bv.size_in_gbs
+        for bv in list_call_get_all_results_generator(
+            block.list_boot_volumes,
+            "record",
+            compartment_id=compartment_id
+        )
+    }
+
+    for bv_id in set(attachments.values()) - set(sizes):
+        try:
+            sizes[bv_id] = block.get_boot_volume(bv_id).data.size_in_gbs
+        except Exception as e:
+            skip(f"boot volume {bv_id}", e)
+            continue
+
+    return {
+        instance_id: (bv_id, sizes.get(bv_id))
+        for instance_id, bv_id in attachments.items()
+    }
+
+
+# ---------------------------------------------------------
+# Block volume attachments: instance_id -> [volume_id, ...]
+# ---------------------------------------------------------
+def build_volume_attachment_index(compute, compartment_id):
+    """
+    Every attached block volume of every instance in the compartment, from
+    one paginated list_volume_attachments listing.
+    """
+    index = defaultdict(list)
+    for att in list_call_get_all_results_generator(
+        compute.list_volume_attachments,
+        "record",
+        compartment_id
+    ):
+        if att.lifecycle_state in ("DETACHING", "DETACHED"):
+            continue
+        index[att.instance_id].append(att.volume_id)
+    return dict(index)
+
+
+# ---------------------------------------------------------
+# Latest backup per source volume
+# ---------------------------------------------------------
+def latest_backup_index(list_func, compartment_id, volume_attr):
+    """
+    Stream every backup of the compartment once and keep only the newest
+    time_created per source volume, instead of pulling each volume's full
+    backup history.
+    """
+    latest = {}
+    for backup in list_call_get_all_results_generator(list_func, "record", compartment_id):
+        volume_id = getattr(backup, volume_attr)
+        if volume_id is None:
+            continue
+        current = latest.get(volume_id)
+        if current is None or backup.time_created > current:
+            latest[volume_id] = backup.time_created
+    return latest
+
+
+def build_boot_backup_index(block, compartment_id):
+    return latest_backup_index(block.list_boot_volume_backups, compartment_id, "boot_volume_id")
+
+
+def build_volume_backup_index(block, compartment_id):
+    return latest_backup_index(block.list_volume_backups, compartment_id, "volume_id")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Instance discovery through Resource Search.
+
+Calling list_instances on every compartment mostly returns nothing. One
+structured search per region returns every instance with its compartment
+in a few pages, so the scanners only visit compartments that have
+instances. The per-compartment scan stays available as a fallback.
+"""
+import os
+
+import oci
+from oci.pagination import list_call_get_all_results_generator
+
+from rowwriter import note
+from scanscheduler import run_scan
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+DISCOVERY_MODE = os.environ.get("DBASCRIPTS_DISCOVERY", "search")  # Options: search, scan
+
+
+# ---------------------------------------------------------
+# Compartments that hold at least one instance in a region
+# ---------------------------------------------------------
+def search_instance_compartments(search_client):
+    search_details = oci.resource_search.models.StructuredSearchDetails(
+        query="query instance resources",
+        type="Structured",
+        matching_context_type="NONE"
+    )
+    return {
+        item.compartment_id
+        for item in list_call_get_all_results_generator(
+            search_client.search_resources,
+            "record",
+            search_details
+        )
+    }
+
+
+def find_region_compartments(pool, region):
+    """Compartments with instances in region, or None (every compartment) when the search fails."""
+    try:
+        with pool.client(oci.resource_search.ResourceSearchClient, region) as search_client:
+            return search_instance_compartments(search_client)
+    except Exception as e:
+        note(f"Resource Search failed in {region}, scanning every compartment: {e}")
+        return None
+
+
+# ---------------------------------------------------------
+# Build (region, compartment_id, compartment_path) work items
+# ---------------------------------------------------------
+def discover_work(pool, regions, comp_paths, mode=DISCOVERY_MODE):
+    """
+    In "search" mode only compartments reported by Resource Search are
+    kept; a region whose search fails falls back to every compartment.
+    The search index trails the API by a short delay, so an instance
+    launched seconds ago may be missed until the next run - use "scan"
+    when that matters.
+    """
+    found = {}
+    if mode == "search":
+        for (region,), comp_ids, _ in run_scan([(r,) for r in regions],
+                                               lambda it: find_region_compartments(pool, it[0])):
+            found[region] = comp_ids
+
+    work = []
+    for region in regions:
+        comp_ids = found.get(region)
+        for comp_id, comp_path in comp_paths.items():
+            if comp_ids is None or comp_id in comp_ids:
+                work.append((region, comp_id, comp_path))
+    return work
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Local SQLite inventory shared by the OCI scripts.
+
+Two kinds of data live in one WAL-mode database per tenancy
+(INVENTORY_DIR/inventory_<tenancy OCID>.db), so runs for different
+profiles never touch each other's rows:
+
+    resources    one row per OCID from Resource Search (type, region,
+                 compartment, name, state, tags), indexed by OCID,
+                 compartment and region
+    report_rows  the rows a collector produced (instances, backups,
+                 security lists), stored per (report, region, compartment)
+    tombstones   the old compartment of resources that were removed or
+                 moved, kept for FULL_SYNC_INTERVAL
+
+A refresh does not re-read the tenancy. Between full sweeps, a region is
+synced with one search for resources created since the last sync or
+sitting in a non-steady state. Resources the store last saw in a
+non-steady state are re-read by identifier. Every report keeps its own
+cursor (the start of its last collection): a collector only revisits the
+compartments whose resources changed, or lost a resource, after that
+cursor, whichever sync (another report's refresh, a full sweep) noticed
+the change. Reports are read back from the store.
+
+A steady -> steady change (a rename, a tag edit) or the disappearance of
+a resource that never showed up in a non-steady state is only seen by the
+periodic full sweep (FULL_SYNC_INTERVAL).
+
+DBASCRIPTS_INVENTORY selects how the collectors use the store:
+    off      live APIs only, nothing stored (default)
+    write    live APIs, results written through to the store
+    refresh  incremental sync, then re-collect changed compartments only
+    read     report straight from the store, no API calls
+"""
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import oci
+from oci.pagination import list_call_get_all_results_generator
+
+from compartmentcache import CACHE_DIR
+from rowwriter import note
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+INVENTORY_DIR = os.path.expanduser(os.environ.get("DBASCRIPTS_INVENTORY_DIR", CACHE_DIR))
+INVENTORY_MODE = os.environ.get("DBASCRIPTS_INVENTORY", "off")  # Options: off, write, refresh, read
+FULL_SYNC_INTERVAL = int(os.environ.get("DBASCRIPTS_INVENTORY_FULL_SYNC", "21600"))  # seconds between full sweeps
+
+SEARCH_LAG = 300  # the search index trails the APIs; re-read this many seconds before the last sync
+STEADY_STATES = ("ACTIVE", "AVAILABLE", "RUNNING")
+IDENTIFIER_BATCH = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    ocid            TEXT PRIMARY KEY,
+    resource_type   TEXT NOT NULL,
+    region          TEXT NOT NULL,
+    compartment_id  TEXT,
+    display_name    TEXT,
+    lifecycle_state TEXT,
+    time_created    TEXT,
+    defined_tags    TEXT,
+    freeform_tags   TEXT,
+    synced_at       REAL NOT NULL   -- sync that last saw the resource change
+);
+CREATE INDEX IF NOT EXISTS resources_compartment ON resources (compartment_id);
+CREATE INDEX IF NOT EXISTS resources_region_type ON resources (region, resource_type);
+
+CREATE TABLE IF NOT EXISTS report_rows (
+    report          TEXT NOT NULL,
+    region          TEXT NOT NULL,
+    compartment_id  TEXT NOT NULL,
+    ocid            TEXT,
+    row             TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS report_rows_scope ON report_rows (report, region, compartment_id);
+CREATE INDEX IF NOT EXISTS report_rows_ocid ON report_rows (ocid);
+
+CREATE TABLE IF NOT EXISTS tombstones (
+    ocid            TEXT NOT NULL,
+    resource_type   TEXT NOT NULL,
+    region          TEXT NOT NULL,
+    compartment_id  TEXT,
+    removed_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tombstones_region ON tombstones (region, removed_at);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    region          TEXT NOT NULL,
+    scope           TEXT NOT NULL,
+    synced_at       REAL NOT NULL,
+    PRIMARY KEY (region, scope)
+);
+"""
+
+
+# ---------------------------------------------------------
+# Open
+# ---------------------------------------------------------
+def db_path(tenancy_id):
+    return os.path.join(INVENTORY_DIR, f"inventory_{tenancy_id}.db")
+
+
+def open_store(tenancy_id):
+    path = db_path(tenancy_id)
+    os.makedirs(INVENTORY_DIR, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")    # readers never block the cron writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def get_synced_at(conn, region, scope):
+    row = conn.execute("SELECT synced_at FROM sync_state WHERE region = ? AND scope = ?",
+                       (region, scope)).fetchone()
+    return row[0] if row else None
+
+
+def set_synced_at(conn, region, scope, synced_at):
+    conn.execute("INSERT INTO sync_state (region, scope, synced_at) VALUES (?, ?, ?) "
+                 "ON CONFLICT (region, scope) DO UPDATE SET synced_at = excluded.synced_at",
+                 (region, scope, synced_at))
+
+
+# ---------------------------------------------------------
+# Resources (Resource Search summaries)
+# ---------------------------------------------------------
+def resource_record(region, item):
+    return (
+        item.identifier,
+        item.resource_type,
+        region,
+        item.compartment_id,
+        item.display_name,
+        item.lifecycle_state,
+        item.time_created.isoformat() if item.time_created else None,
+        json.dumps(item.defined_tags or {}, sort_keys=True),
+        json.dumps(item.freeform_tags or {}, sort_keys=True),
+    )
+
+
+def upsert_resources(conn, records, synced_at):
+    conn.executemany(
+        "INSERT INTO resources (ocid, resource_type, region, compartment_id, display_name, lifecycle_state,"
+        " time_created, defined_tags, freeform_tags, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (ocid) DO UPDATE SET resource_type = excluded.resource_type, region = excluded.region,"
+        " compartment_id = excluded.compartment_id, display_name = excluded.display_name,"
+        " lifecycle_state = excluded.lifecycle_state, time_created = excluded.time_created,"
+        " defined_tags = excluded.defined_tags, freeform_tags = excluded.freeform_tags,"
+        " synced_at = excluded.synced_at",
+        [r + (synced_at,) for r in records]
+    )
+
+
+def load_resources(conn, region=None, resource_type=None, compartment_id=None):
+    clauses, params = [], []
+    for column, value in (("region", region), ("resource_type", resource_type),
+                          ("compartment_id", compartment_id)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(r) for r in conn.execute(f"SELECT * FROM resources{where} ORDER BY rowid", params)]
+    finally:
+        conn.row_factory = None
+
+
+# ---------------------------------------------------------
+# Sync one region from Resource Search
+# ---------------------------------------------------------
+def search(search_client, query):
+    details = oci.resource_search.models.StructuredSearchDetails(
+        query=query,
+        type="Structured",
+        matching_context_type="NONE"
+    )
+    return list_call_get_all_results_generator(search_client.search_resources, "record", details)
+
+
+def search_time(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def sync_region(conn, search_client, region, full=False):
+    """
+    Bring the region's resources up to date; returns the changed rows as
+    (ocid, resource_type, compartment_id) - old and new compartment on a move.
+    """
+    now = time.time()
+    last = get_synced_at(conn, region, "search")
+    full = full or last is None or now - last > FULL_SYNC_INTERVAL
+
+    stored = {
+        r[0]: r[1:]
+        for r in conn.execute(
+            "SELECT ocid, resource_type, compartment_id, display_name, lifecycle_state, time_created,"
+            " defined_tags, freeform_tags FROM resources WHERE region = ?", (region,))
+    }
+
+    if full:
+        items = search(search_client, "query all resources")
+    else:
+        unsteady = " && ".join(f"lifecycleState != '{s}'" for s in STEADY_STATES)
+        items = search(search_client,
+                       f"query all resources where timeCreated >= '{search_time(last - SEARCH_LAG)}'"
+                       f" || ({unsteady})")
+
+    records = {}
+    settled = []
+    for item in items:
+        record = resource_record(region, item)
+        records[record[0]] = record
+
+    if not full:
+        # resources last seen mid-transition that are no longer: re-read them by identifier
+        settled.extend(ocid for ocid, s in stored.items() if s[3] not in STEADY_STATES and ocid not in records)
+        for i in range(0, len(settled), IDENTIFIER_BATCH):
+            batch = settled[i:i + IDENTIFIER_BATCH]
+            query = "query all resources where " + " || ".join(f"identifier = '{ocid}'" for ocid in batch)
+            for item in search(search_client, query):
+                record = resource_record(region, item)
+                records[record[0]] = record
+
+    changed = []
+    left = []  # (ocid, resource_type, compartment_id) a resource is no longer in
+    for ocid, record in records.items():
+        old = stored.get(ocid)
+        if old != (record[1],) + record[3:]:
+            changed.append((ocid, record[1], record[3]))
+            if old and old[1] != record[3]:
+                left.append((ocid, old[0], old[1]))
+
+    # a full sweep is authoritative: whatever it did not return is gone
+    if full:
+        removed = [ocid for ocid in stored if ocid not in records]
+    else:
+        removed = [ocid for ocid in settled if ocid not in records]
+    left.extend((ocid, stored[ocid][0], stored[ocid][1]) for ocid in removed)
+
+    with conn:
+        upsert_resources(conn, [records[ocid] for ocid, _, _ in changed], now)
+        conn.executemany("DELETE FROM resources WHERE ocid = ?", [(ocid,) for ocid in removed])
+        # a report whose cursor is older than FULL_SYNC_INTERVAL collects in full, so older tombstones are unused
+        conn.executemany("INSERT INTO tombstones (ocid, resource_type, region, compartment_id, removed_at)"
+                         " VALUES (?, ?, ?, ?, ?)", [(ocid, rtype, region, cid, now) for ocid, rtype, cid in left])
+        conn.execute("DELETE FROM tombstones WHERE removed_at < ?", (now - FULL_SYNC_INTERVAL,))
+        set_synced_at(conn, region, "search", now)
+
+    return changed + left
+
+
+def sync_region_with_pool(conn, pool, region, full=False):
+    with pool.client(oci.resource_search.ResourceSearchClient, region) as search_client:
+        return sync_region(conn, search_client, region, full)
+
+
+# ---------------------------------------------------------
+# Report rows written by the collectors
+# ---------------------------------------------------------
+def replace_rows(conn, report, region, rows, compartment_ids=None, collected_at=None):
+    """
+    rows: (compartment_id, ocid, row dict). Replaces the whole region, or
+    only compartment_ids when given (an incremental re-collection).
+
+    collected_at, the start of the collection (after its sync), becomes the
+    report's cursor. None keeps the cursor, e.g. when some compartments of
+    an incremental re-collection failed and must be revisited next time.
+    """
+    with conn:
+        if compartment_ids is None:
+            conn.execute("DELETE FROM report_rows WHERE report = ? AND region = ?", (report, region))
+        else:
+            conn.executemany("DELETE FROM report_rows WHERE report = ? AND region = ? AND compartment_id = ?",
+                             [(report, region, cid) for cid in compartment_ids])
+        conn.executemany(
+            "INSERT INTO report_rows (report, region, compartment_id, ocid, row) VALUES (?, ?, ?, ?, ?)",
+            [(report, region, cid, ocid, json.dumps(row, default=str)) for cid, ocid, row in rows]
+        )
+        if collected_at is not None:
+            set_synced_at(conn, region, f"report:{report}", collected_at)
+
+
+def finish_rows(conn, report, region, compartment_ids=None, collected_at=None):
+    """
+    End of a collection written one compartment at a time with replace_rows:
+    drops the region's rows of every compartment not in compartment_ids (the
+    compartments a full collection visited) and moves the report's cursor
+    like replace_rows. compartment_ids None (an incremental re-collection)
+    drops nothing.
+    """
+    with conn:
+        if compartment_ids is not None:
+            stored = {cid for (cid,) in conn.execute(
+                "SELECT DISTINCT compartment_id FROM report_rows WHERE report = ? AND region = ?", (report, region))}
+            conn.executemany("DELETE FROM report_rows WHERE report = ? AND region = ? AND compartment_id = ?",
+                             [(report, region, cid) for cid in stored - set(compartment_ids)])
+        if collected_at is not None:
+            set_synced_at(conn, region, f"report:{report}", collected_at)
+
+
+def load_rows(conn, report, region=None):
+    if region is None:
+        cursor = conn.execute("SELECT row FROM report_rows WHERE report = ? ORDER BY region, rowid", (report,))
+    else:
+        cursor = conn.execute("SELECT row FROM report_rows WHERE report = ? AND region = ? ORDER BY rowid",
+                              (report, region))
+    return [json.loads(r[0]) for r in cursor]
+
+
+def changed_compartments(conn, pool, report, region, resource_types):
+    """
+    Sync the region and return the compartments a collector has to revisit
+    for report, or None when it needs a full collection (never collected,
+    or the report's cursor is older than FULL_SYNC_INTERVAL).
+
+    Changes are read from the store against the report's own cursor, not
+    from this sync's delta, so changes another report's sync or a full
+    sweep already stored are not lost.
+    """
+    try:
+        sync_region_with_pool(conn, pool, region)
+    except Exception as e:
+        note(f"Inventory sync failed in {region}, collecting the whole region: {e}")
+        return None
+
+    collected = get_synced_at(conn, region, f"report:{report}")
+    if collected is None or time.time() - collected > FULL_SYNC_INTERVAL:
+        return None
+
+    types = sorted(resource_types)
+    marks = ", ".join("?" * len(types))
+    cursor = conn.execute(
+        f"SELECT compartment_id FROM resources WHERE region = ? AND synced_at > ? AND resource_type IN ({marks})"
+        f" UNION SELECT compartment_id FROM tombstones WHERE region = ? AND removed_at > ?"
+        f" AND resource_type IN ({marks})",
+        [region, collected, *types, region, collected, *types]
+    )
+    return {cid for (cid,) in cursor if cid}
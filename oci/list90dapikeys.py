@@ -1,43 +1,102 @@
+#!/usr/bin/env python3
 import oci
+import argparse
 from datetime import datetime, timedelta, timezone
+from clientpool import ClientPool, load_config
+from apiguard import skip
+from scanscheduler import run_scan, MAX_WORKERS
+from rowwriter import FixedWidthWriter, get_writer, note
+
+
+# ---------------------------------------------------------
+# Credential types: list call, label attribute, id attribute
+# ---------------------------------------------------------
+CREDENTIAL_TYPES = {
+    "api_key": ("list_api_keys", "fingerprint", "key_id"),
+    "auth_token": ("list_auth_tokens", "description", "id"),
+    "customer_secret_key": ("list_customer_secret_keys", "display_name", "id"),
+    "smtp_credential": ("list_smtp_credentials", "username", "id"),
+}
+
+HEADERS = ["user_name", "user_ocid", "type", "credential", "credential_id", "state", "time_created", "age_days"]
+TABLE_WIDTHS = [30, 60, 20, 20, 35, 8, 32]
+
+
+# ---------------------------------------------------------
+# Worker: every credential of one user older than the cutoff
+# ---------------------------------------------------------
+def collect_user(pool, user, types, cutoff_date, now):
+    rows = []
+    with pool.client(oci.identity.IdentityClient) as identity:
+        for cred_type in types:
+            operation, label_attr, id_attr = CREDENTIAL_TYPES[cred_type]
+            # credential listings are not paginated: one call returns all of the user's credentials
+            try:
+                credentials = getattr(identity, operation)(user.id).data
+            except Exception as e:
+                skip(f"{cred_type} credentials of {user.name}", e)
+                continue
+
+            for cred in credentials:
+                time_created = cred.time_created
+                if time_created is None or time_created >= cutoff_date:
+                    continue
+                rows.append({
+                    "user_name": user.name,
+                    "user_ocid": user.id,
+                    "type": cred_type,
+                    "credential": getattr(cred, label_attr) or "-",
+                    "credential_id": getattr(cred, id_attr) or "-",
+                    "state": cred.lifecycle_state or "-",
+                    "time_created": time_created,
+                    "age_days": (now - time_created).days,
+                })
+    return rows
+
 
 def main():
-    config = oci.config.from_file()
-    identity = oci.identity.IdentityClient(config)
+    parser = argparse.ArgumentParser(description="List OCI user credentials older than a threshold")
+    parser.add_argument("--days", type=int, default=90, help="report credentials older than this many days")
+    parser.add_argument("--format", choices=["table", "csv", "json"], default="table",
+                        help="json prints one object per line")
+    parser.add_argument("--types", nargs="+", choices=sorted(CREDENTIAL_TYPES), default=list(CREDENTIAL_TYPES),
+                        help="credential types to check (default: all)")
+    args = parser.parse_args()
+
+    config = load_config()
+    pool = ClientPool(config)
 
-    cutoff_days = 90
-    cutoff_date = datetime.now(timezone.utc) - timedelta(days=cutoff_days)
+    now = datetime.now(timezone.utc)
+    cutoff_date = now - timedelta(days=args.days)
 
-    print("\nCollecting API keys older than 90 days...\n")
-    header = f"{'USER_NAME':30} {'USER_OCID':60} {'FINGERPRINT':20} {'KEY_ID':35} {'TIME_CREATED'}"
-    print(header)
-    print("-" * len(header))
+    fmt = "ndjson" if args.format == "json" else args.format
+    note(f"\nCollecting credentials older than {args.days} days...\n", fmt)
+    if fmt == "table":
+        writer = FixedWidthWriter(HEADERS, TABLE_WIDTHS, labels=[h.upper() for h in HEADERS])
+    else:
+        writer = get_writer(HEADERS, fmt)
 
     # List all users
-    users = oci.pagination.list_call_get_all_results(
-        identity.list_users,
-        config["tenancy"]
-    ).data
-
-    for user in users:
-        user_name = user.name
-        user_ocid = user.id
-
-        # List API keys for each user
-        try:
-            api_keys = identity.list_api_keys(user_ocid).data
-        except:
-            continue  # Not authorized for this user
-
-        for key in api_keys:
-            time_created = key.time_created
-
-            # Filter keys older than 90 days
-            if time_created < cutoff_date:
-                fingerprint = key.fingerprint
-                key_id = key.key_id  # Always present
-
-                print(f"{user_name:30} {user_ocid:60} {fingerprint:20} {key_id:35} {time_created}")
+    with pool.client(oci.identity.IdentityClient) as identity:
+        users = oci.pagination.list_call_get_all_results(
+            identity.list_users,
+            config["tenancy"]
+        ).data
+
+    # identity is served from the home region only, so lift the per-region cap to the global one
+    region = config.get("region")
+    work = [(region, user) for user in users]
+    for item, rows, error in run_scan(work, lambda it: collect_user(pool, it[1], args.types, cutoff_date, now),
+                                      per_region=MAX_WORKERS):
+        if error:
+            skip(f"credentials of {item[1].name}", error)
+            continue
+        for row in rows:
+            writer.write(row)
+
+    writer.close()
+    note(f"\nTotal credentials older than {args.days} days: {writer.count}", fmt)
+
 
 if __name__ == "__main__":
     main()
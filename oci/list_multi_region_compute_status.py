@@ -1,37 +1,41 @@
 #!/usr/bin/env python3
 import oci
+from compartmentcache import get_compartment_paths
+from scanscheduler import run_scan
+from instancesearch import discover_work
+from clientpool import ClientPool, load_config
+from apiguard import skip
+from rowwriter import OUTPUT_FORMAT, FixedWidthWriter, get_writer, note
+from records import list_records, instance_record
 
-# ---------------------------------------------------------
-# Build compartment hierarchy map
-# ---------------------------------------------------------
-def get_compartment_hierarchy(identity, root_compartment_id):
-
-    compartments = identity.list_compartments(
-        root_compartment_id,
-        compartment_id_in_subtree=True,
-        access_level="ANY"
-    ).data
-
-    compartments = [c for c in compartments if c.lifecycle_state == "ACTIVE"]
 
-    names = {c.id: c.name for c in compartments}
-    parents = {c.id: c.compartment_id for c in compartments}
+HEADERS = ["compartment_path", "name", "shape", "ocpus", "memory_gb", "state", "region"]
 
-    names[root_compartment_id] = "root"
 
-    hierarchy = {}
+def open_writer():
+    if OUTPUT_FORMAT == "table":
+        return FixedWidthWriter(
+            HEADERS,
+            widths=[40, 30, 25, 5, 10, 10],
+            labels=["Compartment Path", "Instance Name", "Shape", "OCPUs", "Memory(GB)", "State", "Region"]
+        )
+    return get_writer(HEADERS)
 
-    for cid in names.keys():
-        path = [names[cid]]
-        parent = parents.get(cid)
 
-        while parent and parent in names:
-            path.append(names[parent])
-            parent = parents.get(parent)
+def status_row(region, comp_path, inst):
+    # Shape details
+    ocpus = inst.ocpus if inst.ocpus is not None else ""
+    memory = inst.memory_in_gbs if inst.memory_in_gbs is not None else ""
 
-        hierarchy[cid] = " → ".join(reversed(path))
-
-    return hierarchy
+    return {
+        "compartment_path": comp_path,
+        "name": inst.display_name,
+        "shape": inst.shape,
+        "ocpus": ocpus,
+        "memory_gb": memory,
+        "state": inst.lifecycle_state,
+        "region": region
+    }
 
 
 # ---------------------------------------------------------
@@ -40,7 +44,7 @@ def get_compartment_hierarchy(identity, root_compartment_id):
 def main():
 
     # Load config
-    config = oci.config.from_file()
+    config = load_config()
     tenancy_id = config["tenancy"]
 
     # Determine regions
@@ -49,55 +53,50 @@ def main():
     else:
         regions = [config["region"]]
 
-    print("\nRegions to scan:", regions, "\n")
+    note(f"\nRegions to scan: {regions}\n")
 
-    # Global identity client (region does not matter for compartments)
-    identity = oci.identity.IdentityClient(config)
+    # Region-keyed client pool shared by all worker threads
+    pool = ClientPool(config)
 
-    print("Collecting compartment hierarchy...")
-    hierarchy = get_compartment_hierarchy(identity, tenancy_id)
+    note("Collecting compartment hierarchy...")
+    # Identity client from the config region (region does not matter for compartments)
+    with pool.client(oci.identity.IdentityClient) as identity:
+        hierarchy = get_compartment_paths(identity, tenancy_id)
 
     # ---------------------------------------------------------
     # Print table header
     # ---------------------------------------------------------
-    print("\nListing Compute Instances...\n")
-    print(f"{'Compartment Path':40} | {'Instance Name':30} | {'Shape':25} | {'OCPUs':5} | {'Memory(GB)':10} | {'State':10} | Region")
-    print("-" * 160)
+    note("\nListing Compute Instances...\n")
+    writer = open_writer()
 
     # ---------------------------------------------------------
-    # Loop over regions
+    # Scan region x compartment concurrently, print in stable order
     # ---------------------------------------------------------
-    for region in regions:
-        print(f"\n--- Collecting region: {region} ---")
-
-        # Clone config & update region
-        region_cfg = dict(config)
-        region_cfg["region"] = region
-
-        compute = oci.core.ComputeClient(region_cfg)
-
-        for comp_id, comp_path in hierarchy.items():
-
-            try:
-                instances = compute.list_instances(comp_id).data
-            except Exception:
-                continue
-
-            for inst in instances:
-
-                # Shape details
-                ocpus = inst.shape_config.ocpus if inst.shape_config else ""
-                memory = inst.shape_config.memory_in_gbs if inst.shape_config else ""
-
-                print(f"{comp_path:40} | "
-                      f"{inst.display_name:30} | "
-                      f"{inst.shape:25} | "
-                      f"{str(ocpus):5} | "
-                      f"{str(memory):10} | "
-                      f"{inst.lifecycle_state:10} | "
-                      f"{region}")
-
-    print("\nCompleted.\n")
+    # results wait in the scheduler until their turn to print, so keep compact records, not SDK models
+    def list_region_instances(item):
+        region, comp_id, comp_path = item
+        with pool.client(oci.core.ComputeClient, region) as compute:
+            return list_records(compute.list_instances, instance_record, comp_id)
+
+    # Resource Search finds the compartments that hold instances (DBASCRIPTS_DISCOVERY=scan to visit all)
+    work = discover_work(pool, regions, hierarchy)
+
+    current_region = None
+    for (region, comp_id, comp_path), instances, error in run_scan(work, list_region_instances):
+        if region != current_region:
+            writer.flush()
+            current_region = region
+            note(f"\n--- Collecting region: {region} ---")
+
+        if error:
+            skip(f"instances of {comp_path or comp_id} in {region}", error)
+            continue
+
+        for inst in instances:
+            writer.write(status_row(region, comp_path, inst))
+
+    writer.close()
+    note("\nCompleted.\n")
 
 
 if __name__ == "__main__":
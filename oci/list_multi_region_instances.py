@@ -1,136 +1,121 @@
 #!/usr/bin/env python3
+import time
 import oci
 from collections import defaultdict
-from oci.pagination import list_call_get_all_results
+from compartmentcache import get_compartment_paths
+from scanscheduler import run_scan
+from instancesearch import discover_work
+from clientpool import ClientPool, load_config
+from apiguard import skip
+from rowwriter import get_writer, note
+from instanceindex import build_vnic_index, build_boot_volume_index
+from records import list_records, instance_record, intern
+from shapecache import ShapeCatalog
+from inventorystore import INVENTORY_MODE, open_store, replace_rows, finish_rows, load_rows, changed_compartments
 
 # Optionally override regions here; if empty, script reads "regions" or "region" from ~/.oci/config
 REGIONS_OVERRIDE = []  # e.g. ["ap-hyderabad-1", "us-ashburn-1"] ; leave empty to use config
 
+# Resource types whose changes make refresh mode re-collect a compartment
+INSTANCE_RESOURCE_TYPES = {"Instance", "BootVolume", "Vnic"}
+
+HEADERS = ["region", "compartment_path", "name", "shape", "ocpus", "memory", "private_ip", "public_ip", "boot_volume_gb"]
+
 # ------------------------------------------------------------------
-# Helper: build compartment map and full path (root → a → b)
+# Helper: instance_id -> (private IPs, public IPs) for a compartment
 # ------------------------------------------------------------------
-def build_compartment_paths(identity_client, tenancy_id):
-    # List all compartments (active and in subtree)
-    resp = list_call_get_all_results(
-        identity_client.list_compartments,
-        tenancy_id,
-        compartment_id_in_subtree=True
-    )
-    comps = [c for c in resp.data if c.lifecycle_state == "ACTIVE"]
-
-    # include root
-    root = identity_client.get_compartment(tenancy_id).data
-    comps.append(root)
-
-    # maps
-    name_map = {c.id: c.name for c in comps}
-    parent_map = {c.id: c.compartment_id for c in comps}
-
-    # ensure root name
-    name_map[tenancy_id] = name_map.get(tenancy_id, "root")
-
-    # build full path using DFS
-    full_path = {}
-
-    def compute_path(cid):
-        if cid == tenancy_id:
-            return "root"
-        if cid in full_path:
-            return full_path[cid]
-        path_parts = []
-        current = cid
-        # climb until root or unknown
-        while current and current in name_map and current != tenancy_id:
-            path_parts.append(name_map.get(current, "unknown"))
-            current = parent_map.get(current)
-        path = "root"
-        if path_parts:
-            path += " → " + " → ".join(reversed(path_parts))
-        full_path[cid] = path
-        return path
-
-    # compute for all compartments
-    for c in comps:
-        compute_path(c.id)
-
-    return full_path
+def load_vnic_index(pool, region, comp_id):
+    try:
+        with pool.client(oci.core.ComputeClient, region) as compute_client, \
+                pool.client(oci.core.VirtualNetworkClient, region) as vn_client:
+            return build_vnic_index(compute_client, vn_client, comp_id)
+    except Exception as e:
+        skip(f"IP addresses of {comp_id} in {region}", e)
+        return {}
 
 
 # ------------------------------------------------------------------
-# Helper: load shapes for a region (cache)
+# Helper: instance_id -> (boot volume id, size) for a compartment
 # ------------------------------------------------------------------
-def load_shapes_for_region(config, region, tenancy_id):
-    cfg = dict(config)  # shallow copy
-    cfg["region"] = region
-    compute_client = oci.core.ComputeClient(cfg)
-    # list_shapes requires a compartment_id param in many SDK versions (use tenancy)
-    shapes = list_call_get_all_results(compute_client.list_shapes, compartment_id=tenancy_id).data
-    return {s.shape: s for s in shapes}
+def load_boot_index(pool, region, comp_id, availability_domains):
+    try:
+        with pool.client(oci.core.ComputeClient, region) as compute_client, \
+                pool.client(oci.core.BlockstorageClient, region) as block_client:
+            return build_boot_volume_index(compute_client, block_client, comp_id, availability_domains)
+    except Exception as e:
+        skip(f"boot volumes of {comp_id} in {region}", e)
+        return {}
 
 
 # ------------------------------------------------------------------
-# Helper: extract IPs and boot volume size for one instance
+# Worker: list and enrich the instances of one (region, compartment)
 # ------------------------------------------------------------------
-def get_network_and_boot_info(config, region, instance):
-    cfg = dict(config)
-    cfg["region"] = region
-    compute_client = oci.core.ComputeClient(cfg)
-    vn_client = oci.core.VirtualNetworkClient(cfg)
-    block_client = oci.core.BlockstorageClient(cfg)
-
-    private_ips = []
-    public_ips = []
-    boot_size_gb = ""
-
-    # VNIC attachments (use compute.list_vnic_attachments)
-    try:
-        vnic_atts = list_call_get_all_results(
-            compute_client.list_vnic_attachments,
-            compartment_id=instance.compartment_id,
-            instance_id=instance.id
-        ).data
-
-        for att in vnic_atts:
-            try:
-                vnic = vn_client.get_vnic(att.vnic_id).data
-                if vnic.private_ip:
-                    private_ips.append(vnic.private_ip)
-                if vnic.public_ip:
-                    public_ips.append(vnic.public_ip)
-            except Exception:
-                # skip vnic if cannot fetch
-                continue
-    except Exception:
-        pass
-
-    # Boot volume attachments (requires availability_domain & compartment_id & instance_id)
-    try:
-        bva = list_call_get_all_results(
-            compute_client.list_boot_volume_attachments,
-            availability_domain=instance.availability_domain,
-            compartment_id=instance.compartment_id,
-            instance_id=instance.id
-        ).data
-        if bva:
-            # take first boot volume
-            try:
-                bv = block_client.get_boot_volume(bva[0].boot_volume_id).data
-                boot_size_gb = str(bv.size_in_gbs)
-            except Exception:
-                boot_size_gb = ""
-    except Exception:
-        boot_size_gb = ""
-
-    return (",".join(private_ips) if private_ips else "-",
-            ",".join(public_ips) if public_ips else "-",
-            boot_size_gb if boot_size_gb else "-")
+def collect_compartment(pool, shapes_cache, item):
+    region, comp_id, comp_path = item
+
+    # list instances in this compartment (all states) as compact records; client goes back to the pool before enrichment
+    with pool.client(oci.core.ComputeClient, region) as compute_client:
+        instances = list_records(compute_client.list_instances, instance_record, comp_id)
+
+    # IPs and boot volumes for every instance of the compartment, joined in memory below
+    vnic_index = {}
+    boot_index = {}
+    if instances:
+        vnic_index = load_vnic_index(pool, region, comp_id)
+        boot_index = load_boot_index(pool, region, comp_id, {i.availability_domain for i in instances})
+
+    return instance_rows(region, comp_path, instances, vnic_index, boot_index, shapes_cache.get(region, {}))
+
+
+# ------------------------------------------------------------------
+# Rows of one compartment from its instances and lookup indexes
+# ------------------------------------------------------------------
+def instance_rows(region, comp_path, instances, vnic_index, boot_index, shapes):
+    compartment_path = intern(comp_path.replace("/", "").strip() if comp_path else "root")  # remove leading slash
+
+    rows = []
+    for inst in instances:
+        # shape -> ocpus/memory: prefer instance.shape_config for flex shapes
+        ocpus = ""
+        memory = ""
+        if inst.ocpus is not None or inst.memory_in_gbs is not None:
+            ocpus = inst.ocpus
+            memory = inst.memory_in_gbs
+        else:
+            # fallback to the shape catalog
+            s = shapes.get(inst.shape)
+            if s:
+                ocpus = getattr(s, "ocpus", "")
+                memory = getattr(s, "memory_in_gbs", "")
+
+        # network and boot info
+        private_ips, public_ips = vnic_index.get(inst.id, ([], []))
+        private_ip = ",".join(private_ips) if private_ips else "-"
+        public_ip = ",".join(public_ips) if public_ips else "-"
+        boot_size_gb = boot_index.get(inst.id, (None, None))[1]
+        boot_vol_gb = str(boot_size_gb) if boot_size_gb else "-"
+
+        rows.append({
+            "id": inst.id,  # not printed; key of the row in the inventory store
+            "region": region,
+            "compartment_path": compartment_path,
+            "name": inst.display_name or "-",
+            "shape": inst.shape or "-",
+            "ocpus": intern(str(ocpus)) if ocpus is not None else "-",
+            "memory": intern(str(memory)) if memory is not None else "-",
+            "private_ip": private_ip,
+            "public_ip": public_ip,
+            "boot_volume_gb": boot_vol_gb
+        })
+    return rows
+
 
 # ------------------------------------------------------------------
 # Main inventory collector
 # ------------------------------------------------------------------
 def main():
     # load default config
-    config = oci.config.from_file()  # ~/.oci/config, DEFAULT profile
+    config = load_config()  # ~/.oci/config, DBASCRIPTS_PROFILE (DEFAULT)
     tenancy_id = config["tenancy"]
 
     # determine regions
@@ -142,86 +127,76 @@ def main():
         else:
             regions = [config.get("region")]
 
-    # build compartment paths once (identity can be created with a valid region from config)
-    identity_for_comp = oci.identity.IdentityClient(config)
-    comp_paths = build_compartment_paths(identity_for_comp, tenancy_id)
-
-    # Prepare output rows
-    rows = []
-
-    # cache shapes per region for OCPUs/memory
-    shapes_cache = {}
-
+    # region-keyed client pool shared by all worker threads
+    pool = ClientPool(config)
+
+    # compartment paths come from the shared on-disk cache (identity can use any region from config)
+    with pool.client(oci.identity.IdentityClient) as identity_for_comp:
+        comp_paths = get_compartment_paths(identity_for_comp, tenancy_id)
+
+    # Output: padded table (buffered) or streaming csv / ndjson (DBASCRIPTS_OUTPUT)
+    writer = get_writer(HEADERS)
+
+    # Local inventory (DBASCRIPTS_INVENTORY): read = report from the store without any API call
+    store = open_store(tenancy_id) if INVENTORY_MODE != "off" else None
+    if INVENTORY_MODE == "read":
+        for row in load_rows(store, "instances"):
+            writer.write(row)
+        writer.close()
+        note(f"\nTotal instances: {writer.count}")
+        return
+
+    # shape catalog per region for OCPUs/memory: on-disk cache (DBASCRIPTS_SHAPE_TTL), loaded on first non-flex instance
+    shapes_cache = {region: ShapeCatalog(pool, region, tenancy_id) for region in regions}
+
+    # refresh = only the compartments whose instances changed since the last sync (None: whole region)
+    changed = {}
+    if INVENTORY_MODE == "refresh":
+        for region in regions:
+            changed[region] = changed_compartments(store, pool, "instances", region, INSTANCE_RESOURCE_TYPES)
+    started = time.time()  # the stored rows reflect every change synced before this
+
+    # Resource Search finds the compartments that hold instances (DBASCRIPTS_DISCOVERY=scan to visit all)
+    full_regions = [r for r in regions if changed.get(r) is None]
+    work = discover_work(pool, full_regions, comp_paths) if full_regions else []
     for region in regions:
-        print(f"Collecting from region: {region} ...")
-        # load shapes once per region
-        try:
-            shapes_cache[region] = load_shapes_for_region(config, region, tenancy_id)
-        except Exception:
-            shapes_cache[region] = {}
-
-        # create compute client for listing instances (region-specific)
-        cfg = dict(config)
-        cfg["region"] = region
-        compute_client = oci.core.ComputeClient(cfg)
-
-        # iterate compartments (comp_paths keys)
-        for comp_id, comp_path in comp_paths.items():
-            # list instances in this compartment (all states)
-            try:
-                instances = list_call_get_all_results(compute_client.list_instances, comp_id).data
-            except Exception:
-                continue
-
-            for inst in instances:
-                # shape -> ocpus/memory: prefer instance.shape_config for flex shapes
-                ocpus = ""
-                memory = ""
-                if inst.shape_config:
-                    ocpus = getattr(inst.shape_config, "ocpus", "")
-                    memory = getattr(inst.shape_config, "memory_in_gbs", "")
-                else:
-                    # fallback to shapes cache
-                    s = shapes_cache.get(region, {}).get(inst.shape)
-                    if s:
-                        ocpus = getattr(s, "ocpus", "")
-                        memory = getattr(s, "memory_in_gbs", "")
-
-                # network and boot info
-                private_ip, public_ip, boot_vol_gb = get_network_and_boot_info(config, region, inst)
-
-                rows.append({
-                    "region": region,
-                    "compartment_path": comp_path.replace("/", "").strip() if comp_path else "root",  # remove leading slash
-                    "name": inst.display_name or "-",
-                    "shape": inst.shape or "-",
-                    "ocpus": str(ocpus) if ocpus is not None else "-",
-                    "memory": str(memory) if memory is not None else "-",
-                    "private_ip": private_ip,
-                    "public_ip": public_ip,
-                    "boot_volume_gb": boot_vol_gb
-                })
-
-    # Print header + rows in a clean tabular format
-    headers = ["region", "compartment_path", "name", "shape", "ocpus", "memory", "private_ip", "public_ip", "boot_volume_gb"]
-    # compute column widths
-    col_widths = {h: max(len(h), 12) for h in headers}
-    for r in rows:
-        for h in headers:
-            col_widths[h] = max(col_widths[h], len(str(r[h])))
-
-    # header line
-    header_line = " | ".join(f"{h.upper():{col_widths[h]}}" for h in headers)
-    sep_line = "-".join("-" * (col_widths[h] + 2) for h in headers)
-
-    print("\n" + header_line)
-    print(sep_line)
-
-    for r in rows:
-        line = " | ".join(f"{str(r[h]):{col_widths[h]}}" for h in headers)
-        print(line)
-
-    print(f"\nTotal instances: {len(rows)}")
+        if changed.get(region) is not None:
+            work += [(region, cid, comp_paths[cid]) for cid in changed[region] if cid in comp_paths]
+    work.sort(key=lambda it: regions.index(it[0]))
+
+    # scan every (region, compartment) concurrently; rows are written in work order as they arrive,
+    # and to the store one compartment at a time, so no mode holds the whole run in memory
+    failed = {region: set() for region in regions}
+    current_region = None
+    for item, comp_rows, error in run_scan(work, lambda it: collect_compartment(pool, shapes_cache, it)):
+        if item[0] != current_region:
+            writer.flush()
+            current_region = item[0]
+            note(f"Collecting from region: {current_region} ...")
+        if error:
+            skip(f"instances of {item[2] or item[1]} in {item[0]}", error)
+            failed[item[0]].add(item[1])  # keeps its stored rows
+            continue
+        if store is not None:
+            replace_rows(store, "instances", item[0], [(item[1], row["id"], row) for row in comp_rows], [item[1]])
+        if INVENTORY_MODE != "refresh":
+            for row in comp_rows:
+                writer.write(row)
+
+    if store is not None:
+        for region in regions:
+            # a full collection drops compartments that no longer hold instances; failures are revisited next time
+            visited = {cid for r, cid, _ in work if r == region} if changed.get(region) is None else None
+            finish_rows(store, "instances", region, visited, None if failed[region] else started)
+
+    # refresh prints the merged inventory: stored rows plus the re-collected compartments
+    if INVENTORY_MODE == "refresh":
+        for row in load_rows(store, "instances"):
+            writer.write(row)
+
+    writer.close()
+    note(f"\nTotal instances: {writer.count}")
+
 
 if __name__ == "__main__":
     main()
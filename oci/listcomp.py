@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import oci
-
-TENANCY_OCID = "<tenancy OCID"
+from clientpool import load_config
 
 def build_tree(compartments):
     """
@@ -32,14 +31,15 @@ def print_tree(tree, parent_id, level=0):
 
 
 def main():
-    config = oci.config.from_file()  # Default ~/.oci/config
+    config = load_config()  # ~/.oci/config, DBASCRIPTS_PROFILE (DEFAULT)
+    tenancy_id = config["tenancy"]
     identity = oci.identity.IdentityClient(config)
 
     print("\nCollecting compartments... Please wait...\n")
 
     # Fetch all compartments including sub-compartments
     response = identity.list_compartments(
-        TENANCY_OCID,
+        tenancy_id,
         compartment_id_in_subtree=True,
         lifecycle_state="ACTIVE"
     )
@@ -47,7 +47,7 @@ def main():
     compartments = response.data
 
     # Include the root compartment explicitly
-    root_comp = identity.get_compartment(TENANCY_OCID).data
+    root_comp = identity.get_compartment(tenancy_id).data
     compartments.append(root_comp)
 
     # Build tree structure
@@ -56,8 +56,8 @@ def main():
     print("COMPARTMENT HIERARCHY")
     print("======================\n")
 
-    print(f"- root ({TENANCY_OCID})\n")
-    print_tree(tree, TENANCY_OCID)
+    print(f"- root ({tenancy_id})\n")
+    print_tree(tree, tenancy_id)
 
 
 if __name__ == "__main__":
@@ -1,74 +1,55 @@
 #!/usr/bin/env python3
 import oci
 from oci.pagination import list_call_get_all_results
+from compartmentcache import load_compartment_paths
+from clientpool import ClientPool, load_config
+from apiguard import skip
+from scanscheduler import run_scan
 from datetime import datetime
 
 
 # ---------------------------------------------------------
-# Build compartment path root/parent/child
+# Alarm index: destination topic OCID -> active alarm names
 # ---------------------------------------------------------
-def build_compartment_paths(identity, tenancy_id):
-    resp = list_call_get_all_results(
-        identity.list_compartments,
-        tenancy_id,
-        compartment_id_in_subtree=True
-    )
+def list_active_alarms(pool, item):
+    region, comp_id = item
+    with pool.client(oci.monitoring.MonitoringClient, region) as monitoring:
+        alarm_list = list_call_get_all_results(
+            monitoring.list_alarms,
+            comp_id
+        ).data
+    return [a for a in alarm_list if a.lifecycle_state == "ACTIVE"]
+
+
+def build_alarm_index(pool, region, compartments):
+    # list_alarms runs once per compartment (concurrently), not once per topic
+    alarm_index = {}
+    work = [(region, comp_id) for comp_id in compartments]
+
+    for item, alarms, error in run_scan(work, lambda it: list_active_alarms(pool, it)):
+        if error:
+            skip(f"alarms of {item[1]} in {region}", error)
+            continue
+        index_alarms(alarm_index, alarms)
 
-    comps = [c for c in resp.data if c.lifecycle_state == "ACTIVE"]
-
-    tenancy = identity.get_tenancy(tenancy_id).data
-    tenancy.name = "root"
-    tenancy.compartment_id = None
-    comps.append(tenancy)
-
-    name_map = {c.id: c.name for c in comps}
-    parent_map = {c.id: c.compartment_id for c in comps}
-    full_paths = {}
-
-    def get_path(cid):
-        if cid in full_paths:
-            return full_paths[cid]
-        names = []
-        cur = cid
-        while cur:
-            names.append(name_map[cur])
-            cur = parent_map.get(cur)
-        names = list(reversed(names))
-        if names == ["root"]:
-            full_paths[cid] = None
-        else:
-            full_paths[cid] = " / ".join(names)
-        return full_paths[cid]
+    return alarm_index
 
-    for c in comps:
-        get_path(c.id)
 
-    return full_paths
+def index_alarms(alarm_index, alarms):
+    for alarm in alarms:
+        for destination in alarm.destinations or []:
+            alarm_index.setdefault(destination, []).append(alarm.display_name)
 
 
 # ---------------------------------------------------------
-# Get alarms mapped to a topic
+# Alarms whose destination topic no longer exists
 # ---------------------------------------------------------
-def get_alarms_for_topic(monitoring, topic_id, compartments):
-    alarms = []
-    
-    for comp_id in compartments:
-        try:
-            alarm_list = list_call_get_all_results(
-                monitoring.list_alarms,
-                comp_id
-            ).data
-            
-            for alarm in alarm_list:
-                if alarm.lifecycle_state == "ACTIVE":
-                    # Check if this alarm uses the topic
-                    destinations = alarm.destinations if alarm.destinations else []
-                    if topic_id in destinations:
-                        alarms.append(alarm.display_name)
-        except:
-            continue
-    
-    return alarms
+def find_orphaned_alarms(alarm_index, known_topic_ids):
+    return {
+        destination: names
+        for destination, names in alarm_index.items()
+        if destination.startswith("ocid1.onstopic.") and destination not in known_topic_ids
+    }
 
 
 # ---------------------------------------------------------
@@ -86,64 +67,122 @@ def format_datetime(dt):
 # ---------------------------------------------------------
 # Region processing
 # ---------------------------------------------------------
-def process_region(region, config):
+def process_region(region, pool, comp_paths):
     print(f"\n=== REGION: {region} ===")
 
-    reg_cfg = dict(config)
-    reg_cfg["region"] = region
+    # All alarms of the region, indexed by destination (all compartments incl. root)
+    alarm_index = build_alarm_index(pool, region, comp_paths.keys())
+
+    with pool.client(oci.ons.NotificationControlPlaneClient, region) as ons_control, \
+            pool.client(oci.ons.NotificationDataPlaneClient, region) as ons_data:
+        rows, known_topic_ids, failed = collect_topics(region, ons_control, ons_data, alarm_index, comp_paths)
 
-    identity = oci.identity.IdentityClient(reg_cfg)
-    ons_control = oci.ons.NotificationControlPlaneClient(reg_cfg)
-    ons_data = oci.ons.NotificationDataPlaneClient(reg_cfg)
-    monitoring = oci.monitoring.MonitoringClient(reg_cfg)
+    print_orphaned_alarms(alarm_index, known_topic_ids, failed)
+    return rows
+
+
+def print_orphaned_alarms(alarm_index, known_topic_ids, failed_listings=0):
+    # a compartment whose topics could not be listed would make its topics look deleted
+    if failed_listings:
+        print(f"  Orphaned alarm check skipped: topics of {failed_listings} compartment(s) could not be listed")
+        return
 
-    tenancy_id = reg_cfg["tenancy"]
-    comp_paths = build_compartment_paths(identity, tenancy_id)
-    
-    # Get all compartment IDs for alarm lookup
-    all_comp_ids = list(comp_paths.keys())
+    orphaned = find_orphaned_alarms(alarm_index, known_topic_ids)
+    if orphaned:
+        print(f"  WARNING: {sum(len(n) for n in orphaned.values())} alarm(s) notify a topic that no longer exists:")
+        for topic_id, names in orphaned.items():
+            print(f"    {topic_id}: {','.join(names)}")
 
+
+def collect_topics(region, ons_control, ons_data, alarm_index, comp_paths):
     rows = []
+    known_topic_ids = set()
+    failed = 0
 
     for comp_id, comp_path in comp_paths.items():
-        if not comp_path:
-            continue
-
         try:
-            topics = list_call_get_all_results(
-                ons_control.list_topics,
-                comp_id
-            ).data
-        except:
+            topics = load_topics(ons_control, ons_data, comp_id, comp_path)
+        except Exception as e:
+            skip(f"topics of {comp_path or comp_id} in {region}", e)
+            failed += 1
             continue
 
-        for topic in topics:
-            if topic.lifecycle_state != "ACTIVE":
-                continue
+        known_topic_ids.update(topic.topic_id for topic, _ in topics)
+        rows.extend(topic_rows(region, comp_path, topics, alarm_index))
 
-            topic_name = topic.name
-            topic_id = topic.topic_id
-            topic_created = format_datetime(topic.time_created)
-            topic_desc = topic.description if topic.description else ""
+    return rows, known_topic_ids, failed
 
-            # Get subscriptions for this topic
-            subscriptions = []
+
+# ---------------------------------------------------------
+# Topics of a compartment; subscriptions of the active ones
+# ---------------------------------------------------------
+def load_topics(ons_control, ons_data, comp_id, comp_path):
+    topics = list_call_get_all_results(
+        ons_control.list_topics,
+        comp_id
+    ).data
+
+    # every topic, whatever its state, counts as an existing alarm destination;
+    # only active non-root topics are reported, so only they need subscriptions
+    result = []
+    for topic in topics:
+        subscriptions = []
+        if comp_path and topic.lifecycle_state == "ACTIVE":
             try:
                 subs = list_call_get_all_results(
                     ons_data.list_subscriptions,
                     comp_id,
-                    topic_id=topic_id
+                    topic_id=topic.topic_id
                 ).data
                 subscriptions = [s for s in subs if s.lifecycle_state in ["ACTIVE", "PENDING"]]
-            except:
-                pass
+            except Exception as e:
+                skip(f"subscriptions of topic {topic.name}", e)
 
-            # Get alarms mapped to this topic
-            alarms = get_alarms_for_topic(monitoring, topic_id, all_comp_ids)
-            alarm_names = ",".join(alarms) if alarms else "NONE"
+        result.append((topic, subscriptions))
+    return result
+
+
+def topic_rows(region, comp_path, topics, alarm_index):
+    rows = []
+    if not comp_path:
+        return rows
+
+    for topic, subscriptions in topics:
+        if topic.lifecycle_state != "ACTIVE":
+            continue
+
+        topic_name = topic.name
+        topic_id = topic.topic_id
+        topic_created = format_datetime(topic.time_created)
+        topic_desc = topic.description if topic.description else ""
+
+        # Get alarms mapped to this topic
+        alarms = alarm_index.get(topic_id, [])
+        alarm_names = ",".join(alarms) if alarms else "NONE"
+
+        # If no subscriptions, still show topic with empty subscription fields
+        if not subscriptions:
+            rows.append([
+                region,
+                comp_path,
+                topic_name,
+                topic_id,
+                topic_created,
+                topic_desc,
+                "",  # subscription_endpoint
+                "",  # protocol
+                "",  # subscription_state
+                "",  # subscription_created
+                alarm_names
+            ])
+        else:
+            # One row per subscription
+            for sub in subscriptions:
+                endpoint = sub.endpoint if sub.endpoint else ""
+                protocol = sub.protocol if sub.protocol else ""
+                sub_state = sub.lifecycle_state if sub.lifecycle_state else ""
+                sub_created = format_datetime(sub.created_time)
 
-            # If no subscriptions, still show topic with empty subscription fields
-            if not subscriptions:
                 rows.append([
                     region,
                     comp_path,
@@ -151,33 +190,12 @@ def process_region(region, config):
                     topic_id,
                     topic_created,
                     topic_desc,
-                    "",  # subscription_endpoint
-                    "",  # protocol
-                    "",  # subscription_state
-                    "",  # subscription_created
+                    endpoint,
+                    protocol,
+                    sub_state,
+                    sub_created,
                     alarm_names
                 ])
-            else:
-                # One row per subscription
-                for sub in subscriptions:
-                    endpoint = sub.endpoint if sub.endpoint else ""
-                    protocol = sub.protocol if sub.protocol else ""
-                    sub_state = sub.lifecycle_state if sub.lifecycle_state else ""
-                    sub_created = format_datetime(sub.created_time)
-
-                    rows.append([
-                        region,
-                        comp_path,
-                        topic_name,
-                        topic_id,
-                        topic_created,
-                        topic_desc,
-                        endpoint,
-                        protocol,
-                        sub_state,
-                        sub_created,
-                        alarm_names
-                    ])
 
     return rows
 
@@ -211,7 +229,7 @@ def print_table(rows):
 # MAIN
 # ---------------------------------------------------------
 def main():
-    config = oci.config.from_file()
+    config = load_config()
 
     regions = (
         [r.strip() for r in config.get("regions", "").split(",")]
@@ -219,9 +237,13 @@ def main():
         else [config["region"]]
     )
 
+    # Clients and the compartment tree are shared by all regions
+    pool = ClientPool(config)
+    comp_paths = load_compartment_paths(pool)
+
     final = []
     for region in regions:
-        final.extend(process_region(region, config))
+        final.extend(process_region(region, pool, comp_paths))
 
     print_table(final)
     print(f"\n=== TOTAL RECORDS: {len(final)} ===")
@@ -1,14 +1,9 @@
+import json
 import oci
-
-def build_compartment_path(comp_id, comp_map):
-    path = []
-    while comp_id:
-        comp = comp_map.get(comp_id)
-        if not comp:
-            break
-        path.append(comp.name)
-        comp_id = comp.compartment_id
-    return " / ".join(reversed(path))
+from compartmentcache import get_compartment_paths
+from clientpool import ClientPool, load_config
+from inventorystore import INVENTORY_MODE, open_store, load_resources, sync_region_with_pool
+from records import intern
 
 
 def print_table(headers, rows):
@@ -28,66 +23,69 @@ def print_table(headers, rows):
         print(format_row(row))
 
 
-def get_all_compartments(identity, tenancy_id):
-    result = oci.pagination.list_call_get_all_results(
-        identity.list_compartments,
-        tenancy_id,
-        compartment_id_in_subtree=True
-    )
-    return result.data
-
+def tag_columns(defined_tags, freeform_tags):
+    defined_list = []
+    for ns, keys in (defined_tags or {}).items():
+        for k, v in keys.items():
+            defined_list.append(f"{ns}:{k}={v}")
 
-def process_region(region, config):
-    print(f"\n===== REGION: {region} =====")
+    free_list = [f"{k}={v}" for k, v in (freeform_tags or {}).items()]
 
-    config["region"] = region
-    identity = oci.identity.IdentityClient(config)
-    search_client = oci.resource_search.ResourceSearchClient(config)
+    return ", ".join(defined_list), ", ".join(free_list)
 
-    tenancy_id = config["tenancy"]
-
-    compartments = get_all_compartments(identity, tenancy_id)
-    comp_map = {c.id: c for c in compartments}
-    comp_map[tenancy_id] = None
 
+def search_region(region, pool, comp_paths):
     search_details = oci.resource_search.models.StructuredSearchDetails(
         query="query all resources",
         type="Structured",
         matching_context_type="NONE"
     )
 
-    try:
-        response = oci.pagination.list_call_get_all_results(
+    # rows are built page by page; the search summaries themselves are not kept
+    rows = []
+    with pool.client(oci.resource_search.ResourceSearchClient, region) as search_client:
+        for item in oci.pagination.list_call_get_all_results_generator(
             search_client.search_resources,
+            "record",
             search_details
-        )
-    except Exception as e:
-        print(f"ERROR in region {region}: {e}")
-        return
-
+        ):
+            rows.append([
+                region,
+                intern(item.resource_type),
+                item.display_name,
+                comp_paths.get(item.compartment_id, ""),
+                *map(intern, tag_columns(item.defined_tags, item.freeform_tags))
+            ])
+    return rows
+
+
+def stored_region(region, store, comp_paths):
     rows = []
-
-    for item in response.data:
-
-        comp_path = build_compartment_path(item.compartment_id, comp_map)
-
-        defined_tags = item.defined_tags or {}
-        defined_list = []
-        for ns, keys in defined_tags.items():
-            for k, v in keys.items():
-                defined_list.append(f"{ns}:{k}={v}")
-
-        free_tags = item.freeform_tags or {}
-        free_list = [f"{k}={v}" for k, v in free_tags.items()]
-
+    for r in load_resources(store, region=region):
         rows.append([
             region,
-            item.resource_type,
-            item.display_name,
-            comp_path,
-            ", ".join(defined_list),
-            ", ".join(free_list)
+            intern(r["resource_type"]),
+            r["display_name"],
+            comp_paths.get(r["compartment_id"], ""),
+            *map(intern, tag_columns(json.loads(r["defined_tags"]), json.loads(r["freeform_tags"])))
         ])
+    return rows
+
+
+def process_region(region, pool, comp_paths, store=None):
+    print(f"\n===== REGION: {region} =====")
+
+    try:
+        if store is None:
+            rows = search_region(region, pool, comp_paths)
+        else:
+            # write = full sweep, refresh = incremental, read = store only
+            if INVENTORY_MODE != "read":
+                sync_region_with_pool(store, pool, region, full=INVENTORY_MODE == "write")
+            rows = stored_region(region, store, comp_paths)
+    except Exception as e:
+        print(f"ERROR in region {region}: {e}")
+        return
 
     print_table(
         ["Region", "Resource Type", "Name", "Compartment Path", "Defined Tags", "Freeform Tags"],
@@ -96,15 +94,25 @@ def process_region(region, config):
 
 
 def main():
-    config = oci.config.from_file("~/.oci/config", "DEFAULT")
+    config = load_config()
 
     regions = [
         "us-ashburn-1",
         "us-phoenix-1"
     ]
 
+    pool = ClientPool(config)
+
+    # Resources may sit in deleted compartments, so resolve paths for all states
+    with pool.client(oci.identity.IdentityClient) as identity:
+        comp_paths = get_compartment_paths(identity, config["tenancy"], sep=" / ",
+                                           root_name="", active_only=False)
+
+    # Local inventory (DBASCRIPTS_INVENTORY); off = straight from Resource Search
+    store = open_store(config["tenancy"]) if INVENTORY_MODE != "off" else None
+
     for region in regions:
-        process_region(region, config)
+        process_region(region, pool, comp_paths, store)
 
 
 if __name__ == "__main__":
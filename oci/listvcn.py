@@ -1,21 +1,41 @@
+#!/usr/bin/env python3
 import oci
+import argparse
+import json
+from collections import defaultdict
+from oci.pagination import list_call_get_all_results
+from compartmentcache import get_compartment_paths
+from clientpool import ClientPool, load_config
+from apiguard import skip
+from scanscheduler import run_scan
 
-def main():
-    config = oci.config.from_file()
-    network = oci.core.VirtualNetworkClient(config)
 
-    compartment_id = "<tenancy OCID"
+# ---------------------------------------------------------
+# Worker: VCNs and their subnets in one (region, compartment)
+# ---------------------------------------------------------
+def collect_compartment(pool, item):
+    region, comp_id, _ = item
+    with pool.client(oci.core.VirtualNetworkClient, region) as network:
+        vcns = list_call_get_all_results(network.list_vcns, comp_id).data
+        if not vcns:
+            return []
 
-    vcns = network.list_vcns(compartment_id).data
+        # one paginated list_subnets per compartment, grouped by VCN here instead of one call per VCN
+        subnets = list_call_get_all_results(network.list_subnets, compartment_id=comp_id).data
 
-    for vcn in vcns:
-        print(f"\nVCN: {vcn.display_name}  ({vcn.id})")
+    by_vcn = defaultdict(list)
+    for subnet in subnets:
+        by_vcn[subnet.vcn_id].append(subnet)
+    return [(vcn, by_vcn.get(vcn.id, [])) for vcn in vcns]
 
-        # list subnets: vcn_id must be passed as a keyword
-        subnets = network.list_subnets(
-            compartment_id=compartment_id,
-            vcn_id=vcn.id
-        ).data
+
+# ---------------------------------------------------------
+# Output
+# ---------------------------------------------------------
+def print_text(region, comp_path, vcns):
+    print(f"\n=== {region} / {comp_path or 'root'} ===")
+    for vcn, subnets in vcns:
+        print(f"\nVCN: {vcn.display_name}  ({vcn.id})")
 
         if not subnets:
             print("  No subnets found.")
@@ -28,5 +48,58 @@ def main():
             print(f"    AD / Subnet : {subnet.availability_domain}")
             print("")
 
+
+def print_ndjson(region, comp_path, vcns):
+    # one line per subnet; a VCN without subnets gets one line with empty subnet fields
+    for vcn, subnets in vcns:
+        for subnet in subnets or [None]:
+            print(json.dumps({
+                "region": region,
+                "compartment_path": comp_path or "root",
+                "vcn_name": vcn.display_name,
+                "vcn_id": vcn.id,
+                "vcn_cidr_block": vcn.cidr_block,
+                "subnet_name": subnet.display_name if subnet else None,
+                "subnet_id": subnet.id if subnet else None,
+                "cidr_block": subnet.cidr_block if subnet else None,
+                "availability_domain": subnet.availability_domain if subnet else None,
+            }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the VCNs and subnets of every compartment")
+    parser.add_argument("--format", choices=["text", "ndjson"], default="text")
+    args = parser.parse_args()
+
+    config = load_config()
+    tenancy_id = config["tenancy"]
+
+    if "regions" in config and config["regions"].strip():
+        regions = [r.strip() for r in config["regions"].split(",")]
+    else:
+        regions = [config.get("region")]
+
+    pool = ClientPool(config)
+
+    # whole compartment subtree, root included
+    with pool.client(oci.identity.IdentityClient) as identity:
+        comp_paths = get_compartment_paths(identity, tenancy_id, sep=" / ", root_name="")
+
+    work = [(region, cid, path) for region in regions for cid, path in comp_paths.items()]
+    output = print_ndjson if args.format == "ndjson" else print_text
+
+    vcn_count = 0
+    for item, vcns, error in run_scan(work, lambda it: collect_compartment(pool, it)):
+        if error:
+            skip(f"VCNs of {item[2] or 'root'} in {item[0]}", error)
+            continue
+        if vcns:
+            output(item[0], item[2], vcns)
+            vcn_count += len(vcns)
+
+    if args.format == "text":
+        print(f"\nTotal VCNs: {vcn_count}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compact records for the SDK model data the scripts keep around.
+
+An SDK model carries an attribute dict, swagger type maps and every field
+the service returned; a few hundred bytes of which a report reads three
+or four. Collectors convert each item to a namedtuple of just those fields
+as its page arrives (list_records), so only one page of models is alive at
+a time. Strings that repeat across thousands of resources - region,
+compartment, shape, state, resource type - are interned, so every record
+points at one shared copy.
+"""
+import sys
+from collections import namedtuple
+
+from oci.pagination import list_call_get_all_results_generator
+
+
+def intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def intern_values(row):
+    """Intern the string values of a dict in place (rows that must stay dicts)."""
+    for key, value in row.items():
+        if type(value) is str:
+            row[key] = sys.intern(value)
+    return row
+
+
+# ---------------------------------------------------------
+# Records
+# ---------------------------------------------------------
+Instance = namedtuple("Instance", [
+    "id", "display_name", "compartment_id", "availability_domain", "shape",
+    "ocpus", "memory_in_gbs", "lifecycle_state",
+])
+
+
+def instance_record(inst):
+    # ocpus / memory only come with shape_config (flex shapes); None means "look up the shape"
+    shape_config = inst.shape_config
+    return Instance(
+        inst.id,
+        inst.display_name,
+        intern(inst.compartment_id),
+        intern(inst.availability_domain),
+        intern(inst.shape),
+        shape_config.ocpus if shape_config else None,
+        shape_config.memory_in_gbs if shape_config else None,
+        intern(inst.lifecycle_state),
+    )
+
+
+# ---------------------------------------------------------
+# Paginated listing converted page by page
+# ---------------------------------------------------------
+def list_records(list_func, convert, *args, **kwargs):
+    return [convert(item) for item in list_call_get_all_results_generator(list_func, "record", *args, **kwargs)]
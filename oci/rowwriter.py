@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Row writers shared by the inventory scripts.
+
+csv and ndjson write each row as soon as it is produced and keep nothing in
+memory; table keeps the padded, column-aligned layout and therefore has to
+hold every row until the end (fine for small runs).
+"""
+import csv
+import json
+import os
+import sys
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+OUTPUT_FORMAT = os.environ.get("DBASCRIPTS_OUTPUT", "table")  # Options: table, csv, ndjson
+
+# Columns put first in every csv / ndjson row (batch.py: the tenancy of the worker)
+TAG_COLUMNS = {}
+
+
+# ---------------------------------------------------------
+# Progress messages: stdout for tables, stderr for csv / ndjson
+# ---------------------------------------------------------
+def note(message, fmt=OUTPUT_FORMAT):
+    print(message, file=sys.stdout if fmt == "table" else sys.stderr)
+
+
+# ---------------------------------------------------------
+# Padded table (buffers all rows to size the columns)
+# ---------------------------------------------------------
+class TableWriter:
+    streaming = False
+
+    def __init__(self, headers, stream=None, min_width=12):
+        self.headers = headers
+        self.stream = stream or sys.stdout
+        self.min_width = min_width
+        self.rows = []
+        self.count = 0
+
+    def write(self, row):
+        self.rows.append(row)
+        self.count += 1
+
+    def flush(self):
+        pass
+
+    def close(self):
+        headers = self.headers
+        col_widths = {h: max(len(h), self.min_width) for h in headers}
+        for r in self.rows:
+            for h in headers:
+                col_widths[h] = max(col_widths[h], len(str(r[h])))
+
+        header_line = " | ".join(f"{h.upper():{col_widths[h]}}" for h in headers)
+        sep_line = "-".join("-" * (col_widths[h] + 2) for h in headers)
+
+        print("\n" + header_line, file=self.stream)
+        print(sep_line, file=self.stream)
+        for r in self.rows:
+            print(" | ".join(f"{str(r[h]):{col_widths[h]}}" for h in headers), file=self.stream)
+        self.rows = []
+
+
+# ---------------------------------------------------------
+# Streaming writers (constant memory)
+# ---------------------------------------------------------
+class FixedWidthWriter:
+    """Human readable table with fixed column widths, printed row by row."""
+    streaming = True
+
+    def __init__(self, headers, widths, labels=None, stream=None):
+        self.headers = headers
+        self.widths = widths
+        self.stream = stream or sys.stdout
+        self.count = 0
+        labels = labels or headers
+        print(self._line(dict(zip(headers, labels))), file=self.stream)
+        print("-" * 160, file=self.stream)
+
+    def _line(self, row):
+        cells = [f"{str(row[h]):{w}}" for h, w in zip(self.headers, self.widths)]
+        cells += [str(row[h]) for h in self.headers[len(self.widths):]]
+        return " | ".join(cells)
+
+    def write(self, row):
+        print(self._line(row), file=self.stream)
+        self.count += 1
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class CsvWriter:
+    streaming = True
+
+    def __init__(self, headers, stream=None):
+        self.tags = dict(TAG_COLUMNS)
+        self.headers = list(self.tags) + headers
+        self.stream = stream or sys.stdout
+        self.writer = csv.DictWriter(self.stream, fieldnames=self.headers, extrasaction="ignore")
+        self.writer.writeheader()
+        self.count = 0
+
+    def write(self, row):
+        self.writer.writerow({**self.tags, **row} if self.tags else row)
+        self.count += 1
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class NdjsonWriter(CsvWriter):
+    def __init__(self, headers, stream=None):
+        self.tags = dict(TAG_COLUMNS)
+        self.headers = headers
+        self.stream = stream or sys.stdout
+        self.count = 0
+
+    def write(self, row):
+        self.stream.write(json.dumps({**self.tags, **{h: row.get(h) for h in self.headers}}, default=str) + "\n")
+        self.count += 1
+
+
+WRITERS = {
+    "table": TableWriter,
+    "csv": CsvWriter,
+    "ndjson": NdjsonWriter,
+}
+
+
+def get_writer(headers, fmt=OUTPUT_FORMAT, stream=None):
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format {fmt!r}, expected one of: {', '.join(WRITERS)}")
+    return WRITERS[fmt](headers, stream=stream)
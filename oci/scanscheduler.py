@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Bounded-concurrency scheduler for (region, compartment) scans.
+
+Work items run on a thread pool with a global cap and a per-region cap, and
+results come back in the same order the items were given, so the printed
+reports stay stable no matter which call finishes first.
+"""
+import os
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+MAX_WORKERS = int(os.environ.get("DBASCRIPTS_MAX_WORKERS", "16"))
+PER_REGION_WORKERS = int(os.environ.get("DBASCRIPTS_REGION_WORKERS", "8"))
+
+
+# ---------------------------------------------------------
+# Run work items, yield (item, result, error) in input order
+# ---------------------------------------------------------
+def run_scan(items, fn, max_workers=MAX_WORKERS, per_region=PER_REGION_WORKERS):
+    """
+    items: iterable of tuples whose first element is the region name,
+           e.g. (region, compartment_id, compartment_path).
+    fn:    called as fn(item) on a worker thread.
+
+    Regions are served round-robin so every region makes progress, and no
+    region ever has more than per_region calls in flight. An exception in
+    fn is returned as the error of that item instead of stopping the scan.
+    """
+    max_workers = max(1, max_workers)
+    per_region = max(1, per_region)
+
+    queues = OrderedDict()
+    for idx, item in enumerate(items):
+        queues.setdefault(item[0], deque()).append((idx, item))
+    inflight = {region: 0 for region in queues}
+
+    finished = {}
+    next_idx = 0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+
+        def fill():
+            progress = True
+            while progress and len(futures) < max_workers:
+                progress = False
+                for region, queue in queues.items():
+                    if len(futures) >= max_workers:
+                        break
+                    if queue and inflight[region] < per_region:
+                        idx, item = queue.popleft()
+                        futures[pool.submit(fn, item)] = (idx, item, region)
+                        inflight[region] += 1
+                        progress = True
+
+        fill()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in done:
+                idx, item, region = futures.pop(fut)
+                inflight[region] -= 1
+                try:
+                    finished[idx] = (item, fut.result(), None)
+                except Exception as e:
+                    finished[idx] = (item, None, e)
+            fill()
+
+            while next_idx in finished:
+                yield finished.pop(next_idx)
+                next_idx += 1
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Find duplicate, shadowed and overlapping security list rules.
+
+Rules are compared within each security list and across the lists
+attached to the same subnet (a subnet allows the union of its lists).
+Checking every pair is far too slow for ~20k rules, so each rule is only
+compared with rules whose CIDR contains it: a prefix index answers that
+with one lookup per prefix length, and an interval tree per (prefix,
+protocol) returns only the candidates whose port range intersects.
+
+Usage:
+    seclistanalyzer.py                  # live collection, regions from ~/.oci/config
+    seclistanalyzer.py latest           # newest stored backup
+    seclistanalyzer.py <manifest | .ndjson.gz | full .json>
+"""
+import argparse
+import ipaddress
+import json
+import sys
+from collections import defaultdict
+
+
+FULL_RANGE = (0, 65535)
+ALL_PROTOCOLS = 'All Protocols'
+
+
+# ---------------------------------------------------------
+# Static centered interval tree (closed intervals)
+# ---------------------------------------------------------
+class IntervalTree:
+    __slots__ = ("center", "by_lo", "by_hi", "left", "right")
+
+    def __init__(self, intervals):
+        """intervals: list of (lo, hi, payload)"""
+        points = sorted(p for lo, hi, _ in intervals for p in (lo, hi))
+        self.center = points[len(points) // 2]
+
+        here, left, right = [], [], []
+        for iv in intervals:
+            if iv[1] < self.center:
+                left.append(iv)
+            elif iv[0] > self.center:
+                right.append(iv)
+            else:
+                here.append(iv)
+
+        self.by_lo = sorted(here, key=lambda iv: iv[0])
+        self.by_hi = sorted(here, key=lambda iv: iv[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def overlapping(self, lo, hi):
+        node = self
+        stack = []
+        while node or stack:
+            if node is None:
+                node = stack.pop()
+            if hi < node.center:
+                for iv in node.by_lo:
+                    if iv[0] > hi:
+                        break
+                    yield iv[2]
+                node = node.left
+            elif lo > node.center:
+                for iv in node.by_hi:
+                    if iv[1] < lo:
+                        break
+                    yield iv[2]
+                node = node.right
+            else:
+                for iv in node.by_lo:
+                    yield iv[2]
+                if node.right:
+                    stack.append(node.right)
+                node = node.left
+
+
+# ---------------------------------------------------------
+# Normalized match of one parsed rule
+# ---------------------------------------------------------
+def parse_range(text, full=FULL_RANGE):
+    if not text:
+        return full
+    lo, _, hi = str(text).partition("-")
+    return int(lo), int(hi or lo)
+
+
+def parse_network(text):
+    try:
+        return ipaddress.ip_network(text, strict=False)
+    except ValueError:
+        return None  # service CIDR label such as all-iad-services-in-oracle-services-network
+
+
+class RuleMatch:
+    __slots__ = ("ref", "direction", "stateless", "protocol", "target",
+                 "network", "first", "second")
+
+    def __init__(self, ref, direction, rule):
+        self.ref = ref
+        self.direction = direction
+        self.stateless = rule['stateless']
+        self.protocol = rule['ip_protocol']
+        self.target = rule.get('source') if direction == 'ingress' else rule.get('destination')
+        self.network = parse_network(self.target)
+
+        # first / second dimension: dst / src port for TCP & UDP, type / code for ICMP
+        if self.protocol in ('TCP', 'UDP'):
+            self.first = parse_range(rule['destination_port_range'])
+            self.second = parse_range(rule['source_port_range'])
+        elif self.protocol == 'ICMP':
+            icmp_type, _, icmp_code = (rule['type_and_code'] or "").partition(",")
+            self.first = parse_range(icmp_type.strip(), (0, 255))
+            self.second = parse_range(icmp_code.strip(), (0, 255))
+        else:
+            self.first = FULL_RANGE
+            self.second = FULL_RANGE
+
+    def key(self):
+        return (self.direction, self.stateless, self.protocol, self.target, self.first, self.second)
+
+    def contains(self, other):
+        return (
+            (self.protocol == ALL_PROTOCOLS or self.protocol == other.protocol)
+            and (self.network == other.network if self.network is None or other.network is None
+                 else other.network.subnet_of(self.network))
+            and self.first[0] <= other.first[0] and other.first[1] <= self.first[1]
+            and self.second[0] <= other.second[0] and other.second[1] <= self.second[1]
+        )
+
+
+def intersects(a, b):
+    return a[0] <= b[1] and b[0] <= a[1]
+
+
+# ---------------------------------------------------------
+# Prefix index: (direction, stateless, prefix) -> protocol -> tree
+# ---------------------------------------------------------
+def prefix_key(match, prefixlen=None):
+    net = match.network
+    if net is None:
+        return match.direction, match.stateless, match.target
+    if prefixlen is None:
+        prefixlen = net.prefixlen
+    # network bits truncated to prefixlen; cheaper than building supernet() objects
+    return (match.direction, match.stateless, net.version, prefixlen,
+            int(net.network_address) >> (net.max_prefixlen - prefixlen))
+
+
+def build_index(matches):
+    buckets = defaultdict(lambda: defaultdict(list))
+    for m in matches:
+        buckets[prefix_key(m)][m.protocol].append((m.first[0], m.first[1], m))
+    return {
+        key: {proto: IntervalTree(ivs) for proto, ivs in protos.items()}
+        for key, protos in buckets.items()
+    }
+
+
+def candidates(index, m):
+    """Rules whose target contains m's target and whose first range intersects."""
+    if m.network is None:
+        keys = [prefix_key(m)]
+    else:
+        keys = [prefix_key(m, p) for p in range(m.network.prefixlen + 1)]
+
+    for key in keys:
+        protos = index.get(key)
+        if not protos:
+            continue
+        if m.protocol == ALL_PROTOCOLS:
+            trees = protos.values()
+        else:
+            trees = [t for t in (protos.get(m.protocol), protos.get(ALL_PROTOCOLS)) if t]
+        for tree in trees:
+            yield from tree.overlapping(*m.first)
+
+
+# ---------------------------------------------------------
+# Compare one group of rules
+# ---------------------------------------------------------
+def classify(a, b):
+    if a.key() == b.key():
+        return "duplicate", a, b
+    if a.contains(b):
+        return "shadowed", a, b      # b is redundant, a already allows it
+    if b.contains(a):
+        return "shadowed", b, a
+    return "overlap", a, b
+
+
+def analyze_group(matches, cross_list_only=False):
+    index = build_index(matches)
+    seen = set()
+    findings = []
+
+    for m in matches:
+        for other in candidates(index, m):
+            if other is m or not intersects(m.second, other.second):
+                continue
+            if cross_list_only and other.ref[0] is m.ref[0]:
+                continue
+            pair = (id(m), id(other)) if id(m) < id(other) else (id(other), id(m))
+            if pair in seen:
+                continue
+            seen.add(pair)
+            findings.append(classify(other, m))
+
+    return findings
+
+
+def rule_matches(sec_list):
+    matches = []
+    for direction in ('ingress', 'egress'):
+        for i, rule in enumerate(sec_list[f'{direction}_rules']):
+            matches.append(RuleMatch((sec_list, direction, i), direction, rule))
+    return matches
+
+
+# ---------------------------------------------------------
+# Analyze security_lists_data (live or from a backup)
+# ---------------------------------------------------------
+def describe(ref):
+    sec_list, direction, i = ref
+    rule = sec_list[f'{direction}_rules'][i]
+    target = rule.get('source') if direction == 'ingress' else rule.get('destination')
+    ports = rule['destination_port_range'] or rule['type_and_code'] or "all"
+    return {
+        'security_list': sec_list['security_list_name'],
+        'direction': direction,
+        'rule_index': i,
+        'rule': f"{rule['ip_protocol']} {target} {ports}",
+    }
+
+
+def analyze(security_lists_data):
+    findings = []
+
+    def add(scope, results, subnet=""):
+        for kind, broader, narrower in results:
+            sec_list = narrower.ref[0]
+            findings.append({
+                'scope': scope,
+                'kind': kind,
+                'region': sec_list['region'],
+                'vcn_name': sec_list['vcn_name'],
+                'subnet': subnet,
+                'rule': describe(narrower.ref),
+                'covered_by': describe(broader.ref),
+            })
+
+    # Within each security list
+    matches_by_list = {}
+    for sec_list in security_lists_data:
+        matches_by_list[id(sec_list)] = rule_matches(sec_list)
+        add('security_list', analyze_group(matches_by_list[id(sec_list)]))
+
+    # Across the lists attached to the same subnet
+    subnets = defaultdict(list)
+    for sec_list in security_lists_data:
+        attached = sec_list['attached_subnets']
+        if attached and attached != "Not attached":
+            for name in attached.split(", "):
+                subnets[(sec_list['region'], sec_list['vcn_id'], name)].append(sec_list)
+
+    for (region, vcn_id, subnet), sec_lists in subnets.items():
+        if len(sec_lists) < 2:
+            continue
+        matches = [m for sl in sec_lists for m in matches_by_list[id(sl)]]
+        add('subnet', analyze_group(matches, cross_list_only=True), subnet)
+
+    return findings
+
+
+# ---------------------------------------------------------
+# Print findings
+# ---------------------------------------------------------
+def print_findings(findings):
+    print("\n" + "="*80)
+    print("SECURITY LIST RULE ANALYSIS")
+    print("="*80)
+
+    counts = defaultdict(int)
+    for f in findings:
+        counts[(f['scope'], f['kind'])] += 1
+
+    for (scope, kind), count in sorted(counts.items()):
+        print(f"  {scope:14} {kind:10} {count}")
+
+    for f in findings:
+        rule, other = f['rule'], f['covered_by']
+        where = f"{f['region']} / {f['vcn_name']}" + (f" / subnet {f['subnet']}" if f['subnet'] else "")
+        print(f"\n[{f['kind'].upper()}] {where}")
+        print(f"  {rule['security_list']} {rule['direction']}#{rule['rule_index']}: {rule['rule']}")
+        print(f"  {other['security_list']} {other['direction']}#{other['rule_index']}: {other['rule']}")
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate, shadowed and overlapping security list rules")
+    parser.add_argument("backup", nargs="?",
+                        help="stored backup to analyze ('latest', manifest, .ndjson.gz or full .json); live when omitted")
+    parser.add_argument("--region")
+    parser.add_argument("--vcn-id")
+    parser.add_argument("--json", action="store_true", help="print findings as JSON")
+    args = parser.parse_args()
+
+    import backupsecuritylists
+
+    if args.backup:
+        security_lists_data = backupsecuritylists.load_saved_backup(args.backup, args.region, args.vcn_id)
+    else:
+        from clientpool import load_config
+        config = load_config()
+        regions = [args.region] if args.region else backupsecuritylists.get_regions(config)
+        security_lists_data = backupsecuritylists.collect_all_security_lists(config, regions)
+
+    findings = analyze(security_lists_data)
+
+    if args.json:
+        json.dump(findings, sys.stdout, indent=1)
+        print()
+    else:
+        print_findings(findings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for security list backups.
+
+Each security list is normalized (rules sorted, keys sorted) and hashed;
+the blob is written under objects/ only when that hash is new. Every run
+writes a small manifest under manifests/ naming the blobs that made up the
+tenancy at that time, so restoring any point in time is one manifest read
+plus one blob read per security list.
+
+    <backup_dir>/objects/ab/ab12...ef.json
+    <backup_dir>/manifests/manifest_20250101_020000.json
+"""
+import hashlib
+import json
+import os
+
+
+OBJECTS_DIR = "objects"
+MANIFESTS_DIR = "manifests"
+
+
+# ---------------------------------------------------------
+# Normalize + hash one security list
+# ---------------------------------------------------------
+def _rule_key(rule):
+    return json.dumps(rule, sort_keys=True)
+
+
+def normalize(sec_list):
+    # Rule order carries no meaning in a security list, so a reorder is not a change
+    normalized = dict(sec_list)
+    normalized['ingress_rules'] = sorted(sec_list['ingress_rules'], key=_rule_key)
+    normalized['egress_rules'] = sorted(sec_list['egress_rules'], key=_rule_key)
+    return normalized
+
+
+def encode(sec_list):
+    payload = json.dumps(normalize(sec_list), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest(), payload
+
+
+# ---------------------------------------------------------
+# File helpers
+# ---------------------------------------------------------
+def object_path(backup_dir, digest):
+    return os.path.join(backup_dir, OBJECTS_DIR, digest[:2], f"{digest}.json")
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------
+# Save a run: new/changed blobs + manifest
+# ---------------------------------------------------------
+def save_to_store(security_lists_data, timestamp, backup_dir):
+    entries = []
+    written = 0
+
+    for sec_list in security_lists_data:
+        digest, payload = encode(sec_list)
+        path = object_path(backup_dir, digest)
+        if not os.path.exists(path):
+            _write_atomic(path, payload)
+            written += 1
+
+        entries.append({
+            'hash': digest,
+            'region': sec_list['region'],
+            'compartment_path': sec_list['compartment_path'],
+            'vcn_name': sec_list['vcn_name'],
+            'vcn_id': sec_list['vcn_id'],
+            'security_list_name': sec_list['security_list_name'],
+            'security_list_id': sec_list['security_list_id'],
+        })
+
+    manifest = {
+        'timestamp': timestamp,
+        'security_list_count': len(entries),
+        'security_lists': entries,
+    }
+    manifest_file = os.path.join(backup_dir, MANIFESTS_DIR, f"manifest_{timestamp}.json")
+    _write_atomic(manifest_file, json.dumps(manifest, indent=1).encode("utf-8"))
+
+    return manifest_file, written
+
+
+# ---------------------------------------------------------
+# Restore a point in time
+# ---------------------------------------------------------
+def list_manifests(backup_dir):
+    manifest_dir = os.path.join(backup_dir, MANIFESTS_DIR)
+    if not os.path.isdir(manifest_dir):
+        return []
+    return sorted(
+        os.path.join(manifest_dir, name)
+        for name in os.listdir(manifest_dir)
+        if name.startswith("manifest_") and name.endswith(".json")
+    )
+
+
+def load_manifest(manifest_file):
+    with open(manifest_file) as f:
+        return json.load(f)
+
+
+def load_backup(manifest_file, backup_dir=None):
+    """Return the security_lists_data of a run, as get_security_lists built it."""
+    backup_dir = backup_dir or os.path.dirname(os.path.dirname(os.path.abspath(manifest_file)))
+    manifest = load_manifest(manifest_file)
+
+    security_lists_data = []
+    for entry in manifest['security_lists']:
+        with open(object_path(backup_dir, entry['hash'])) as f:
+            security_lists_data.append(json.load(f))
+    return security_lists_data
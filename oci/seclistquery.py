@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Answer "which security lists let IP reach port?" from a backup or a live run.
+
+Every rule with a CIDR source (ingress) or destination (egress) is put in a
+prefix table keyed by (direction, IP version, prefix length, network bits)
+- the flattened form of a radix tree. A point query looks up one key per
+prefix length of the address (33 for IPv4, 129 for IPv6) and, in each hit,
+asks the per-protocol interval tree for the rules whose destination port
+range contains the port.
+
+The index is pickled next to the backup (<backup>.reach.pickle) and reused
+while the backup file is unchanged.
+
+Usage:
+    seclistquery.py --ip 203.0.113.7 --port 22                       # live
+    seclistquery.py latest --ip 203.0.113.7 --port 1521
+    seclistquery.py rules.ndjson.gz --ip 10.0.0.5 --port 53 --protocol udp --direction egress
+"""
+import argparse
+import ipaddress
+import json
+import os
+import pickle
+import sys
+from collections import defaultdict
+
+from seclistanalyzer import IntervalTree, RuleMatch, ALL_PROTOCOLS
+
+
+INDEX_VERSION = 1
+# same names as backupsecuritylists.format_protocol: rules store 6 / 17 / 1 as TCP / UDP / ICMP
+PROTOCOLS = {'tcp': 'TCP', 'udp': 'UDP', 'icmp': 'ICMP', 'all': ALL_PROTOCOLS,
+             '6': 'TCP', '17': 'UDP', '1': 'ICMP'}
+
+
+# ---------------------------------------------------------
+# Build
+# ---------------------------------------------------------
+def build_reach_index(security_lists_data):
+    entries = []
+    buckets = defaultdict(lambda: defaultdict(list))
+
+    for sec_list in security_lists_data:
+        for direction in ('ingress', 'egress'):
+            for i, rule in enumerate(sec_list[f'{direction}_rules']):
+                m = RuleMatch(None, direction, rule)
+                if m.network is None:
+                    continue  # service CIDR labels never match an IP address
+
+                net = m.network
+                key = (direction, net.version, net.prefixlen,
+                       int(net.network_address) >> (net.max_prefixlen - net.prefixlen))
+                buckets[key][m.protocol].append((m.first[0], m.first[1], len(entries)))
+                entries.append({
+                    'region': sec_list['region'],
+                    'compartment_path': sec_list['compartment_path'],
+                    'vcn_name': sec_list['vcn_name'],
+                    'vcn_id': sec_list['vcn_id'],
+                    'security_list_name': sec_list['security_list_name'],
+                    'security_list_id': sec_list['security_list_id'],
+                    'attached_subnets': sec_list['attached_subnets'],
+                    'direction': direction,
+                    'rule_index': i,
+                    'rule': rule,
+                })
+
+    prefixes = {
+        key: {proto: IntervalTree(ivs) for proto, ivs in protos.items()}
+        for key, protos in buckets.items()
+    }
+    return {'version': INDEX_VERSION, 'entries': entries, 'prefixes': prefixes}
+
+
+# ---------------------------------------------------------
+# Disk cache next to the backup
+# ---------------------------------------------------------
+def index_cache_path(backup_path):
+    for suffix in (".ndjson.gz", ".json"):
+        if backup_path.endswith(suffix):
+            return backup_path[:-len(suffix)] + ".reach.pickle"
+    return backup_path + ".reach.pickle"
+
+
+def load_reach_index(backup_path, rebuild=False):
+    """Index of a saved backup; the cached copy is used unless the backup changed."""
+    import backupsecuritylists
+
+    backup_path = backupsecuritylists.resolve_backup_path(backup_path)
+    cache = index_cache_path(backup_path)
+    source_mtime = os.path.getmtime(backup_path)
+    # the cache always covers the whole backup; --region / --vcn-id narrow results instead
+    if not rebuild and os.path.exists(cache):
+        try:
+            with open(cache, "rb") as f:
+                index = pickle.load(f)
+            if index.get('version') == INDEX_VERSION and index.get('source_mtime') == source_mtime:
+                return index
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            print(f"Ignoring unreadable index cache {cache}: {e}", file=sys.stderr)
+
+    index = build_reach_index(backupsecuritylists.load_saved_backup(backup_path))
+    index['source_mtime'] = source_mtime
+
+    tmp = f"{cache}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache)
+    except OSError as e:
+        print(f"Could not write index cache {cache}: {e}", file=sys.stderr)
+    return index
+
+
+# ---------------------------------------------------------
+# Query
+# ---------------------------------------------------------
+def who_can_reach(index, ip, port=None, protocol='TCP', direction='ingress'):
+    """Rules that allow ip (source for ingress, destination for egress) on port / protocol."""
+    address = ipaddress.ip_address(ip)
+    bits = int(address)
+    max_len = address.max_prefixlen
+    lo, hi = (0, 65535) if port is None else (port, port)
+
+    hits = []
+    for prefixlen in range(max_len + 1):
+        protos = index['prefixes'].get((direction, address.version, prefixlen, bits >> (max_len - prefixlen)))
+        if not protos:
+            continue
+        if protocol == ALL_PROTOCOLS:
+            trees = protos.values()
+        else:
+            trees = [t for t in (protos.get(protocol), protos.get(ALL_PROTOCOLS)) if t]
+        for tree in trees:
+            hits.extend(tree.overlapping(lo, hi))
+
+    return [index['entries'][i] for i in sorted(hits)]
+
+
+# ---------------------------------------------------------
+# Print results
+# ---------------------------------------------------------
+def print_matches(matches):
+    if not matches:
+        print("No rule allows this traffic.")
+        return
+
+    for m in matches:
+        rule = m['rule']
+        target = rule.get('source') if m['direction'] == 'ingress' else rule.get('destination')
+        print(f"\n{m['region']} | {m['compartment_path']} | {m['vcn_name']} | {m['security_list_name']}")
+        print(f"  {m['direction']}#{m['rule_index']}: {rule['ip_protocol']} {target} "
+              f"dst {rule['destination_port_range'] or 'all'} src {rule['source_port_range'] or 'all'} "
+              f"stateless={rule['stateless']}")
+        if rule['description']:
+            print(f"  description: {rule['description']}")
+        print(f"  subnets: {m['attached_subnets']}")
+
+    print(f"\n{len(matches)} matching rule(s)")
+
+
+# ---------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Which security list rules let an IP reach a port")
+    parser.add_argument("backup", nargs="?",
+                        help="stored backup ('latest', manifest, .ndjson.gz or full .json); live when omitted")
+    parser.add_argument("--ip", required=True, help="source IP (ingress) or destination IP (egress)")
+    parser.add_argument("--port", type=int, help="destination port (ICMP: type); any port when omitted")
+    parser.add_argument("--protocol", default="tcp", help="tcp, udp, icmp, all or an IP protocol number")
+    parser.add_argument("--direction", choices=["ingress", "egress"], default="ingress")
+    parser.add_argument("--region")
+    parser.add_argument("--vcn-id")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the cached index")
+    parser.add_argument("--json", action="store_true", help="print matches as JSON")
+    args = parser.parse_args()
+
+    if args.backup:
+        index = load_reach_index(args.backup, rebuild=args.rebuild)
+    else:
+        import backupsecuritylists
+        from clientpool import load_config
+        config = load_config()
+        regions = [args.region] if args.region else backupsecuritylists.get_regions(config)
+        index = build_reach_index(backupsecuritylists.collect_all_security_lists(config, regions))
+
+    protocol = PROTOCOLS.get(args.protocol.lower(), args.protocol)
+    matches = [
+        m for m in who_can_reach(index, args.ip, args.port, protocol, args.direction)
+        if (args.region is None or m['region'] == args.region)
+        and (args.vcn_id is None or m['vcn_id'] == args.vcn_id)
+    ]
+
+    if args.json:
+        json.dump(matches, sys.stdout, indent=1)
+        print()
+    else:
+        print_matches(matches)
+
+
+if __name__ == "__main__":
+    main()
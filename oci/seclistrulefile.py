@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compact security list backup: gzip-compressed NDJSON, one record per rule.
+
+Rules are grouped by (region, VCN) and every group is written as its own
+gzip member, so the .ndjson.gz file is still a normal gzip stream (zcat
+reads it whole) while the sidecar index records the byte offset and length
+of each member. Reading one VCN seeks straight to its member and
+decompresses only that.
+
+Inside a member, each security list is one "security_list" record with
+its metadata followed by one "rule" record per ingress / egress rule.
+"""
+import json
+import os
+import zlib
+
+
+FORMAT = "seclist-ndjson-gz/1"
+COMPRESS_LEVEL = 6
+GZIP_WBITS = 31  # zlib wbits for a gzip header + trailer
+
+META_FIELDS = [
+    'region', 'compartment_path', 'vcn_name', 'vcn_id',
+    'security_list_name', 'security_list_id', 'attached_subnets',
+    'ingress_rule_count', 'egress_rule_count', 'created_date'
+]
+
+
+def index_path(rule_file):
+    base = rule_file[:-len(".ndjson.gz")] if rule_file.endswith(".ndjson.gz") else rule_file
+    return base + ".idx.json"
+
+
+def _line(record):
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+# ---------------------------------------------------------
+# Write
+# ---------------------------------------------------------
+def write_rule_file(security_lists_data, rule_file, timestamp=None):
+    # group security lists by (region, vcn), keeping first-seen order
+    groups = {}
+    for sec_list in security_lists_data:
+        groups.setdefault((sec_list['region'], sec_list['vcn_id']), []).append(sec_list)
+
+    members = []
+    tmp = f"{rule_file}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        for (region, vcn_id), sec_lists in groups.items():
+            offset = f.tell()
+            comp = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+            rule_count = 0
+
+            for sec_list in sec_lists:
+                meta = {k: sec_list.get(k) for k in META_FIELDS}
+                meta['type'] = 'security_list'
+                f.write(comp.compress(_line(meta)))
+
+                for direction in ('ingress', 'egress'):
+                    for rule in sec_list[f'{direction}_rules']:
+                        record = {'type': 'rule', 'security_list_id': sec_list['security_list_id'],
+                                  'direction': direction}
+                        record.update(rule)
+                        f.write(comp.compress(_line(record)))
+                        rule_count += 1
+
+            f.write(comp.flush())
+            members.append({
+                'region': region,
+                'vcn_id': vcn_id,
+                'vcn_name': sec_lists[0]['vcn_name'],
+                'compartment_path': sec_lists[0]['compartment_path'],
+                'offset': offset,
+                'length': f.tell() - offset,
+                'security_lists': len(sec_lists),
+                'rules': rule_count,
+            })
+    os.replace(tmp, rule_file)
+
+    index = {'format': FORMAT, 'timestamp': timestamp, 'members': members}
+    with open(index_path(rule_file), "w") as f:
+        json.dump(index, f, indent=1)
+
+    return rule_file
+
+
+# ---------------------------------------------------------
+# Read (selectively)
+# ---------------------------------------------------------
+def load_index(rule_file):
+    with open(index_path(rule_file)) as f:
+        return json.load(f)
+
+
+def read_records(rule_file, region=None, vcn_id=None):
+    """Yield records of the matching (region, VCN) members only."""
+    members = [
+        m for m in load_index(rule_file)['members']
+        if (region is None or m['region'] == region) and (vcn_id is None or m['vcn_id'] == vcn_id)
+    ]
+    with open(rule_file, "rb") as f:
+        for member in members:
+            f.seek(member['offset'])
+            data = zlib.decompress(f.read(member['length']), GZIP_WBITS)
+            for line in data.splitlines():
+                yield json.loads(line)
+
+
+def load_security_lists(rule_file, region=None, vcn_id=None):
+    """Rebuild security_lists_data (as get_security_lists returns it) for the selection."""
+    security_lists_data = []
+    by_id = {}
+    for record in read_records(rule_file, region, vcn_id):
+        kind = record.pop('type')
+        if kind == 'security_list':
+            record['ingress_rules'] = []
+            record['egress_rules'] = []
+            by_id[record['security_list_id']] = record
+            security_lists_data.append(record)
+        else:
+            sec_list = by_id[record.pop('security_list_id')]
+            direction = record.pop('direction')
+            sec_list[f'{direction}_rules'].append(record)
+    return security_lists_data
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Per-region compute shape catalog kept on disk between runs.
+
+The shape catalog of a region almost never changes, so list_shapes is paged
+once and the result is stored as a compact {shape: [ocpus, memory_in_gbs]}
+map for SHAPE_TTL seconds. Within the TTL, filling in OCPUs and memory for a
+non-flex instance costs no API call. A shape the catalog does not know (a
+new shape released since the last fetch) triggers one refresh per run.
+
+Usage:
+    shapecache.py                       # cached regions and their age
+    shapecache.py --invalidate          # drop every cached region of the tenancy
+    shapecache.py --invalidate us-ashburn-1 ap-hyderabad-1
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import oci
+
+from apiguard import skip
+from compartmentcache import CACHE_DIR
+from records import list_records, intern
+
+
+# ---------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------
+SHAPE_TTL = int(os.environ.get("DBASCRIPTS_SHAPE_TTL", str(7 * 86400)))  # seconds, 0 disables the cache
+
+# Same attribute names as oci.core.models.Shape
+Shape = namedtuple("Shape", ["shape", "ocpus", "memory_in_gbs"])
+
+
+# ---------------------------------------------------------
+# Cache file helpers
+# ---------------------------------------------------------
+def cache_file(tenancy_id, region):
+    return os.path.join(CACHE_DIR, f"shapes_{tenancy_id}_{region}.json")
+
+
+def read_cache(tenancy_id, region, ttl=SHAPE_TTL):
+    path = cache_file(tenancy_id, region)
+    try:
+        if ttl <= 0 or time.time() - os.path.getmtime(path) > ttl:
+            return None
+        with open(path) as f:
+            return {name: Shape(name, *values) for name, values in json.load(f)["shapes"].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_cache(tenancy_id, region, shapes):
+    path = cache_file(tenancy_id, region)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump({"tenancy": tenancy_id,
+                       "region": region,
+                       "fetched": time.time(),
+                       "shapes": {s.shape: [s.ocpus, s.memory_in_gbs] for s in shapes.values()}}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def invalidate(tenancy_id, regions=None):
+    """Drop the cached catalog of the given regions (all cached regions when None)."""
+    prefix = f"shapes_{tenancy_id}_"
+    try:
+        names = os.listdir(CACHE_DIR)
+    except OSError:
+        return []
+
+    removed = []
+    for name in names:
+        if not (name.startswith(prefix) and name.endswith(".json")):
+            continue
+        region = name[len(prefix):-len(".json")]
+        if regions is not None and region not in regions:
+            continue
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+            removed.append(region)
+        except OSError:
+            pass
+    return removed
+
+
+def fetch_shapes(pool, region, tenancy_id):
+    with pool.client(oci.core.ComputeClient, region) as compute_client:
+        # list_shapes requires a compartment_id param in many SDK versions (use tenancy)
+        shapes = list_records(
+            compute_client.list_shapes,
+            lambda s: Shape(intern(s.shape), s.ocpus, s.memory_in_gbs),
+            compartment_id=tenancy_id
+        )
+    return {s.shape: s for s in shapes}
+
+
+# ---------------------------------------------------------
+# Catalog of one region: disk first, API on expiry or unknown shape
+# ---------------------------------------------------------
+class ShapeCatalog:
+    """
+    Thread-safe shape -> Shape lookup for one region, loaded on first use.
+
+    get() returns None for an unknown shape after at most one refresh per
+    catalog, so a run with many instances of a retired shape does not
+    page list_shapes again for each of them.
+    """
+
+    def __init__(self, pool, region, tenancy_id, ttl=SHAPE_TTL):
+        self.pool = pool
+        self.region = region
+        self.tenancy_id = tenancy_id
+        self.ttl = ttl
+        self._shapes = None
+        self._refreshed = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Catalog from disk, or from the API when the cached copy expired."""
+        shapes = self._shapes
+        if shapes is None:
+            with self._lock:
+                if self._shapes is None:
+                    self._shapes = read_cache(self.tenancy_id, self.region, self.ttl)
+                if self._shapes is None:
+                    self._refresh()
+                shapes = self._shapes
+        return shapes
+
+    def get(self, shape, default=None):
+        shapes = self.load()
+        if shape in shapes or not shape:
+            return shapes.get(shape, default)
+
+        # unknown shape: the cached catalog may predate it
+        with self._lock:
+            if not self._refreshed:
+                self._refresh()
+            return self._shapes.get(shape, default)
+
+    def _refresh(self):
+        self._refreshed = True
+        try:
+            self._shapes = fetch_shapes(self.pool, self.region, self.tenancy_id)
+        except Exception as e:
+            skip(f"shapes of {self.region}", e)
+            if self._shapes is None:
+                self._shapes = {}
+            return
+        if self.ttl > 0:
+            write_cache(self.tenancy_id, self.region, self._shapes)
+
+
+# ---------------------------------------------------------
+# MAIN: inspect or invalidate the cache
+# ---------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the cached shape catalogs")
+    parser.add_argument("--invalidate", nargs="*", metavar="REGION",
+                        help="drop the cached catalog of these regions (all when none given)")
+    args = parser.parse_args()
+
+    from clientpool import load_config
+    tenancy_id = load_config()["tenancy"]
+
+    if args.invalidate is not None:
+        removed = invalidate(tenancy_id, args.invalidate or None)
+        print(f"Invalidated {len(removed)} region(s): {', '.join(sorted(removed)) or '-'}")
+        return
+
+    prefix = f"shapes_{tenancy_id}_"
+    try:
+        names = sorted(n for n in os.listdir(CACHE_DIR) if n.startswith(prefix) and n.endswith(".json"))
+    except OSError:
+        names = []
+    if not names:
+        print("No cached shape catalogs.")
+    for name in names:
+        region = name[len(prefix):-len(".json")]
+        path = os.path.join(CACHE_DIR, name)
+        age = time.time() - os.path.getmtime(path)
+        shapes = read_cache(tenancy_id, region, ttl=float("inf"))
+        state = "expired" if SHAPE_TTL <= 0 or age > SHAPE_TTL else "fresh"
+        print(f"{region:20} {len(shapes or {}):5} shapes  {age / 3600:8.1f}h old  {state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Start-up test of dbascripts.py.
+
+Every subcommand is loaded in a fresh interpreter with the SDK's lazy
+service imports disabled (what "import oci" does on older SDK versions).
+The test checks that only the declared service packages get imported,
+that they cover every oci.<service> the loaded scripts reference, and
+that loading stays under STARTUP_LIMIT_S.
+
+Usage:
+    python -m pytest -q test_dbascripts.py
+    python -m unittest test_dbascripts
+"""
+import ast
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from dbascripts import COMMANDS
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STARTUP_LIMIT_S = float(os.environ.get("DBASCRIPTS_STARTUP_LIMIT", "3.0"))  # an eager "import oci" takes ~6-9s
+
+# Referenced by a loaded module, but not on the command's path: shapecache.main only reads the
+# cache files (fetch_shapes uses core, compartmentcache.load_compartment_paths uses identity)
+UNUSED_BY_MAIN = {"shapes": {"core", "identity"}}
+
+# Runs in the child: load one command (or none), report time, service packages and script modules
+PROBE = """
+import json, os, sys, time
+sys.path.insert(0, {here!r})
+started = time.perf_counter()
+if {command!r}:
+    import dbascripts
+    dbascripts.load({command!r})
+else:
+    os.environ["OCI_PYTHON_SDK_NO_SERVICE_IMPORTS"] = "true"
+    import oci
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "elapsed": elapsed,
+    "services": sorted(name[4:-7] for name in sys.modules if name.startswith("oci.") and name.endswith(".models")
+                       and name.count(".") == 2),
+    "modules": sorted(getattr(m, "__file__", None) for m in list(sys.modules.values())
+                      if (getattr(m, "__file__", None) or "").startswith({here!r})),
+}}))
+"""
+
+
+def probe(command):
+    env = dict(os.environ, OCI_PYTHON_SDK_LAZY_IMPORTS_DISABLED="true")
+    env.pop("OCI_PYTHON_SDK_NO_SERVICE_IMPORTS", None)
+    proc = subprocess.run([sys.executable, "-c", PROBE.format(here=HERE, command=command)],
+                          env=env, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def is_service(name):
+    sdk = importlib.util.find_spec("oci").submodule_search_locations[0]
+    return os.path.isdir(os.path.join(sdk, name, "models"))
+
+
+def referenced_services(paths):
+    """oci.<name> attributes used in the given source files."""
+    names = set()
+    for path in paths:
+        with open(path) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "oci":
+                names.add(node.attr)
+    return names
+
+
+class StartupTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # service packages the SDK core imports by itself (auth, signers)
+        cls.baseline = set(probe("")["services"])
+
+    def test_commands(self):
+        for command, (module, services, _) in COMMANDS.items():
+            with self.subTest(command=command):
+                result = probe(command)
+                loaded = set(result["services"]) - self.baseline
+
+                self.assertEqual(loaded, set(services) - self.baseline,
+                                 f"{command}: imported {sorted(loaded)}, declared {sorted(services)}")
+                self.assertLess(result["elapsed"], STARTUP_LIMIT_S,
+                                f"{command}: loading took {result['elapsed']:.2f}s")
+
+                # a referenced service that was not imported would fail with AttributeError at run time
+                missing = {name for name in referenced_services(result["modules"]) - set(result["services"])
+                           if is_service(name)}
+                missing -= UNUSED_BY_MAIN.get(command, set())
+                self.assertFalse(missing, f"{command}: uses undeclared oci.{', oci.'.join(sorted(missing))}")
+
+
+if __name__ == "__main__":
+    unittest.main()
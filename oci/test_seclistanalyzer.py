@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Behaviour tests of seclistanalyzer.py and seclistquery.py.
+
+Rules are built as SDK models and parsed by backupsecuritylists, so the
+tests read the same rule dicts a live run or a stored backup produces.
+The prefix indexes and interval trees are also checked against a brute
+force comparison on random rules and queries.
+
+Usage:
+    python -m pytest -q test_seclistanalyzer.py
+    python -m unittest test_seclistanalyzer
+"""
+import ipaddress
+import random
+import unittest
+
+from oci.core.models import (
+    EgressSecurityRule, IcmpOptions, IngressSecurityRule, PortRange, TcpOptions, UdpOptions,
+)
+
+from backupsecuritylists import parse_egress_rule, parse_ingress_rule
+from seclistanalyzer import IntervalTree, RuleMatch, analyze, analyze_group, rule_matches, ALL_PROTOCOLS
+from seclistquery import PROTOCOLS, build_reach_index, who_can_reach
+
+
+OSN_LABEL = "all-iad-services-in-oracle-services-network"
+PROTOCOL_NUMBERS = {"tcp": "6", "udp": "17", "icmp": "1", "all": "all"}
+
+
+# ---------------------------------------------------------
+# Rule and security list builders
+# ---------------------------------------------------------
+def rule_kwargs(protocol, ports, source_ports, icmp, stateless):
+    kwargs = {"protocol": PROTOCOL_NUMBERS[protocol], "is_stateless": stateless}
+    if protocol in ("tcp", "udp") and (ports or source_ports):
+        options = TcpOptions if protocol == "tcp" else UdpOptions
+        kwargs[f"{protocol}_options"] = options(
+            destination_port_range=PortRange(min=ports[0], max=ports[-1]) if ports else None,
+            source_port_range=PortRange(min=source_ports[0], max=source_ports[-1]) if source_ports else None,
+        )
+    if protocol == "icmp" and icmp:
+        kwargs["icmp_options"] = IcmpOptions(type=icmp[0], code=icmp[1] if len(icmp) > 1 else None)
+    return kwargs
+
+
+def ingress(source, protocol="tcp", ports=None, source_ports=None, icmp=None, stateless=False):
+    source_type = "CIDR_BLOCK" if "/" in source else "SERVICE_CIDR_BLOCK"
+    rule = IngressSecurityRule(source=source, source_type=source_type,
+                               **rule_kwargs(protocol, ports, source_ports, icmp, stateless))
+    return parse_ingress_rule(rule, "ingress")
+
+
+def egress(destination, protocol="tcp", ports=None, source_ports=None, icmp=None, stateless=False):
+    destination_type = "CIDR_BLOCK" if "/" in destination else "SERVICE_CIDR_BLOCK"
+    rule = EgressSecurityRule(destination=destination, destination_type=destination_type,
+                              **rule_kwargs(protocol, ports, source_ports, icmp, stateless))
+    return parse_egress_rule(rule, "egress")
+
+
+def security_list(name, ingress_rules=(), egress_rules=(), subnets="Not attached"):
+    return {
+        "region": "us-ashburn-1",
+        "compartment_path": "app",
+        "vcn_name": "vcn-app",
+        "vcn_id": "ocid1.vcn.oc1..app",
+        "security_list_name": name,
+        "security_list_id": f"ocid1.securitylist.oc1..{name}",
+        "attached_subnets": subnets,
+        "ingress_rules": list(ingress_rules),
+        "egress_rules": list(egress_rules),
+    }
+
+
+def findings_of(*rules):
+    """{(kind, narrower rule, broader rule)} of one list of ingress rules; duplicates in rule order."""
+    result = set()
+    for f in analyze([security_list("sl", rules)]):
+        narrower, broader = f["rule"]["rule_index"], f["covered_by"]["rule_index"]
+        if f["kind"] == "duplicate":
+            narrower, broader = sorted((narrower, broader))
+        result.add((f["kind"], narrower, broader))
+    return result
+
+
+# ---------------------------------------------------------
+# Analyzer
+# ---------------------------------------------------------
+class AnalyzerTest(unittest.TestCase):
+
+    def test_duplicate(self):
+        self.assertEqual(findings_of(ingress("10.0.0.0/16", ports=(22,)),
+                                     ingress("10.0.0.0/16", ports=(22,))),
+                         {("duplicate", 0, 1)})
+
+    def test_shadowed_by_wider_cidr_and_ports(self):
+        self.assertEqual(findings_of(ingress("10.0.1.0/24", ports=(22,)),
+                                     ingress("10.0.0.0/16", ports=(20, 30))),
+                         {("shadowed", 0, 1)})
+
+    def test_partial_overlap(self):
+        # the narrower CIDR has ports the wider one does not allow
+        self.assertEqual(findings_of(ingress("10.0.0.0/16", ports=(20, 30)),
+                                     ingress("10.0.0.0/24", ports=(25, 40))),
+                         {("overlap", 1, 0)})
+
+    def test_source_ports_are_compared(self):
+        self.assertEqual(findings_of(ingress("10.0.0.0/16", ports=(443,), source_ports=(1024, 65535)),
+                                     ingress("10.0.0.0/16", ports=(443,))),
+                         {("shadowed", 0, 1)})
+        self.assertEqual(findings_of(ingress("10.0.0.0/16", ports=(443,), source_ports=(1024, 2000)),
+                                     ingress("10.0.0.0/16", ports=(443,), source_ports=(3000, 4000))),
+                         set())
+
+    def test_unrelated_rules(self):
+        self.assertEqual(findings_of(ingress("10.0.0.0/16", ports=(22,)),
+                                     ingress("10.0.0.0/16", ports=(80,)),
+                                     ingress("10.1.0.0/16", ports=(22,)),
+                                     ingress("10.0.0.0/16", "udp", ports=(22,)),
+                                     ingress("10.0.0.0/16", ports=(22,), stateless=True)),
+                         set())
+
+    def test_all_protocols(self):
+        self.assertEqual(findings_of(ingress("0.0.0.0/0", "all"),
+                                     ingress("10.0.0.0/8", ports=(22,)),
+                                     ingress("10.0.0.0/8", "icmp", icmp=(3, 4)),
+                                     ingress("10.0.0.0/8", "udp")),
+                         {("shadowed", 1, 0), ("shadowed", 2, 0), ("shadowed", 3, 0)})
+
+    def test_all_protocols_narrower_than_tcp(self):
+        # All Protocols from one host also allows what the TCP rule does not: an overlap, not a shadow
+        self.assertEqual(findings_of(ingress("10.0.0.0/8", ports=(22,)),
+                                     ingress("10.0.0.7/32", "all")),
+                         {("overlap", 1, 0)})
+
+    def test_icmp_type_and_code(self):
+        self.assertEqual(findings_of(ingress("0.0.0.0/0", "icmp", icmp=(3, 4)),
+                                     ingress("0.0.0.0/0", "icmp", icmp=(3,)),
+                                     ingress("0.0.0.0/0", "icmp", icmp=(8,)),
+                                     ingress("0.0.0.0/0", "icmp", icmp=(3, 4))),
+                         {("duplicate", 0, 3), ("shadowed", 0, 1), ("shadowed", 3, 1)})
+        self.assertEqual(findings_of(ingress("10.0.0.0/8", "icmp"),
+                                     ingress("10.0.0.0/16", "icmp", icmp=(8, 0))),
+                         {("shadowed", 1, 0)})
+
+    def test_service_label(self):
+        # a service label only matches the same label, never a CIDR
+        self.assertEqual(findings_of(ingress(OSN_LABEL, ports=(443,)),
+                                     ingress(OSN_LABEL, ports=(443,)),
+                                     ingress(OSN_LABEL, ports=(400, 500)),
+                                     ingress("0.0.0.0/0", ports=(443,))),
+                         {("duplicate", 0, 1), ("shadowed", 0, 2), ("shadowed", 1, 2)})
+
+    def test_ingress_and_egress_apart(self):
+        sl = security_list("sl", [ingress("10.0.0.0/16", ports=(22,))], [egress("10.0.0.0/16", ports=(22,))])
+        self.assertEqual(analyze([sl]), [])
+
+    def test_lists_of_one_subnet(self):
+        a = security_list("a", [ingress("10.0.1.0/24", ports=(22,)), ingress("10.0.1.0/24", ports=(22,))],
+                          subnets="app, db")
+        b = security_list("b", [ingress("10.0.0.0/16", ports=(1, 1024))], subnets="db")
+        c = security_list("c", [ingress("10.0.0.0/16", ports=(1, 1024))])
+
+        found = {(f["scope"], f["kind"], f["subnet"], f["rule"]["security_list"], f["rule"]["rule_index"],
+                  f["covered_by"]["security_list"]) for f in analyze([a, b, c])}
+        # the duplicate inside a is only reported once; c shares no subnet with a
+        self.assertEqual(found, {
+            ("security_list", "duplicate", "", "a", 0, "a"),
+            ("subnet", "shadowed", "db", "a", 0, "b"),
+            ("subnet", "shadowed", "db", "a", 1, "b"),
+        })
+
+    def test_index_finds_every_overlapping_pair(self):
+        rng = random.Random(7)
+        cidrs = ["0.0.0.0/0", "10.0.0.0/8", "10.0.0.0/16", "10.0.1.0/24", "10.0.2.0/24", "10.0.1.5/32",
+                 "192.168.0.0/16", "::/0", "2001:db8::/32", OSN_LABEL]
+        rules = []
+        for _ in range(300):
+            protocol = rng.choice(["tcp", "tcp", "udp", "icmp", "all"])
+            lo = rng.choice([22, 80, 443, 1000, 1521])
+            ports = (lo, lo + rng.choice([0, 0, 10, 600])) if rng.random() < 0.8 else None
+            source_ports = (1024, 65535) if rng.random() < 0.2 else None
+            icmp = rng.choice([None, (3,), (3, 4), (8, 0)])
+            rules.append(ingress(rng.choice(cidrs), protocol, ports, source_ports, icmp,
+                                 stateless=rng.random() < 0.1))
+        matches = rule_matches(security_list("sl", rules))
+
+        found = {frozenset((broader.ref[2], narrower.ref[2])) for _, broader, narrower in analyze_group(matches)}
+        expected = {frozenset((a.ref[2], b.ref[2]))
+                    for i, a in enumerate(matches) for b in matches[i + 1:] if same_traffic(a, b)}
+        self.assertEqual(found, expected)
+        self.assertGreater(len(expected), 100)
+
+
+def same_traffic(a, b):
+    """Brute force: do rules a and b allow some packet in common?"""
+    if a.network is None or b.network is None:
+        targets = a.target == b.target
+    else:
+        targets = a.network.version == b.network.version and a.network.overlaps(b.network)
+    return (
+        a.direction == b.direction and a.stateless == b.stateless and targets
+        and (a.protocol == b.protocol or ALL_PROTOCOLS in (a.protocol, b.protocol))
+        and a.first[0] <= b.first[1] and b.first[0] <= a.first[1]
+        and a.second[0] <= b.second[1] and b.second[0] <= a.second[1]
+    )
+
+
+class IntervalTreeTest(unittest.TestCase):
+
+    def test_overlapping_matches_brute_force(self):
+        rng = random.Random(3)
+        intervals = []
+        for i in range(500):
+            lo = rng.randrange(0, 1000)
+            intervals.append((lo, lo + rng.choice([0, 1, 5, 50, 400]), i))
+        tree = IntervalTree(intervals)
+
+        for lo, hi in [(0, 0), (500, 500), (999, 1400), (100, 120), (0, 2000), (1500, 1600)]:
+            expected = {i for a, b, i in intervals if a <= hi and lo <= b}
+            found = list(tree.overlapping(lo, hi))
+            self.assertEqual(len(found), len(set(found)))
+            self.assertEqual(set(found), expected)
+
+
+# ---------------------------------------------------------
+# Point queries
+# ---------------------------------------------------------
+class WhoCanReachTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        app = security_list("app", [
+            ingress("0.0.0.0/0", ports=(22,)),                # 0
+            ingress("10.0.0.0/16", ports=(1521,)),            # 1
+            ingress("10.0.5.0/24", ports=(1500, 1600)),       # 2
+            ingress("10.0.5.7/32", "all"),                    # 3
+            ingress("10.0.0.0/8", "udp", ports=(53,)),        # 4
+            ingress(OSN_LABEL, ports=(1521,)),                # 5
+            ingress("10.0.0.0/8", "icmp", icmp=(3, 4)),       # 6
+            ingress("2001:db8::/32", ports=(22,)),            # 7
+        ], [
+            egress("10.0.5.0/24", ports=(1521,)),             # 0
+        ])
+        db = security_list("db", [
+            ingress("10.0.0.0/8", ports=(1521, 1522)),        # 0
+            ingress("10.0.5.0/25", ports=(22,)),              # 1
+        ])
+        cls.lists = [app, db]
+        cls.index = build_reach_index(cls.lists)
+
+    def reach(self, ip, port=None, protocol="TCP", direction="ingress"):
+        return [(m["security_list_name"], m["direction"], m["rule_index"])
+                for m in who_can_reach(self.index, ip, port, protocol, direction)]
+
+    def test_database_port(self):
+        self.assertEqual(self.reach("10.0.5.7", 1521),
+                         [("app", "ingress", 1), ("app", "ingress", 2), ("app", "ingress", 3), ("db", "ingress", 0)])
+        self.assertEqual(self.reach("10.0.6.1", 1521), [("app", "ingress", 1), ("db", "ingress", 0)])
+        self.assertEqual(self.reach("10.0.5.7", 1523), [("app", "ingress", 2), ("app", "ingress", 3)])
+
+    def test_ssh(self):
+        self.assertEqual(self.reach("10.0.5.7", 22),
+                         [("app", "ingress", 0), ("app", "ingress", 3), ("db", "ingress", 1)])
+        self.assertEqual(self.reach("10.0.5.200", 22), [("app", "ingress", 0)])
+        self.assertEqual(self.reach("192.168.1.1", 22), [("app", "ingress", 0)])
+        self.assertEqual(self.reach("192.168.1.1", 2222), [])
+
+    def test_other_protocols(self):
+        self.assertEqual(self.reach("10.0.5.7", 53, "UDP"), [("app", "ingress", 3), ("app", "ingress", 4)])
+        self.assertEqual(self.reach("10.9.9.9", 53, "UDP"), [("app", "ingress", 4)])
+        self.assertEqual(self.reach("10.9.9.9", 3, "ICMP"), [("app", "ingress", 6)])
+        self.assertEqual(self.reach("10.9.9.9", 8, "ICMP"), [])
+        # protocol numbers name the same protocols as the rules
+        self.assertEqual(self.reach("10.9.9.9", 53, PROTOCOLS["17"]), self.reach("10.9.9.9", 53, "UDP"))
+
+    def test_any_port_and_protocol(self):
+        self.assertEqual(self.reach("10.0.5.7", None, ALL_PROTOCOLS),
+                         [("app", "ingress", 0), ("app", "ingress", 1), ("app", "ingress", 2), ("app", "ingress", 3),
+                          ("app", "ingress", 4), ("app", "ingress", 6), ("db", "ingress", 0), ("db", "ingress", 1)])
+
+    def test_egress_and_ipv6(self):
+        self.assertEqual(self.reach("10.0.5.7", 1521, direction="egress"), [("app", "egress", 0)])
+        self.assertEqual(self.reach("10.0.6.7", 1521, direction="egress"), [])
+        self.assertEqual(self.reach("2001:db8::1", 22), [("app", "ingress", 7)])
+        self.assertEqual(self.reach("2001:db9::1", 22), [])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            ip = ipaddress.ip_address(rng.choice(["10.0.5.", "10.0.6.", "172.16.0."]) + str(rng.randrange(256)))
+            port = rng.choice([None, 22, 53, 1521, 1522, 1550, 3])
+            protocol = rng.choice(["TCP", "UDP", "ICMP", ALL_PROTOCOLS])
+            expected = []
+            for sl in self.lists:
+                for i, rule in enumerate(sl["ingress_rules"]):
+                    m = RuleMatch(None, "ingress", rule)
+                    if (m.network is not None and m.network.version == ip.version and ip in m.network
+                            and (protocol == ALL_PROTOCOLS or m.protocol in (protocol, ALL_PROTOCOLS))
+                            and (port is None or m.first[0] <= port <= m.first[1])):
+                        expected.append((sl["security_list_name"], "ingress", i))
+            self.assertEqual(self.reach(str(ip), port, protocol), expected, (str(ip), port, protocol))
+
+
+if __name__ == "__main__":
+    unittest.main()